@@ -1,4 +1,24 @@
 """
 Módulos de análisis y vectorización.
+
+Las funciones se importan bajo demanda (PEP 562): importar un submódulo del
+paquete no carga los demás ni sus dependencias.
 """
-from analysis.vectorizer import process_segments_and_sections, extract_sections_data
\ No newline at end of file
+import importlib
+
+# Nombre exportado -> submódulo que lo define
+_EXPORTS = {
+    'process_segments_and_sections': 'analysis.vectorizer',
+    'extract_sections_data': 'analysis.vectorizer',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    """Importa el submódulo que define `name` la primera vez que se accede a él."""
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,87 @@
+"""
+Kernel de similitud coseno compilado con Numba para matrices densas de embeddings.
+
+Este módulo es opcional: si Numba no está instalado, `NUMBA_AVAILABLE` es False
+y el vectorizador usa el producto matricial de NumPy.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Tipos de datos que admite el kernel
+SUPPORTED_DTYPES = (np.dtype(np.float32), np.dtype(np.float64))
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _cosine_kernel(A, B, normalized):
+        n_a, dim = A.shape
+        n_b = B.shape[0]
+
+        # Precalcular normas de cada fila una sola vez (unitarias si las filas
+        # ya vienen normalizadas)
+        norms_a = np.ones(n_a, dtype=np.float32)
+        norms_b = np.ones(n_b, dtype=np.float32)
+        if not normalized:
+            for i in range(n_a):
+                acc = 0.0
+                for k in range(dim):
+                    acc += A[i, k] * A[i, k]
+                norms_a[i] = np.sqrt(acc)
+
+            for j in range(n_b):
+                acc = 0.0
+                for k in range(dim):
+                    acc += B[j, k] * B[j, k]
+                norms_b[j] = np.sqrt(acc)
+
+        result = np.zeros((n_a, n_b), dtype=np.float32)
+        for i in prange(n_a):
+            if norms_a[i] == 0.0:
+                continue
+            for j in range(n_b):
+                if norms_b[j] == 0.0:
+                    continue
+                acc = 0.0
+                for k in range(dim):
+                    acc += A[i, k] * B[j, k]
+                result[i, j] = acc / (norms_a[i] * norms_b[j])
+
+        return result
+
+
+def cosine_similarity_matrix(A, B, normalized=False):
+    """
+    Calcula la similitud coseno entre cada fila de A y cada fila de B.
+
+    Es una alternativa al producto matricial de BLAS para entornos sin BLAS
+    optimizado; no convierte los datos, así que solo admite float32 y float64
+    (Numba no opera con float16).
+
+    Args:
+        A (numpy.ndarray): Matriz densa (n_a x dim).
+        B (numpy.ndarray): Matriz densa (n_b x dim).
+        normalized (bool): Indica si las filas ya tienen norma L2 unitaria; en
+                           ese caso se omite el cálculo de normas.
+
+    Returns:
+        numpy.ndarray: Matriz de similitud (n_a x n_b) en float32.
+
+    Raises:
+        RuntimeError: Si Numba no está instalado.
+        TypeError: Si las matrices no son float32 o float64, o tienen tipos distintos.
+    """
+    if not NUMBA_AVAILABLE:
+        raise RuntimeError("Numba no está instalado. Para instalar: pip install numba")
+
+    if A.dtype != B.dtype or A.dtype not in SUPPORTED_DTYPES:
+        raise TypeError(f"El kernel de Numba requiere float32 o float64 (recibido {A.dtype} y {B.dtype})")
+
+    A = np.ascontiguousarray(A)
+    B = np.ascontiguousarray(B)
+    return _cosine_kernel(A, B, normalized)
@@ -0,0 +1,127 @@
+"""
+Modelo de embeddings respaldado por la API de embeddings de OpenAI.
+
+Expone la misma interfaz `encode` que SentenceTransformer para que el vectorizador
+(caché, deduplicación y producto matricial) funcione igual con ambos backends.
+Los textos se envían en lotes de `EMBEDDING_API_BATCH_SIZE` entradas por solicitud,
+con varias solicitudes simultáneas, en lugar de una solicitud por segmento.
+"""
+
+import os
+import asyncio
+import logging
+
+import aiohttp
+import numpy as np
+from sklearn.preprocessing import normalize
+
+from config import get_settings
+from generation.ai_client import HTTP_TIMEOUT, retry_transient_errors
+
+logger = logging.getLogger(__name__)
+
+# Modelo de embeddings de OpenAI por defecto
+DEFAULT_OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Textos por solicitud (la API admite hasta 2048 entradas) y solicitudes simultáneas
+EMBEDDING_API_BATCH_SIZE = int(os.getenv("EMBEDDING_API_BATCH_SIZE", 256))
+EMBEDDING_API_CONCURRENCY = int(os.getenv("EMBEDDING_API_CONCURRENCY", 8))
+
+
+class OpenAIEmbeddingModel:
+    """Cliente de la API de embeddings de OpenAI con la interfaz de SentenceTransformer."""
+
+    def __init__(self, model_name=DEFAULT_OPENAI_EMBEDDING_MODEL, api_key=None,
+                 batch_size=EMBEDDING_API_BATCH_SIZE, max_concurrent=EMBEDDING_API_CONCURRENCY):
+        """
+        Inicializa el cliente de embeddings.
+
+        Args:
+            model_name (str): Modelo de embeddings de OpenAI.
+            api_key (str, optional): API key para OpenAI. Si no se proporciona,
+                                     se usa la configuración de OPENAI_API_KEY.
+            batch_size (int): Textos por solicitud a la API.
+            max_concurrent (int): Solicitudes simultáneas como máximo.
+        """
+        self.api_key = api_key or get_settings().OPENAI_API_KEY
+        if not self.api_key:
+            raise ValueError("Se requiere una API key de OpenAI. Configúrala en el archivo .env")
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_concurrent = max_concurrent
+        self.api_base = "https://api.openai.com/v1/embeddings"
+        self.headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        """
+        Calcula los embeddings de una lista de textos.
+
+        Los argumentos propios de SentenceTransformer (`batch_size`, `device`,
+        `show_progress_bar`...) se aceptan y se ignoran: el tamaño de lote de la
+        API se fija al crear el cliente.
+
+        Args:
+            texts (list): Textos a vectorizar.
+            normalize_embeddings (bool): Si es True, normaliza las filas (norma L2).
+
+        Returns:
+            numpy.ndarray: Matriz float32 de forma (len(texts), dimensión).
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        embeddings = asyncio.run(self._encode_async(list(texts)))
+        if normalize_embeddings:
+            embeddings = normalize(embeddings, norm='l2', copy=False)
+        return embeddings
+
+    async def _encode_async(self, texts):
+        """
+        Envía los lotes de textos a la API de forma concurrente.
+
+        Args:
+            texts (list): Textos a vectorizar.
+
+        Returns:
+            numpy.ndarray: Embeddings en el orden de los textos.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+
+        async def embed(session, batch):
+            async with semaphore:
+                return await self._post_batch(session, batch)
+
+        timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            results = await asyncio.gather(*(embed(session, batch) for batch in batches))
+
+        logger.info(f"Calculados {len(texts)} embeddings en {len(batches)} solicitudes a la API")
+        return np.vstack(results)
+
+    @retry_transient_errors
+    async def _post_batch(self, session, batch):
+        """
+        Solicita los embeddings de un lote, reintentando ante errores transitorios.
+
+        Args:
+            session (aiohttp.ClientSession): Sesión HTTP a utilizar.
+            batch (list): Textos del lote.
+
+        Returns:
+            numpy.ndarray: Embeddings del lote, en el orden de los textos.
+        """
+        # La API rechaza entradas vacías
+        payload = {"model": self.model_name, "input": [text or " " for text in batch]}
+        async with session.post(self.api_base, headers=self.headers, json=payload) as response:
+            if response.status >= 400:
+                logger.warning(f"Detalles: {await response.text()}")
+            response.raise_for_status()
+            data = (await response.json())["data"]
+
+        data.sort(key=lambda item: item["index"])
+        return np.asarray([item["embedding"] for item in data], dtype=np.float32)
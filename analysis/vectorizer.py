@@ -7,33 +7,107 @@ calcular similitudes y asignar segmentos a las secciones más relevantes.
 
 import os
 import json
+import sqlite3
+import logging
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+from analysis._cosine_numba import NUMBA_AVAILABLE, SUPPORTED_DTYPES as NUMBA_DTYPES, cosine_similarity_matrix
+from preprocessing.stop_words import get_spanish_stop_words
 
-# Intentar importar transformers para embeddings más avanzados
+logger = logging.getLogger(__name__)
+
+# Intentar importar transformers para embeddings más avanzados. find_spec evita
+# pagar el coste de la importación cuando el paquete no está instalado
+TRANSFORMERS_AVAILABLE = False
+if importlib.util.find_spec('sentence_transformers') is not None:
+    try:
+        from sentence_transformers import SentenceTransformer
+        TRANSFORMERS_AVAILABLE = True
+    except ImportError:
+        pass
+
+if not TRANSFORMERS_AVAILABLE:
+    logger.warning("sentence-transformers no está instalado. Se usará TF-IDF en su lugar. "
+                   "Para instalar: pip install sentence-transformers")
+
+# Intentar importar orjson para serializar JSON más rápido
 try:
-    from sentence_transformers import SentenceTransformer
-    TRANSFORMERS_AVAILABLE = True
+    import orjson
+    ORJSON_AVAILABLE = True
 except ImportError:
-    TRANSFORMERS_AVAILABLE = False
-    print("Advertencia: sentence-transformers no está instalado. Se usará TF-IDF en su lugar.")
-    print("Para instalar: pip install sentence-transformers")
-
-import os
-import json
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+    ORJSON_AVAILABLE = False
 
-# Intentar importar transformers para embeddings más avanzados
+# Intentar importar simsimd para kernels SIMD de distancia coseno
 try:
-    from sentence_transformers import SentenceTransformer
-    TRANSFORMERS_AVAILABLE = True
+    import simsimd
+    SIMSIMD_AVAILABLE = True
 except ImportError:
-    TRANSFORMERS_AVAILABLE = False
-    print("Advertencia: sentence-transformers no está instalado. Se usará TF-IDF en su lugar.")
-    print("Para instalar: pip install sentence-transformers")
+    SIMSIMD_AVAILABLE = False
+
+# Por debajo de este número de pares (segmentos x secciones) simsimd evita el
+# coste de despacho de BLAS; por encima se mantiene el producto matricial
+BLAS_THRESHOLD = int(os.getenv("BLAS_THRESHOLD", 1_000_000))
+
+# El kernel de Numba solo se usa si se activa explícitamente (p. ej. con una
+# instalación de NumPy sin BLAS optimizado); por defecto el producto matricial
+# de BLAS es bastante más rápido en matrices grandes
+USE_NUMBA_COSINE = os.getenv("USE_NUMBA_COSINE", "false").lower() == "true"
+
+# Precisión de los embeddings en el cálculo de similitud ('float32' o 'float16')
+EMBEDDING_PRECISION = os.getenv("EMBEDDING_PRECISION", "float32").lower()
+
+# Backend de inferencia del modelo ('torch', 'onnx', 'openvino' u 'openai') y
+# archivo opcional del modelo exportado dentro del repositorio del modelo
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_MODEL_FILE = os.getenv("EMBEDDING_MODEL_FILE", "")
+
+# Modelo de embeddings por defecto (forma parte de las claves de caché)
+if EMBEDDING_BACKEND == 'openai':
+    DEFAULT_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+else:
+    DEFAULT_EMBEDDING_MODEL = 'paraphrase-multilingual-MiniLM-L12-v2'
+
+# Longitud máxima en tokens de cada texto al codificar. Los segmentos de hasta
+# MAX_SEGMENT_LENGTH caracteres rondan los 200 tokens; limitarla acota el coste
+# cuadrático de la atención
+EMBEDDING_MAX_SEQ_LENGTH = int(os.getenv("ST_MAX_SEQ_LEN", 128))
+
+# Directorio de la caché de embeddings en disco (vacío para desactivarla)
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join("cache", "embeddings"))
+
+# Embeddings que se conservan en memoria entre llamadas dentro del mismo proceso
+EMBEDDING_MEMORY_CACHE_SIZE = int(os.getenv("EMBEDDING_MEMORY_CACHE_SIZE", 10000))
+
+# Claves por consulta al leer la caché en disco (SQLite admite 999 parámetros)
+EMBEDDING_DB_BATCH_SIZE = 900
+
+# Versión del formato de la caché de secciones junto a la estructura; cambiarla
+# si `extract_sections_data` produce campos distintos invalida las cachés previas
+SECTIONS_CACHE_VERSION = 1
+
+# Segmentos por bloque al calcular similitudes, para acotar la memoria de la
+# matriz de similitud (chunk x secciones x 4 bytes)
+SIMILARITY_CHUNK_SIZE = int(os.getenv("SIMILARITY_CHUNK_SIZE", 4096))
+
+def load_segments(segments_path):
+    """
+    Carga los segmentos de transcripción desde un archivo JSON.
+    
+    Args:
+        segments_path (str): Ruta al archivo con los segmentos (JSON o MessagePack).
+        
+    Returns:
+        list: Lista de segmentos.
+    """
+    from intermediate import load_records
+    return load_records(segments_path)
 
 
 def load_report_structure(structure_path):
@@ -53,10 +127,43 @@ def load_report_structure(structure_path):
     if not os.path.exists(structure_path):
         raise FileNotFoundError(f"El archivo de estructura {structure_path} no existe.")
     
-    with open(structure_path, 'r', encoding='utf-8') as file:
-        structure = json.load(file)
+    return load_json(structure_path)
+
+
+def load_json(path):
+    """
+    Carga un archivo JSON, usando orjson si está disponible.
     
-    return structure
+    Args:
+        path (str): Ruta del archivo.
+        
+    Returns:
+        Datos deserializados.
+    """
+    if ORJSON_AVAILABLE:
+        with open(path, 'rb') as file:
+            return orjson.loads(file.read())
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_json(data, output_path, indent=True):
+    """
+    Guarda datos en un archivo JSON, usando orjson si está disponible.
+    
+    Args:
+        data: Datos serializables a JSON.
+        output_path (str): Ruta del archivo de salida.
+        indent (bool): Si es True, indenta con 2 espacios para lectura humana;
+                       si es False, escribe JSON compacto (más rápido).
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        with open(output_path, 'wb') as file:
+            file.write(orjson.dumps(data, option=option))
+    else:
+        with open(output_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=2 if indent else None)
 
 
 def extract_sections_data(structure):
@@ -71,58 +178,136 @@ def extract_sections_data(structure):
     """
     sections = []
     
-    def process_section(section, path=""):
-        # Crear un diccionario con la información de esta sección
+    # Recorrido en preorden con una pila explícita de (sección, ruta del padre);
+    # los hijos se apilan en orden inverso para conservar el orden original
+    stack = [(section, "") for section in reversed(structure['secciones'])]
+    
+    while stack:
+        section, path = stack.pop()
         current_path = f"{path}/{section['titulo']}" if path else section['titulo']
         
-        section_data = {
+        palabras_clave = section.get('palabras_clave', [])
+        descripcion = section.get('descripcion', '')
+        
+        sections.append({
             'id': section['id'],
             'titulo': section['titulo'],
             'nivel': section['nivel'],
             'path': current_path,
-            'palabras_clave': section.get('palabras_clave', []),
-            'descripcion': section.get('descripcion', '')
-        }
-        
-        # Crear texto representativo de la sección para vectorización
-        texts = [section['titulo']]
-        if section_data['descripcion']:
-            texts.append(section_data['descripcion'])
-        if section_data['palabras_clave']:
-            texts.append(' '.join(section_data['palabras_clave']))
-        
-        section_data['texto_representativo'] = ' '.join(texts)
+            'palabras_clave': palabras_clave,
+            'descripcion': descripcion,
+            # Texto representativo de la sección para vectorización
+            'texto_representativo': ' '.join(filter(None, [
+                section['titulo'], descripcion, ' '.join(palabras_clave)
+            ]))
+        })
         
-        # Añadir esta sección a la lista
-        sections.append(section_data)
+        subsections = section.get('subsecciones')
+        if subsections:
+            stack.extend((subsection, current_path) for subsection in reversed(subsections))
+    
+    return sections
+
+
+def load_sections_data(structure_path, structure=None):
+    """
+    Obtiene las secciones planas de una estructura, reutilizando el resultado de
+    ejecuciones anteriores mientras el archivo de estructura no cambie.
+    
+    El resultado se guarda en `<estructura>.parsed.cache` junto con la fecha de
+    modificación y el tamaño del archivo, que se comparan en cada llamada.
+    
+    Args:
+        structure_path (str): Ruta al archivo JSON con la estructura.
+        structure (dict, optional): Estructura ya cargada; evita volver a leer el
+                                    archivo si la caché no es válida.
         
-        # Procesar subsecciones recursivamente
-        if 'subsecciones' in section:
-            for subsection in section['subsecciones']:
-                process_section(subsection, current_path)
+    Returns:
+        list: Lista de diccionarios con información de cada sección.
+    """
+    stat = os.stat(structure_path)
+    cache_path = f"{structure_path}.parsed.cache"
     
-    # Procesar secciones principales
-    for section in structure['secciones']:
-        process_section(section)
+    try:
+        cached = load_json(cache_path)
+        if (cached.get('version') == SECTIONS_CACHE_VERSION
+                and cached.get('mtime_ns') == stat.st_mtime_ns
+                and cached.get('size') == stat.st_size):
+            return cached['sections']
+    except (OSError, ValueError, AttributeError, KeyError):
+        pass
+    
+    if structure is None:
+        structure = load_report_structure(structure_path)
+    sections = extract_sections_data(structure)
+    
+    # Escribir en un temporal y renombrar para no dejar una caché a medias
+    try:
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        save_json({
+            'version': SECTIONS_CACHE_VERSION,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sections': sections
+        }, tmp_path, indent=False)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"No se pudo guardar la caché de secciones: {e}")
     
     return sections
 
 
-def load_embedding_model(model_name='paraphrase-multilingual-MiniLM-L12-v2'):
+@functools.lru_cache(maxsize=None)
+def load_embedding_model(model_name=DEFAULT_EMBEDDING_MODEL, backend=EMBEDDING_BACKEND,
+                         max_seq_length=EMBEDDING_MAX_SEQ_LENGTH):
     """
     Carga un modelo de embeddings preentrenado.
     
+    El modelo se cachea por nombre y backend, de modo que las llamadas sucesivas
+    dentro del mismo proceso reutilizan la instancia ya cargada.
+    
     Args:
         model_name (str): Nombre del modelo de SentenceTransformers a cargar.
+        backend (str): Backend de inferencia ('torch', 'onnx', 'openvino' u 'openai').
+                       'onnx' y 'openvino' aceleran la inferencia en CPU y
+                       requieren sentence-transformers >= 3.2 con
+                       optimum[onnxruntime] u optimum[openvino]. 'openai' usa
+                       la API de embeddings de OpenAI con solicitudes por lotes.
+        max_seq_length (int, optional): Longitud máxima en tokens de cada texto.
+                                        None usa la máxima que admite el modelo.
         
     Returns:
         SentenceTransformer o None: Modelo cargado o None si no está disponible.
     """
+    if backend == 'openai':
+        try:
+            from analysis._openai_embeddings import OpenAIEmbeddingModel
+            model = OpenAIEmbeddingModel(model_name)
+            print(f"Modelo {model_name} de la API de OpenAI configurado")
+            return model
+        except Exception as e:
+            print(f"Error al configurar el modelo {model_name} de OpenAI: {e}")
+            return None
+    
     if not TRANSFORMERS_AVAILABLE:
         return None
     
+    if backend != 'torch':
+        # Permite elegir un archivo exportado concreto, p. ej. la variante
+        # cuantizada int8 "onnx/model_qint8_avx512_vnni.onnx"
+        model_kwargs = {'file_name': EMBEDDING_MODEL_FILE} if EMBEDDING_MODEL_FILE else None
+        try:
+            model = SentenceTransformer(model_name, backend=backend, model_kwargs=model_kwargs)
+            set_max_seq_length(model, max_seq_length)
+            print(f"Modelo {model_name} cargado correctamente (backend: {backend})")
+            return model
+        except Exception as e:
+            print(f"Error al cargar el modelo {model_name} con backend {backend}: {e}")
+            print("Se usará el backend torch en su lugar")
+    
     try:
         model = SentenceTransformer(model_name)
+        set_max_seq_length(model, max_seq_length)
         print(f"Modelo {model_name} cargado correctamente")
         return model
     except Exception as e:
@@ -130,121 +315,588 @@ def load_embedding_model(model_name='paraphrase-multilingual-MiniLM-L12-v2'):
         return None
 
 
-def vectorize_with_transformers(texts, model):
+def set_max_seq_length(model, max_seq_length):
+    """
+    Fija la longitud máxima en tokens con que un modelo codifica cada texto.
+    
+    Args:
+        model (SentenceTransformer): Modelo cargado.
+        max_seq_length (int, optional): Longitud máxima. None usa la máxima que
+                                        admiten las posiciones del modelo.
+    """
+    if max_seq_length is None:
+        # El tokenizador puede declarar un máximo arbitrario (p. ej. 1e30); el
+        # límite real lo ponen los embeddings de posición del transformer
+        limits = [getattr(model.tokenizer, 'model_max_length', None)]
+        try:
+            limits.append(model[0].auto_model.config.max_position_embeddings)
+        except (AttributeError, IndexError, TypeError):
+            pass
+        limits = [limit for limit in limits if isinstance(limit, int) and limit > 0]
+        if not limits:
+            return
+        max_seq_length = min(limits)
+    model.max_seq_length = max_seq_length
+
+
+def dedupe_texts(texts):
+    """
+    Elimina textos repetidos conservando el orden de primera aparición.
+    
+    Args:
+        texts (list): Lista de textos, posiblemente con duplicados.
+        
+    Returns:
+        tuple: (lista de textos únicos, numpy.ndarray con el índice en la lista
+               de únicos de cada texto original).
+    """
+    index_by_text = {}
+    inverse = np.fromiter(
+        (index_by_text.setdefault(text, len(index_by_text)) for text in texts),
+        dtype=np.intp,
+        count=len(texts)
+    )
+    return list(index_by_text), inverse
+
+
+def get_embedding_cache_key(text, model_name=DEFAULT_EMBEDDING_MODEL, backend=EMBEDDING_BACKEND,
+                            max_seq_length=EMBEDDING_MAX_SEQ_LENGTH):
     """
-    Vectoriza textos usando un modelo transformer.
+    Calcula la clave de caché de un texto para un modelo de embeddings.
+    
+    El backend y la longitud máxima forman parte de la clave porque cambian el
+    embedding: un texto más largo que `max_seq_length` se trunca, y los backends
+    exportados (ONNX u OpenVINO, posiblemente cuantizados) no dan exactamente los
+    mismos valores que torch.
+    
+    Args:
+        text (str): Texto a codificar.
+        model_name (str): Nombre del modelo que produce el embedding.
+        backend (str): Backend de inferencia del modelo.
+        max_seq_length (int, optional): Longitud máxima en tokens con que se codifica.
+        
+    Returns:
+        str: Hash hexadecimal del modelo, su configuración y el contenido del texto.
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(f"{model_name}\0{backend}\0{max_seq_length}\0".encode('utf-8'))
+    hasher.update(text.encode('utf-8'))
+    return hasher.hexdigest()
+
+
+# Caché en memoria (LRU) de embeddings por clave de contenido
+_embedding_memory = OrderedDict()
+_embedding_memory_lock = threading.Lock()
+
+
+def _memory_get(keys):
+    """Busca embeddings en la caché en memoria y los marca como usados recientemente."""
+    found = {}
+    with _embedding_memory_lock:
+        for key in keys:
+            vector = _embedding_memory.get(key)
+            if vector is not None:
+                _embedding_memory.move_to_end(key)
+                found[key] = vector
+    return found
+
+
+def _memory_put(items):
+    """Guarda embeddings en la caché en memoria, descartando los menos usados."""
+    with _embedding_memory_lock:
+        for key, vector in items:
+            _embedding_memory[key] = vector
+            _embedding_memory.move_to_end(key)
+        while len(_embedding_memory) > EMBEDDING_MEMORY_CACHE_SIZE:
+            _embedding_memory.popitem(last=False)
+
+
+def open_embedding_db(cache_dir=EMBEDDING_CACHE_DIR):
+    """
+    Abre (creándola si no existe) la base de datos SQLite de la caché de embeddings.
+    
+    Args:
+        cache_dir (str): Directorio de la caché.
+        
+    Returns:
+        sqlite3.Connection: Conexión a la base de datos.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    connection = sqlite3.connect(os.path.join(cache_dir, "embeddings.sqlite"), timeout=30)
+    # WAL permite que varios procesos lean mientras otro escribe
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+    return connection
+
+
+def load_cached_embeddings(connection, keys):
+    """
+    Lee de la caché en disco los embeddings de un conjunto de claves.
+    
+    Args:
+        connection (sqlite3.Connection): Conexión a la caché de embeddings.
+        keys (list): Claves calculadas con `get_embedding_cache_key`.
+        
+    Returns:
+        dict: {clave: embedding float32} de las claves encontradas.
+    """
+    found = {}
+    for start in range(0, len(keys), EMBEDDING_DB_BATCH_SIZE):
+        batch = keys[start:start + EMBEDDING_DB_BATCH_SIZE]
+        placeholders = ",".join("?" * len(batch))
+        rows = connection.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch)
+        for key, blob in rows:
+            found[key] = np.frombuffer(blob, dtype=np.float32)
+    return found
+
+
+def store_embeddings(connection, items):
+    """
+    Guarda embeddings en la caché en disco.
+    
+    Args:
+        connection (sqlite3.Connection): Conexión a la caché de embeddings.
+        items (list): Tuplas (clave, embedding).
+    """
+    with connection:
+        connection.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            ((key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items)
+        )
+
+
+def vectorize_with_cache(texts, model, model_name=DEFAULT_EMBEDDING_MODEL,
+                         cache_dir=EMBEDDING_CACHE_DIR):
+    """
+    Vectoriza textos reutilizando los embeddings ya calculados.
+    
+    Los embeddings se buscan primero en una caché LRU en memoria y después, con
+    consultas por lotes, en una base de datos SQLite del directorio de caché,
+    indexados por el hash del modelo (con su backend y longitud máxima) y del
+    texto. Solo los textos que no están en
+    ninguna de las dos se codifican, en un único lote.
     
     Args:
         texts (list): Lista de textos a vectorizar.
         model (SentenceTransformer): Modelo de embeddings.
+        model_name (str): Nombre del modelo (forma parte de la clave de caché).
+        cache_dir (str): Directorio de la caché. Si está vacío, no se usa caché.
+        
+    Returns:
+        numpy.ndarray: Matriz de embeddings normalizados (norma L2 unitaria),
+                       float32 y C-contigua.
+    """
+    if not cache_dir:
+        return vectorize_with_transformers(texts, model)
+    
+    keys = [get_embedding_cache_key(text, model_name) for text in texts]
+    found = _memory_get(keys)
+    
+    connection = open_embedding_db(cache_dir)
+    try:
+        pending_keys = [key for key in dict.fromkeys(keys) if key not in found]
+        if pending_keys:
+            from_disk = load_cached_embeddings(connection, pending_keys)
+            _memory_put(from_disk.items())
+            found.update(from_disk)
+        
+        # Codificar en un solo lote los textos que no están en caché
+        missing_indices = [i for i, key in enumerate(keys) if key not in found]
+        if missing_indices:
+            encoded = vectorize_with_transformers([texts[i] for i in missing_indices], model)
+            new_items = [(keys[i], np.asarray(vector, dtype=np.float32))
+                         for i, vector in zip(missing_indices, encoded)]
+            store_embeddings(connection, new_items)
+            _memory_put(new_items)
+            found.update(new_items)
+    finally:
+        connection.close()
+    
+    print(f"Embeddings en caché: {len(texts) - len(missing_indices)} de {len(texts)}")
+    
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.ascontiguousarray(np.stack([found[key] for key in keys]), dtype=np.float32)
+
+
+def get_section_vectors_path(section_texts, model_name=DEFAULT_EMBEDDING_MODEL,
+                             cache_dir=EMBEDDING_CACHE_DIR):
+    """
+    Obtiene la ruta del archivo .npy con los embeddings de un conjunto de secciones.
+    
+    Args:
+        section_texts (list): Textos representativos de las secciones.
+        model_name (str): Nombre del modelo de embeddings.
+        cache_dir (str): Directorio de la caché.
+        
+    Returns:
+        str: Ruta del archivo, con nombre derivado del contenido de las secciones.
+    """
+    key = get_embedding_cache_key('\0'.join(section_texts), model_name)
+    return os.path.join(cache_dir, f"sections_{key}.npy")
+
+
+def load_section_vectors(section_texts, model_name=DEFAULT_EMBEDDING_MODEL,
+                         cache_dir=EMBEDDING_CACHE_DIR):
+    """
+    Abre en modo memmap de solo lectura los embeddings guardados de las secciones.
+    
+    Al mapear el archivo, varios procesos de trabajo comparten las mismas páginas
+    de memoria del sistema operativo en lugar de mantener una copia cada uno.
+    
+    Args:
+        section_texts (list): Textos representativos de las secciones.
+        model_name (str): Nombre del modelo de embeddings.
+        cache_dir (str): Directorio de la caché. Si está vacío, no se usa caché.
+        
+    Returns:
+        numpy.ndarray o None: Matriz de embeddings mapeada, o None si no existe.
+    """
+    if not cache_dir or not section_texts:
+        return None
+    
+    try:
+        return np.load(get_section_vectors_path(section_texts, model_name, cache_dir), mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+
+def save_section_vectors(section_texts, section_vectors, model_name=DEFAULT_EMBEDDING_MODEL,
+                         cache_dir=EMBEDDING_CACHE_DIR):
+    """
+    Guarda los embeddings de las secciones y los devuelve mapeados desde disco.
+    
+    Args:
+        section_texts (list): Textos representativos de las secciones.
+        section_vectors (numpy.ndarray): Embeddings de las secciones.
+        model_name (str): Nombre del modelo de embeddings.
+        cache_dir (str): Directorio de la caché. Si está vacío, no se guarda nada.
         
     Returns:
-        numpy.ndarray: Matriz de embeddings.
+        numpy.ndarray: Embeddings mapeados en modo memmap, o la matriz original
+                       si no se pudieron guardar.
     """
-    return model.encode(texts, show_progress_bar=False)
+    if not cache_dir or not section_texts:
+        return section_vectors
+    
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        path = get_section_vectors_path(section_texts, model_name, cache_dir)
+        np.save(path, np.asarray(section_vectors))
+        return np.load(path, mmap_mode='r')
+    except OSError as e:
+        logger.warning(f"No se pudieron guardar los embeddings de secciones: {e}")
+        return section_vectors
 
 
-def vectorize_with_tfidf(texts):
+def get_default_device():
+    """
+    Determina el dispositivo a usar para el cálculo de embeddings.
+    
+    Returns:
+        str: 'cuda' si hay una GPU disponible, 'cpu' en caso contrario.
+    """
+    try:
+        import torch
+        return 'cuda' if torch.cuda.is_available() else 'cpu'
+    except ImportError:
+        return 'cpu'
+
+
+def vectorize_with_transformers(texts, model, batch_size=64, device=None):
+    """
+    Vectoriza textos usando un modelo transformer (o la API de embeddings).
+    
+    Args:
+        texts (list): Lista de textos a vectorizar.
+        model (SentenceTransformer o OpenAIEmbeddingModel): Modelo de embeddings.
+        batch_size (int): Número de textos por lote de codificación.
+        device (str, optional): Dispositivo a usar ('cuda' o 'cpu'). Si es None,
+                                se selecciona automáticamente.
+        
+    Returns:
+        numpy.ndarray: Matriz de embeddings normalizados (norma L2 unitaria),
+                       siempre float32 y C-contigua para que el producto
+                       matricial posterior use BLAS sin copias ocultas.
+    """
+    if device is None:
+        device = get_default_device()
+    
+    embeddings = model.encode(
+        texts,
+        batch_size=batch_size,
+        device=device,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
+def vectorize_with_tfidf(texts, vectorizer=None):
     """
     Vectoriza textos usando TF-IDF.
     
     Args:
         texts (list): Lista de textos a vectorizar.
+        vectorizer (TfidfVectorizer, optional): Vectorizador ya ajustado. Si se
+                                                proporciona, solo se transforman
+                                                los textos con su vocabulario.
         
     Returns:
         tuple: (vectorizer, matriz TF-IDF).
     """
-    vectorizer = TfidfVectorizer(stop_words='spanish', ngram_range=(1, 2))
+    if vectorizer is not None:
+        return vectorizer, vectorizer.transform(texts)
+    
+    # norm='l2' deja cada fila CSR normalizada sobre su arreglo .data, de modo que
+    # la similitud coseno posterior no necesita densificar ni renormalizar
+    vectorizer = TfidfVectorizer(
+        stop_words=get_spanish_stop_words(), ngram_range=(1, 2), norm='l2',
+        dtype=np.float32
+    )
     tfidf_matrix = vectorizer.fit_transform(texts)
     return vectorizer, tfidf_matrix
 
 
-def calculate_similarity_matrix(section_vectors, segment_vectors):
+def quantize_embeddings(vectors, precision=EMBEDDING_PRECISION):
+    """
+    Reduce la precisión de una matriz de embeddings para el cálculo de similitud.
+    
+    Args:
+        vectors (numpy.ndarray): Matriz de embeddings.
+        precision (str): 'float32' (sin cambios) o 'float16'.
+        
+    Returns:
+        numpy.ndarray: Matriz con el tipo de dato solicitado.
+        
+    Raises:
+        ValueError: Si la precisión no está soportada.
+    """
+    if precision == 'float32':
+        return vectors
+    if precision == 'float16':
+        return vectors.astype(np.float16)
+    raise ValueError(f"Precisión de embeddings no soportada: {precision}")
+
+
+def calculate_similarity_matrix(section_vectors, segment_vectors, normalized=False):
     """
     Calcula matriz de similitud entre secciones y segmentos.
     
+    Con filas de norma L2 unitaria la similitud coseno se reduce a un único
+    producto matricial, sin las normalizaciones que repite `cosine_similarity`.
+    
     Args:
-        section_vectors (numpy.ndarray): Matriz de vectores de secciones.
-        segment_vectors (numpy.ndarray): Matriz de vectores de segmentos.
+        section_vectors (numpy.ndarray o scipy.sparse): Matriz de vectores de secciones.
+        segment_vectors (numpy.ndarray o scipy.sparse): Matriz de vectores de segmentos.
+        normalized (bool): Indica si las filas ya tienen norma L2 unitaria.
         
     Returns:
         numpy.ndarray: Matriz de similitud (segmentos x secciones).
     """
-    # Si son matrices dispersas de TF-IDF
-    if hasattr(section_vectors, 'toarray') and hasattr(segment_vectors, 'toarray'):
-        return cosine_similarity(segment_vectors, section_vectors)
+    # Matrices densas de embeddings: simsimd para matrices pequeñas, donde evita el
+    # coste de despacho de BLAS; las grandes van al producto matricial de BLAS
+    # salvo que se haya activado el kernel de Numba
+    if isinstance(section_vectors, np.ndarray) and isinstance(segment_vectors, np.ndarray):
+        n_pairs = segment_vectors.shape[0] * section_vectors.shape[0]
+        if SIMSIMD_AVAILABLE and n_pairs < BLAS_THRESHOLD:
+            distances = simsimd.cdist(segment_vectors, section_vectors, metric='cosine')
+            return 1.0 - np.asarray(distances, dtype=np.float32)
+        if (USE_NUMBA_COSINE and NUMBA_AVAILABLE
+                and segment_vectors.dtype == section_vectors.dtype
+                and segment_vectors.dtype in NUMBA_DTYPES):
+            return cosine_similarity_matrix(segment_vectors, section_vectors, normalized=normalized)
+    
+    # Matrices dispersas de TF-IDF: trabajar en CSR para que la normalización
+    # actúe en sitio sobre .data y el producto sea disperso x disperso
+    if hasattr(section_vectors, 'tocsr'):
+        section_vectors = section_vectors.tocsr()
+    if hasattr(segment_vectors, 'tocsr'):
+        segment_vectors = segment_vectors.tocsr()
+    
+    if not normalized:
+        section_vectors = normalize(section_vectors, norm='l2', copy=False)
+        segment_vectors = normalize(segment_vectors, norm='l2', copy=False)
+    
+    similarity_matrix = segment_vectors @ section_vectors.T
+    
+    # Si son matrices dispersas de TF-IDF, el resultado también es disperso
+    if hasattr(similarity_matrix, 'toarray'):
+        similarity_matrix = similarity_matrix.toarray()
     
-    # Si son matrices densas de embeddings
-    return cosine_similarity(segment_vectors, section_vectors)
+    # Los embeddings en float16 se multiplican en media precisión y se devuelven en float32
+    return np.asarray(similarity_matrix).astype(np.float32, copy=False)
 
 
-def assign_segments_to_sections(similarity_matrix, segments, sections, top_n=3, threshold=0.1):
+def rank_sections_for_segments(similarity_matrix, top_n=3, threshold=0.1, offset=0):
     """
-    Asigna segmentos a secciones basado en la matriz de similitud.
+    Selecciona las secciones más relevantes de cada segmento.
+    
+    El resultado se devuelve como arreglos paralelos (estructura de arreglos), de
+    modo que todo el filtrado y la ordenación se realizan con NumPy.
     
     Args:
         similarity_matrix (numpy.ndarray): Matriz de similitud (segmentos x secciones).
-        segments (list): Lista de segmentos.
-        sections (list): Lista de secciones.
         top_n (int): Número máximo de secciones a asignar por segmento.
         threshold (float): Umbral mínimo de similitud para asignar.
+        offset (int): Desplazamiento a sumar a los índices de segmento (para
+                      matrices calculadas sobre un bloque de segmentos).
         
     Returns:
-        dict: Diccionario de asignaciones {section_id: [segments]}.
+        tuple: (índices de segmento, índices de sección, scores), tres
+               numpy.ndarray de igual longitud con un elemento por asignación.
     """
-    assignments = {section['id']: [] for section in sections}
+    n_segments, n_sections = similarity_matrix.shape
+    if n_segments == 0 or n_sections == 0 or top_n <= 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty, np.empty(0, dtype=np.float32)
     
-    for i, segment in enumerate(segments):
-        # Obtener índices de las secciones más relevantes para este segmento
-        section_similarities = similarity_matrix[i]
-        
-        # Filtrar por umbral mínimo
-        relevant_indices = np.where(section_similarities >= threshold)[0]
-        
-        # Ordenar por similitud descendente y tomar los top_n
-        top_indices = relevant_indices[np.argsort(-section_similarities[relevant_indices])][:top_n]
-        
-        # Si no hay secciones relevantes, pasar al siguiente segmento
-        if len(top_indices) == 0:
-            continue
+    # Seleccionar las top_n secciones de todos los segmentos a la vez
+    k = min(top_n, n_sections)
+    if k < n_sections:
+        top_indices = np.argpartition(-similarity_matrix, kth=k - 1, axis=1)[:, :k]
+    else:
+        top_indices = np.tile(np.arange(n_sections), (n_segments, 1))
+    top_scores = np.take_along_axis(similarity_matrix, top_indices, axis=1)
+    
+    # Filtrar por umbral mínimo
+    segment_rows, columns = np.nonzero(top_scores >= threshold)
+    
+    return (
+        segment_rows + offset,
+        top_indices[segment_rows, columns],
+        top_scores[segment_rows, columns]
+    )
+
+
+def group_assignments(segment_indices, section_indices, scores, sections):
+    """
+    Agrupa asignaciones expresadas como arreglos paralelos por sección.
+    
+    Args:
+        segment_indices (numpy.ndarray): Índice del segmento de cada asignación.
+        section_indices (numpy.ndarray): Índice de la sección de cada asignación.
+        scores (numpy.ndarray): Similitud de cada asignación.
+        sections (list): Lista de secciones.
         
-        # Asignar segmento a las secciones más relevantes
-        for idx in top_indices:
-            section_id = sections[idx]['id']
-            
-            # Añadir el segmento a la sección con su valor de similitud
-            segment_with_score = segment.copy()
-            segment_with_score['similarity_score'] = float(section_similarities[idx])
-            assignments[section_id].append(segment_with_score)
+    Returns:
+        dict: Diccionario {section_id: [(segment_index, score)]}, con los
+              segmentos de cada sección ordenados por similitud descendente.
+    """
+    # Ordenar por sección, luego por score descendente y luego por segmento
+    order = np.lexsort((segment_indices, -scores, section_indices))
+    segment_indices = segment_indices[order]
+    section_indices = section_indices[order]
+    scores = scores[order]
+    
+    boundaries = np.searchsorted(section_indices, np.arange(len(sections) + 1))
+    
+    assignments = {section['id']: [] for section in sections}
+    for j, section in enumerate(sections):
+        start, end = boundaries[j], boundaries[j + 1]
+        assignments[section['id']].extend(
+            zip(segment_indices[start:end].tolist(), scores[start:end].tolist())
+        )
     
     return assignments
 
 
-if __name__ == "__main__":
-    # Ejemplo de uso
-    import sys
+def assign_segments_to_sections(similarity_matrix, segments, sections, top_n=3, threshold=0.1, offset=0):
+    """
+    Asigna segmentos a secciones basado en la matriz de similitud.
     
-    if len(sys.argv) > 2:
-        segments_file = sys.argv[1]
-        structure_file = sys.argv[2]
-        output_file = sys.argv[3] if len(sys.argv) > 3 else "segment_assignments.json"
-        process_segments_and_sections(segments_file, structure_file, output_file)
-    else:
-        print("Uso: python vectorizer.py <archivo_segmentos> <archivo_estructura> [archivo_salida]")
+    Args:
+        similarity_matrix (numpy.ndarray): Matriz de similitud (segmentos x secciones).
+        segments (list): Lista de segmentos.
+        sections (list): Lista de secciones.
+        top_n (int): Número máximo de secciones a asignar por segmento.
+        threshold (float): Umbral mínimo de similitud para asignar.
+        offset (int): Desplazamiento a sumar a los índices de segmento (para
+                      matrices calculadas sobre un bloque de segmentos).
+        
+    Returns:
+        dict: Diccionario de asignaciones {section_id: [(segment_index, score)]},
+              ordenadas por similitud descendente. Los segmentos se referencian
+              por índice; ver `materialize_assignments`.
+    """
+    return group_assignments(
+        *rank_sections_for_segments(similarity_matrix, top_n, threshold, offset),
+        sections
+    )
 
 
-def process_segments_and_sections(segments_path, structure_path, output_path=None):
+def assign_segments_in_chunks(section_vectors, segment_vectors, segments, sections,
+                              top_n=3, threshold=0.1, normalized=False,
+                              chunk_size=SIMILARITY_CHUNK_SIZE):
     """
-    Función principal para procesar segmentos y secciones, vectorizarlos y asignar.
+    Calcula similitudes y asigna segmentos a secciones procesando bloques de segmentos.
+    
+    Cada bloque de similitud (chunk_size x secciones) se reduce inmediatamente a
+    sus top_n secciones, por lo que nunca se materializa la matriz completa.
     
     Args:
-        segments_path (str): Ruta al archivo JSON con los segmentos.
-        structure_path (str): Ruta al archivo JSON con la estructura.
-        output_path (str, optional): Ruta para guardar las asignaciones.
+        section_vectors (numpy.ndarray o scipy.sparse): Matriz de vectores de secciones.
+        segment_vectors (numpy.ndarray o scipy.sparse): Matriz de vectores de segmentos.
+        segments (list): Lista de segmentos.
+        sections (list): Lista de secciones.
+        top_n (int): Número máximo de secciones a asignar por segmento.
+        threshold (float): Umbral mínimo de similitud para asignar.
+        normalized (bool): Indica si las filas ya tienen norma L2 unitaria.
+        chunk_size (int): Número de segmentos por bloque.
         
     Returns:
-        dict: Diccionario de asignaciones {section_id: [segments]}.
+        dict: Diccionario de asignaciones {section_id: [(segment_index, score)]},
+              ordenadas por similitud descendente.
     """
+    ranked_chunks = []
+    
+    for start in range(0, segment_vectors.shape[0], chunk_size):
+        chunk_similarity = calculate_similarity_matrix(
+            section_vectors, segment_vectors[start:start + chunk_size], normalized=normalized
+        )
+        ranked_chunks.append(rank_sections_for_segments(
+            chunk_similarity, top_n=top_n, threshold=threshold, offset=start
+        ))
+    
+    if not ranked_chunks:
+        return {section['id']: [] for section in sections}
+    
+    segment_indices, section_indices, scores = (
+        np.concatenate(columns) for columns in zip(*ranked_chunks)
+    )
+    return group_assignments(segment_indices, section_indices, scores, sections)
+
+
+def materialize_assignments(assignments, segments):
+    """
+    Construye los segmentos anotados con su similitud a partir de asignaciones por índice.
+    
+    Args:
+        assignments (dict): Diccionario {section_id: [(segment_index, score)]}.
+        segments (list): Lista de segmentos.
+        
+    Returns:
+        dict: Diccionario de asignaciones {section_id: [segments]}, donde cada
+              segmento incluye la clave 'similarity_score'. Se conserva el orden
+              de `assignments` (similitud descendente), del que depende la
+              generación de prompts.
+    """
+    return {
+        section_id: [
+            {**segments[i], 'similarity_score': score}
+            for i, score in section_assignments
+        ]
+        for section_id, section_assignments in assignments.items()
+    }
+
+
+# Precargar el modelo al importar el módulo (útil en despliegues tipo servidor)
+if os.getenv("PRELOAD_MODEL", "0") == "1":
+    load_embedding_model()
+
+
+def process_segments_and_sections(segments_path, structure_path, output_path=None, indent=True):
     """
     Función principal para procesar segmentos y secciones, vectorizarlos y asignar.
     
@@ -252,64 +904,91 @@ def process_segments_and_sections(segments_path, structure_path, output_path=Non
         segments_path (str): Ruta al archivo JSON con los segmentos.
         structure_path (str): Ruta al archivo JSON con la estructura.
         output_path (str, optional): Ruta para guardar las asignaciones.
+        indent (bool): Si es False, guarda las asignaciones como JSON compacto.
         
     Returns:
         dict: Diccionario de asignaciones {section_id: [segments]}.
     """
-    # 1. Cargar datos
-    try:
-        with open(segments_path, 'r', encoding='utf-8') as file:
-            segments = json.load(file)
+    # 1. Cargar datos y, en paralelo, el modelo de embeddings (queda cacheado
+    # entre llamadas), para ocultar su tiempo de carga tras la lectura de archivos
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        model_future = executor.submit(load_embedding_model)
+        segments_future = executor.submit(load_segments, segments_path)
+        sections_future = executor.submit(load_sections_data, structure_path)
         
-        structure = load_report_structure(structure_path)
-        sections = extract_sections_data(structure)
+        try:
+            segments = segments_future.result()
+            sections = sections_future.result()
+            
+            print(f"Cargados {len(segments)} segmentos y {len(sections)} secciones")
+        except Exception as e:
+            print(f"Error al cargar datos: {e}")
+            return {}
         
-        print(f"Cargados {len(segments)} segmentos y {len(sections)} secciones")
-    except Exception as e:
-        print(f"Error al cargar datos: {e}")
-        return {}
+        model = model_future.result()
     
     # 2. Preparar textos para vectorización
     segment_texts = [segment['text'] for segment in segments]
     section_texts = [section['texto_representativo'] for section in sections]
     
     # 3. Vectorizar textos
-    model = None
-    if TRANSFORMERS_AVAILABLE:
-        model = load_embedding_model()
-    
     if model:
         # Usar embeddings de transformer
         print("Usando embeddings de transformer para vectorización")
-        segment_vectors = vectorize_with_transformers(segment_texts, model)
-        section_vectors = vectorize_with_transformers(section_texts, model)
+        # Codificar segmentos y secciones en una única llamada por lotes,
+        # una sola vez por cada texto distinto
+        # Las secciones ya codificadas se abren como memmap compartido
+        section_vectors = load_section_vectors(section_texts)
+        texts_to_encode = segment_texts
+        if section_vectors is None:
+            texts_to_encode = segment_texts + section_texts
+        
+        unique_texts, inverse = dedupe_texts(texts_to_encode)
+        all_vectors = vectorize_with_cache(unique_texts, model)[inverse]
+        segment_vectors = all_vectors[:len(segment_texts)]
+        if section_vectors is None:
+            section_vectors = save_section_vectors(section_texts, all_vectors[len(segment_texts):])
+        
+        segment_vectors = quantize_embeddings(segment_vectors)
+        section_vectors = quantize_embeddings(section_vectors)
     else:
         # Usar TF-IDF
         print("Usando TF-IDF para vectorización")
-        vectorizer, section_vectors = vectorize_with_tfidf(section_texts)
-        _, segment_vectors = vectorize_with_tfidf(segment_texts)  # Reusamos el mismo vectorizer
-    
-    # 4. Calcular matriz de similitud
-    similarity_matrix = calculate_similarity_matrix(section_vectors, segment_vectors)
-    print(f"Matriz de similitud calculada: {similarity_matrix.shape}")
+        # Un único ajuste sobre el corpus conjunto para que secciones y segmentos
+        # compartan el mismo espacio de características
+        vectorizer, all_vectors = vectorize_with_tfidf(section_texts + segment_texts)
+        section_vectors = all_vectors[:len(section_texts)]
+        segment_vectors = all_vectors[len(section_texts):]
     
-    # 5. Asignar segmentos a secciones
-    assignments = assign_segments_to_sections(
-        similarity_matrix, segments, sections, top_n=3, threshold=0.1
+    # 4-5. Calcular similitudes por bloques y asignar segmentos a secciones.
+    # Ambos métodos producen filas con norma L2 unitaria (TF-IDF usa norm='l2'
+    # por defecto y los embeddings se piden normalizados)
+    assignments = assign_segments_in_chunks(
+        section_vectors, segment_vectors, segments, sections,
+        top_n=3, threshold=0.1, normalized=True
     )
+    print(f"Similitudes calculadas en bloques de {SIMILARITY_CHUNK_SIZE} segmentos")
     
-    # Ordenar segmentos por relevancia dentro de cada sección
-    for section_id, section_segments in assignments.items():
-        assignments[section_id] = sorted(
-            section_segments, 
-            key=lambda x: x['similarity_score'], 
-            reverse=True
-        )
+    # Construir los segmentos con su score solo una vez; las asignaciones ya
+    # vienen ordenadas por relevancia dentro de cada sección
+    assignments = materialize_assignments(assignments, segments)
     
     # 6. Guardar asignaciones si se especificó ruta
     if output_path:
-        with open(output_path, 'w', encoding='utf-8') as file:
-            json.dump(assignments, file, ensure_ascii=False, indent=2)
+        save_json(assignments, output_path, indent=indent)
         print(f"Asignaciones guardadas en {output_path}")
     
-    return assignments
\ No newline at end of file
+    return assignments
+
+
+if __name__ == "__main__":
+    # Ejemplo de uso
+    import sys
+    
+    if len(sys.argv) > 2:
+        segments_file = sys.argv[1]
+        structure_file = sys.argv[2]
+        output_file = sys.argv[3] if len(sys.argv) > 3 else "segment_assignments.json"
+        process_segments_and_sections(segments_file, structure_file, output_file)
+    else:
+        print("Uso: python vectorizer.py <archivo_segmentos> <archivo_estructura> [archivo_salida]")
@@ -2,12 +2,18 @@
 Módulo de configuración para cargar variables de entorno
 
 Este módulo se encarga de cargar las variables de entorno desde un archivo .env
-y proporciona acceso centralizado a los parámetros de configuración.
+y proporciona acceso centralizado a los parámetros de configuración. La carga se
+realiza de forma perezosa la primera vez que se consulta un parámetro.
 """
 
 import os
+import queue
 import logging
+import functools
+from logging.handlers import QueueHandler, QueueListener
+from dataclasses import dataclass
 from pathlib import Path
+from typing import List
 from dotenv import load_dotenv
 
 # Configuración de logging
@@ -17,37 +23,133 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Cargar variables de entorno desde el archivo .env
-env_path = Path(__file__).resolve().parent.parent / '.env'
-if env_path.exists():
-    load_dotenv(dotenv_path=env_path)
-    logger.info(f"Variables de entorno cargadas desde {env_path}")
-else:
-    logger.warning(f"Archivo .env no encontrado en {env_path}")
-    load_dotenv()  # Intentar cargar desde el directorio actual
-
-# Configuración de APIs de IA
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
-ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-opus-20240229")
-
-# Configuración de directorios y formatos
-DEFAULT_OUTPUT_DIR = os.getenv("DEFAULT_OUTPUT_DIR", "output")
-DEFAULT_FORMATS = os.getenv("DEFAULT_FORMATS", "markdown,html").split(",")
-
-# Parámetros de procesamiento
-MAX_SEGMENT_LENGTH = int(os.getenv("MAX_SEGMENT_LENGTH", 1000))
-SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", 0.1))
-TOP_N_SECTIONS = int(os.getenv("TOP_N_SECTIONS", 3))
-
-# Configuración para deployment
-PORT = int(os.getenv("PORT", 5000))
-DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
-LOG_LEVEL = os.getenv("LOG_LEVEL", "info").upper()
-
-# Establecer nivel de log según configuración
-logging.getLogger().setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Parámetros de configuración de la aplicación leídos del entorno."""
+    
+    # Configuración de APIs de IA
+    OPENAI_API_KEY: str
+    ANTHROPIC_API_KEY: str
+    OPENAI_MODEL: str
+    ANTHROPIC_MODEL: str
+    
+    # Configuración de directorios y formatos
+    DEFAULT_OUTPUT_DIR: str
+    DEFAULT_FORMATS: List[str]
+    
+    # Parámetros de procesamiento
+    MAX_SEGMENT_LENGTH: int
+    SIMILARITY_THRESHOLD: float
+    TOP_N_SECTIONS: int
+    
+    # Parámetros de generación de contenido
+    MAX_CONCURRENT_REQUESTS: int
+    GENERATION_TEMPERATURE: float
+    MAX_PROMPT_TOKENS: int
+    MAX_SEGMENT_TOKENS: int
+    BATCH_POLL_INTERVAL: int
+    SECTION_GROUP_SIZE: int
+    STREAM_RESPONSES: bool
+    OPENAI_RPM: int
+    OPENAI_TPM: int
+    ANTHROPIC_RPM: int
+    ANTHROPIC_TPM: int
+    OPENAI_MAX_CONCURRENT: int
+    ANTHROPIC_MAX_CONCURRENT: int
+    
+    # Configuración para deployment
+    PORT: int
+    DEBUG_MODE: bool
+    LOG_LEVEL: str
+
+
+def start_queue_logging():
+    """
+    Desvía los registros de log a una cola que vacía un hilo en segundo plano.
+    
+    Los manejadores actuales del logger raíz pasan al hilo del listener, de modo
+    que las etapas que se ejecutan en paralelo no se bloquean escribiendo en la
+    consola. Se conserva el formato configurado con `logging.basicConfig`.
+    
+    Returns:
+        QueueListener: Listener en marcha; hay que llamar a `stop()` al terminar
+                       para escribir los registros pendientes.
+    """
+    root = logging.getLogger()
+    handlers = root.handlers or [logging.StreamHandler()]
+    log_queue = queue.SimpleQueue()
+    
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    root.handlers = [QueueHandler(log_queue)]
+    listener.start()
+    return listener
+
+
+def load_environment():
+    """Carga las variables de entorno desde el archivo .env."""
+    env_path = Path(__file__).resolve().parent.parent / '.env'
+    if env_path.exists():
+        load_dotenv(dotenv_path=env_path)
+        logger.info(f"Variables de entorno cargadas desde {env_path}")
+    else:
+        logger.warning(f"Archivo .env no encontrado en {env_path}")
+        load_dotenv()  # Intentar cargar desde el directorio actual
+
+
+@functools.cache
+def get_settings():
+    """
+    Carga el archivo .env y construye la configuración una única vez.
+    
+    Returns:
+        Settings: Configuración actual.
+    """
+    load_environment()
+    
+    settings = Settings(
+        OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", ""),
+        ANTHROPIC_API_KEY=os.getenv("ANTHROPIC_API_KEY", ""),
+        OPENAI_MODEL=os.getenv("OPENAI_MODEL", "gpt-4"),
+        ANTHROPIC_MODEL=os.getenv("ANTHROPIC_MODEL", "claude-3-opus-20240229"),
+        DEFAULT_OUTPUT_DIR=os.getenv("DEFAULT_OUTPUT_DIR", "output"),
+        DEFAULT_FORMATS=os.getenv("DEFAULT_FORMATS", "markdown,html").split(","),
+        MAX_SEGMENT_LENGTH=int(os.getenv("MAX_SEGMENT_LENGTH", 1000)),
+        SIMILARITY_THRESHOLD=float(os.getenv("SIMILARITY_THRESHOLD", 0.1)),
+        TOP_N_SECTIONS=int(os.getenv("TOP_N_SECTIONS", 3)),
+        MAX_CONCURRENT_REQUESTS=int(os.getenv("MAX_CONCURRENT_REQUESTS", 8)),
+        GENERATION_TEMPERATURE=float(os.getenv("GENERATION_TEMPERATURE", 0.5)),
+        MAX_PROMPT_TOKENS=int(os.getenv("MAX_PROMPT_TOKENS", 6000)),
+        MAX_SEGMENT_TOKENS=int(os.getenv("MAX_SEGMENT_TOKENS", 250)),
+        BATCH_POLL_INTERVAL=int(os.getenv("BATCH_POLL_INTERVAL", 30)),
+        SECTION_GROUP_SIZE=int(os.getenv("SECTION_GROUP_SIZE", 1)),
+        STREAM_RESPONSES=os.getenv("STREAM_RESPONSES", "true").lower() == "true",
+        OPENAI_RPM=int(os.getenv("OPENAI_RPM", 500)),
+        OPENAI_TPM=int(os.getenv("OPENAI_TPM", 30000)),
+        ANTHROPIC_RPM=int(os.getenv("ANTHROPIC_RPM", 50)),
+        ANTHROPIC_TPM=int(os.getenv("ANTHROPIC_TPM", 40000)),
+        OPENAI_MAX_CONCURRENT=int(os.getenv("OPENAI_MAX_CONCURRENT", 50)),
+        ANTHROPIC_MAX_CONCURRENT=int(os.getenv("ANTHROPIC_MAX_CONCURRENT", 20)),
+        PORT=int(os.getenv("PORT", 5000)),
+        DEBUG_MODE=os.getenv("DEBUG_MODE", "false").lower() == "true",
+        LOG_LEVEL=os.getenv("LOG_LEVEL", "info").upper()
+    )
+    
+    # Establecer nivel de log según configuración
+    logging.getLogger().setLevel(getattr(logging, settings.LOG_LEVEL, logging.INFO))
+    
+    return settings
+
+
+def __getattr__(name):
+    """
+    Expone los parámetros como constantes del módulo (p. ej. `config.OPENAI_MODEL`)
+    resolviéndolos bajo demanda a partir de `get_settings()`.
+    """
+    if name in Settings.__dataclass_fields__:
+        return getattr(get_settings(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def get_config_as_dict():
     """
@@ -56,20 +158,13 @@ def get_config_as_dict():
     Returns:
         dict: Configuración actual (con claves de API enmascaradas)
     """
+    settings = get_settings()
     config = {
-        "OPENAI_API_KEY": mask_api_key(OPENAI_API_KEY),
-        "ANTHROPIC_API_KEY": mask_api_key(ANTHROPIC_API_KEY),
-        "OPENAI_MODEL": OPENAI_MODEL,
-        "ANTHROPIC_MODEL": ANTHROPIC_MODEL,
-        "DEFAULT_OUTPUT_DIR": DEFAULT_OUTPUT_DIR,
-        "DEFAULT_FORMATS": DEFAULT_FORMATS,
-        "MAX_SEGMENT_LENGTH": MAX_SEGMENT_LENGTH,
-        "SIMILARITY_THRESHOLD": SIMILARITY_THRESHOLD,
-        "TOP_N_SECTIONS": TOP_N_SECTIONS,
-        "PORT": PORT,
-        "DEBUG_MODE": DEBUG_MODE,
-        "LOG_LEVEL": LOG_LEVEL
+        name: getattr(settings, name)
+        for name in Settings.__dataclass_fields__
     }
+    config["OPENAI_API_KEY"] = mask_api_key(settings.OPENAI_API_KEY)
+    config["ANTHROPIC_API_KEY"] = mask_api_key(settings.ANTHROPIC_API_KEY)
     return config
 
 def mask_api_key(key):
@@ -95,32 +190,25 @@ def validate_config():
     Returns:
         bool: True si la configuración es válida, False en caso contrario
     """
+    settings = get_settings()
     valid = True
     
     # Verificar claves de API
-    if not OPENAI_API_KEY and not ANTHROPIC_API_KEY:
+    if not settings.OPENAI_API_KEY and not settings.ANTHROPIC_API_KEY:
         logger.warning("No se ha configurado ninguna clave de API (OPENAI_API_KEY, ANTHROPIC_API_KEY)")
         valid = False
     
     # Verificar directorios
-    if not os.path.exists(DEFAULT_OUTPUT_DIR):
+    if not os.path.exists(settings.DEFAULT_OUTPUT_DIR):
         try:
-            os.makedirs(DEFAULT_OUTPUT_DIR)
-            logger.info(f"Directorio de salida creado: {DEFAULT_OUTPUT_DIR}")
+            os.makedirs(settings.DEFAULT_OUTPUT_DIR)
+            logger.info(f"Directorio de salida creado: {settings.DEFAULT_OUTPUT_DIR}")
         except Exception as e:
             logger.error(f"Error al crear directorio de salida: {e}")
             valid = False
     
     return valid
 
-# Validar configuración al importar el módulo
-if __name__ != "__main__":
-    config_valid = validate_config()
-    if config_valid:
-        logger.info("Configuración validada correctamente")
-    else:
-        logger.warning("Hay problemas con la configuración actual")
-
 if __name__ == "__main__":
     # Mostrar configuración actual (para debugging)
     import json
@@ -1,5 +1,24 @@
 """
 Módulos de generación de contenido.
+
+Las funciones se importan bajo demanda (PEP 562): importar un submódulo del
+paquete no carga los demás ni sus dependencias.
 """
-from generation.ai_client import process_content_for_report
-from generation.content_builder import build_report
\ No newline at end of file
+import importlib
+
+# Nombre exportado -> submódulo que lo define
+_EXPORTS = {
+    'process_content_for_report': 'generation.ai_client',
+    'build_report': 'generation.content_builder',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    """Importa el submódulo que define `name` la primera vez que se accede a él."""
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -6,30 +6,313 @@ y generar contenido coherente para cada sección del informe a partir de segment
 """
 
 import os
+import re
 import json
+import hashlib
 import time
+import asyncio
 import logging
+import contextlib
+import functools
+import operator
 import requests
+import aiohttp
+from requests.adapters import HTTPAdapter
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional, Union
+from tenacity import (
+    retry,
+    retry_if_exception,
+    wait_random_exponential,
+    stop_after_attempt,
+    before_sleep_log,
+)
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
 
 # Importar configuración desde el módulo centralizado
-from config import (
-    OPENAI_API_KEY, 
-    ANTHROPIC_API_KEY, 
-    OPENAI_MODEL, 
-    ANTHROPIC_MODEL,
-    TOP_N_SECTIONS,
-    SIMILARITY_THRESHOLD
-)
+from config import get_settings
+
+from generation import llm_cache
+from generation.rate_limiter import AsyncRateLimiter
+
+# Intentar importar tiktoken para estimar tokens con el tokenizador real
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Intentar importar orjson para leer y escribir JSON más rápido
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Configuración de logging
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=None)
+def get_token_encoder(model: str):
+    """
+    Obtiene (y cachea) el codificador de tiktoken para un modelo.
+    
+    Args:
+        model (str): Nombre del modelo.
+        
+    Returns:
+        tiktoken.Encoding o None: Codificador, o None si tiktoken no está disponible.
+    """
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            # Modelos desconocidos para tiktoken (p. ej. los de Anthropic): aproximación
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # tiktoken descarga los vocabularios la primera vez; sin red se usa la estimación
+        logger.warning(f"No se pudo cargar el tokenizador de {model}, se estimarán los tokens: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    """
+    Cuenta (o estima) los tokens de un texto para un modelo.
+    
+    Args:
+        text (str): Texto a medir.
+        model (str): Nombre del modelo.
+        
+    Returns:
+        int: Número de tokens; si tiktoken no está disponible, se estima como
+             un token cada 4 caracteres.
+    """
+    encoder = get_token_encoder(model)
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str) -> Tuple[str, int, bool]:
+    """
+    Recorta un texto a un número máximo de tokens.
+    
+    Args:
+        text (str): Texto a recortar.
+        max_tokens (int): Máximo de tokens a conservar.
+        model (str): Nombre del modelo.
+        
+    Returns:
+        tuple: (texto resultante, tokens que ocupa, True si se recortó). Sin tiktoken,
+               el recorte usa la misma estimación de 4 caracteres por token.
+    """
+    encoder = get_token_encoder(model)
+    if encoder is None:
+        n_tokens = len(text) // 4 + 1
+        if n_tokens <= max_tokens:
+            return text, n_tokens, False
+        return text[:max_tokens * 4], max_tokens, True
+    
+    tokens = encoder.encode(text)
+    if len(tokens) <= max_tokens:
+        return text, len(tokens), False
+    return encoder.decode(tokens[:max_tokens]), max_tokens, True
+
+
+# Códigos HTTP transitorios que justifican reintentar la solicitud
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_RETRY_ATTEMPTS = 6
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Interpreta la cabecera Retry-After expresada en segundos.
+    
+    Args:
+        value (str, optional): Valor de la cabecera.
+        
+    Returns:
+        float o None: Segundos a esperar, o None si no hay un valor numérico válido.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        # Retry-After también admite fechas HTTP; en ese caso basta el backoff exponencial
+        return None
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """
+    Obtiene la espera indicada por la cabecera Retry-After de un error HTTP.
+    
+    Args:
+        error (BaseException): Excepción lanzada por la solicitud.
+        
+    Returns:
+        float o None: Segundos a esperar, o None si el error no trae la cabecera.
+    """
+    if isinstance(error, aiohttp.ClientResponseError):
+        headers = error.headers
+    elif isinstance(error, requests.HTTPError) and error.response is not None:
+        headers = error.response.headers
+    else:
+        return None
+    return parse_retry_after(headers.get("Retry-After")) if headers else None
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """
+    Indica si un error de la API es transitorio (429, 5xx, timeout o conexión).
+    
+    Args:
+        error (BaseException): Excepción lanzada por la solicitud.
+        
+    Returns:
+        bool: True si la solicitud debe reintentarse.
+    """
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in RETRYABLE_STATUS_CODES
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (
+        asyncio.TimeoutError,
+        aiohttp.ClientConnectionError,
+        requests.ConnectionError,
+        requests.Timeout,
+    ))
+
+
+# Tamaño del pool de conexiones de la sesión síncrona y tiempo máximo de espera (s)
+# de cada solicitud síncrona
+HTTP_POOL_SIZE = 32
+HTTP_TIMEOUT = 120
+
+# Ventana de contexto y máximo de tokens de respuesta de cada familia de modelos,
+# por prefijo del nombre (se usa el primero que coincide, así que los prefijos más
+# específicos van antes)
+MODEL_TOKEN_LIMITS = [
+    ("gpt-4o", 128000, 16384),
+    ("gpt-4-turbo", 128000, 4096),
+    ("gpt-4-1106", 128000, 4096),
+    ("gpt-4-0125", 128000, 4096),
+    ("gpt-4-32k", 32768, 8192),
+    ("gpt-4", 8192, 8192),
+    ("gpt-3.5-turbo", 16385, 4096),
+    ("claude-3-5", 200000, 8192),
+    ("claude-3", 200000, 4096),
+]
+
+# Mínimo de tokens de respuesta por sección para que agrupar secciones compense
+MIN_GROUP_SECTION_TOKENS = 500
+
+
+def get_model_token_limits(model: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Obtiene la ventana de contexto y el máximo de tokens de respuesta de un modelo.
+    
+    Args:
+        model (str): Nombre del modelo.
+    
+    Returns:
+        tuple: (ventana de contexto, máximo de respuesta), o (None, None) si el
+               modelo no está en MODEL_TOKEN_LIMITS.
+    """
+    for prefix, context_window, max_output in MODEL_TOKEN_LIMITS:
+        if model.startswith(prefix):
+            return context_window, max_output
+    return None, None
+
+
+def response_token_limit(client: Union["AIClient", "AIClientPool"], prompt_tokens: int) -> int:
+    """
+    Calcula el máximo de tokens de respuesta que admite una solicitud.
+    
+    El límite es el menor entre el máximo de respuesta del modelo y lo que queda de
+    su ventana de contexto tras el prompt. Con un pool se toma el mínimo de todos sus
+    clientes, porque la solicitud puede acabar en cualquiera. Para los modelos que no
+    están en MODEL_TOKEN_LIMITS se usa el `max_tokens` del cliente.
+    
+    Args:
+        client (AIClient o AIClientPool): Cliente o pool de clientes de API de IA.
+        prompt_tokens (int): Tokens del prompt.
+    
+    Returns:
+        int: Máximo de tokens de respuesta (puede ser 0 o negativo si el prompt no cabe).
+    """
+    limits = []
+    for member in getattr(client, 'clients', [client]):
+        context_window, max_output = get_model_token_limits(member.model)
+        if context_window is None:
+            limits.append(member.max_tokens)
+        else:
+            limits.append(min(max_output, context_window - prompt_tokens))
+    return min(limits)
+
+
+def max_group_size(client: Union["AIClient", "AIClientPool"], group_size: int) -> int:
+    """
+    Reduce SECTION_GROUP_SIZE hasta que cada sección del grupo tenga respuesta suficiente.
+    
+    La respuesta de un grupo comparte el límite de un único prompt de hasta
+    MAX_PROMPT_TOKENS, así que cada sección recibe una fracción; si baja de
+    MIN_GROUP_SECTION_TOKENS, el grupo se achica (hasta 1, sin agrupar).
+    
+    Args:
+        client (AIClient o AIClientPool): Cliente o pool de clientes de API de IA.
+        group_size (int): Tamaño de grupo configurado.
+    
+    Returns:
+        int: Tamaño de grupo utilizable.
+    """
+    limit = response_token_limit(client, get_settings().MAX_PROMPT_TOKENS)
+    size = max(1, min(group_size, limit // MIN_GROUP_SECTION_TOKENS))
+    if size < group_size:
+        logger.warning(f"SECTION_GROUP_SIZE={group_size} no cabe en los límites de {client.model} "
+                       f"({limit} tokens de respuesta para un prompt de {get_settings().MAX_PROMPT_TOKENS}); "
+                       f"se usan grupos de {size}")
+    return size
+
+_wait_exponential = wait_random_exponential(min=1, max=60)
+
+
+def wait_retry_after(retry_state) -> float:
+    """
+    Espera entre reintentos: la que pide el servidor con Retry-After o, si no la
+    indica, backoff exponencial con jitter.
+    
+    Args:
+        retry_state (tenacity.RetryCallState): Estado del reintento en curso.
+        
+    Returns:
+        float: Segundos a esperar antes del siguiente intento.
+    """
+    error = retry_state.outcome.exception() if retry_state.outcome is not None else None
+    retry_after = get_retry_after(error) if error is not None else None
+    if retry_after is not None:
+        return retry_after
+    return _wait_exponential(retry_state)
+
+
+# Reintentos con backoff exponencial y jitter para errores transitorios de la API
+retry_transient_errors = retry(
+    retry=retry_if_exception(is_retryable_error),
+    wait=wait_retry_after,
+    stop=stop_after_attempt(MAX_RETRY_ATTEMPTS),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True,
+)
+
+
 class AIClient(ABC):
     """Clase base abstracta para clientes de APIs de IA."""
     
+    api_base: str
+    headers: Dict[str, str]
+    
     @abstractmethod
     def generate_text(self, prompt: str) -> str:
         """
@@ -43,6 +326,50 @@ class AIClient(ABC):
         """
         pass
     
+    # Máximo de tokens de respuesta por defecto de cada proveedor
+    max_tokens: int
+    
+    @abstractmethod
+    def build_request_data(self, prompt: str, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Construye el cuerpo de la solicitud a la API para un prompt.
+        
+        Args:
+            prompt (str): Instrucción o contexto para la generación.
+            max_tokens (int, optional): Máximo de tokens de respuesta. Por defecto,
+                                        el del cliente (`max_tokens`).
+            
+        Returns:
+            dict: Cuerpo JSON de la solicitud.
+        """
+        pass
+    
+    @abstractmethod
+    def extract_text(self, response_data: Dict[str, Any]) -> str:
+        """
+        Extrae el texto generado de la respuesta de la API.
+        
+        Args:
+            response_data (dict): Respuesta JSON de la API.
+            
+        Returns:
+            str: Texto generado.
+        """
+        pass
+    
+    @abstractmethod
+    def extract_stream_delta(self, event: Dict[str, Any]) -> str:
+        """
+        Extrae el fragmento de texto de un evento SSE de una respuesta en streaming.
+        
+        Args:
+            event (dict): Evento JSON recibido en una línea `data:`.
+            
+        Returns:
+            str: Texto del fragmento ('' si el evento no aporta texto).
+        """
+        pass
+    
     @abstractmethod
     def get_api_info(self) -> Dict[str, Any]:
         """
@@ -52,11 +379,264 @@ class AIClient(ABC):
             dict: Información de la API.
         """
         pass
+    
+    def get_session(self) -> aiohttp.ClientSession:
+        """
+        Obtiene la sesión HTTP del cliente, creándola si no existe.
+        
+        La sesión mantiene un pool de conexiones persistentes, por lo que las
+        solicitudes sucesivas no repiten el handshake TCP/TLS. Debe llamarse
+        desde dentro del bucle de eventos en el que se usará.
+        
+        Returns:
+            aiohttp.ClientSession: Sesión HTTP compartida.
+        """
+        session = getattr(self, '_session', None)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=64, limit_per_host=64, keepalive_timeout=75)
+            session = aiohttp.ClientSession(connector=connector)
+            self._session = session
+        return session
+    
+    def get_http_session(self) -> requests.Session:
+        """
+        Obtiene la sesión de requests del cliente para las llamadas síncronas.
+        
+        Equivalente síncrono de `get_session`: reutiliza las conexiones entre
+        llamadas sucesivas en lugar de abrir una nueva en cada `requests.post`.
+        Los reintentos los gestiona `retry_transient_errors`, por lo que el
+        adaptador no reintenta por su cuenta.
+        
+        Returns:
+            requests.Session: Sesión HTTP compartida.
+        """
+        http_session = getattr(self, '_http_session', None)
+        if http_session is None:
+            http_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            http_session.mount("https://", adapter)
+            http_session.mount("http://", adapter)
+            self._http_session = http_session
+        return http_session
+    
+    async def close(self) -> None:
+        """Cierra las sesiones HTTP del cliente si están abiertas."""
+        session = getattr(self, '_session', None)
+        if session is not None and not session.closed:
+            await session.close()
+        self._session = None
+        
+        http_session = getattr(self, '_http_session', None)
+        if http_session is not None:
+            http_session.close()
+        self._http_session = None
+    
+    def lookup_cache(self, data: Dict[str, Any], prompt: str) -> Tuple[str, Optional[str]]:
+        """
+        Busca la respuesta de una solicitud en la caché exacta y, si falla, en la semántica.
+        
+        Args:
+            data (dict): Cuerpo JSON de la solicitud.
+            prompt (str): Prompt de la solicitud.
+            
+        Returns:
+            tuple: (clave exacta de la solicitud, texto cacheado o None).
+        """
+        cache_key = llm_cache.make_key(data)
+        cached_text = llm_cache.get(cache_key)
+        if cached_text is None:
+            semantic_parts = split_semantic_prompt(prompt)
+            if semantic_parts is not None:
+                cached_text = llm_cache.get_similar(data, *semantic_parts)
+        return cache_key, cached_text
+    
+    def store_cache(self, cache_key: str, data: Dict[str, Any], prompt: str, text: str) -> None:
+        """
+        Guarda una respuesta en la caché exacta y registra su prompt en la semántica.
+        
+        Args:
+            cache_key (str): Clave exacta de la solicitud.
+            data (dict): Cuerpo JSON de la solicitud.
+            prompt (str): Prompt de la solicitud.
+            text (str): Texto generado.
+        """
+        llm_cache.set(cache_key, text)
+        semantic_parts = split_semantic_prompt(prompt)
+        if semantic_parts is not None:
+            llm_cache.add_similar(data, *semantic_parts, cache_key)
+    
+    async def generate_text_async(self, prompt: str, session: Optional[aiohttp.ClientSession] = None,
+                                  max_tokens: Optional[int] = None,
+                                  validate: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Genera texto de forma asíncrona usando una sesión HTTP compartida.
+        
+        Args:
+            prompt (str): Instrucción o contexto para la generación.
+            session (aiohttp.ClientSession, optional): Sesión HTTP a utilizar. Si no
+                                                       se proporciona, se usa la del cliente.
+            max_tokens (int, optional): Máximo de tokens de respuesta. Por defecto,
+                                        el del cliente.
+            validate (callable, optional): Comprueba si una respuesta es utilizable.
+                                           Las que no lo son se devuelven igualmente,
+                                           pero no se guardan en la caché, y una
+                                           respuesta cacheada que no la supera se
+                                           vuelve a solicitar.
+            
+        Returns:
+            str: Texto generado.
+            
+        Raises:
+            Exception: Si hay un error en la llamada a la API.
+        """
+        provider = self.get_api_info()['provider']
+        data = self.build_request_data(prompt, max_tokens)
+        session = session or self.get_session()
+        
+        # Reutilizar la respuesta si esta misma solicitud (o una equivalente) ya se hizo.
+        # La búsqueda semántica calcula embeddings, así que se saca del bucle de eventos
+        cache_key, cached_text = await asyncio.to_thread(self.lookup_cache, data, prompt)
+        if cached_text is not None and (validate is None or validate(cached_text)):
+            logger.debug(f"Respuesta de {provider} obtenida de la caché")
+            return cached_text
+        
+        # Si una solicitud idéntica ya está en curso se espera su resultado en lugar de
+        # enviar otra; shield evita que cancelar a un solicitante cancele a los demás
+        inflight = self._get_inflight()
+        task = inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._request_text_async(session, data, prompt, cache_key, validate))
+            inflight[cache_key] = task
+            task.add_done_callback(lambda _: inflight.pop(cache_key, None))
+        else:
+            llm_cache.stats["inflight_hits"] += 1
+            logger.debug(f"Solicitud idéntica a {provider} en curso, se reutilizará su respuesta")
+        return await asyncio.shield(task)
+    
+    def _get_inflight(self) -> Dict[str, asyncio.Future]:
+        """Obtiene las solicitudes en curso del cliente, indexadas por clave de caché."""
+        inflight = getattr(self, '_inflight', None)
+        if inflight is None:
+            inflight = self._inflight = {}
+        return inflight
+    
+    async def _request_text_async(self, session: aiohttp.ClientSession, data: Dict[str, Any],
+                                  prompt: str, cache_key: str,
+                                  validate: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Envía una solicitud a la API y guarda la respuesta en la caché.
+        
+        Args:
+            session (aiohttp.ClientSession): Sesión HTTP a utilizar.
+            data (dict): Cuerpo JSON de la solicitud.
+            prompt (str): Prompt de la solicitud.
+            cache_key (str): Clave exacta de la solicitud.
+            validate (callable, optional): Si la respuesta no la supera, no se cachea.
+            
+        Returns:
+            str: Texto generado.
+        """
+        provider = self.get_api_info()['provider']
+        try:
+            logger.debug(f"Enviando solicitud a {provider} (longitud prompt: {len(prompt)} caracteres)")
+            text = await self._post_async(session, data, count_tokens(prompt, self.model))
+            logger.debug(f"Respuesta recibida correctamente de {provider}")
+            if validate is None or validate(text):
+                await asyncio.to_thread(self.store_cache, cache_key, data, prompt, text)
+            return text
+        
+        except Exception as e:
+            logger.error(f"Error en la llamada a la API de {provider}: {e}")
+            raise
+    
+    @retry_transient_errors
+    async def _post_async(self, session: aiohttp.ClientSession, data: Dict[str, Any], prompt_tokens: int) -> str:
+        """
+        Envía una solicitud a la API, reintentando ante errores transitorios.
+        
+        Con STREAM_RESPONSES activo la respuesta se pide en streaming (SSE) y el
+        texto se reconstruye a partir de los fragmentos recibidos. El indicador
+        `stream` se añade solo al cuerpo enviado, de modo que no altera la clave
+        de caché calculada a partir de `data`.
+        
+        Args:
+            session (aiohttp.ClientSession): Sesión HTTP a utilizar.
+            data (dict): Cuerpo JSON de la solicitud.
+            prompt_tokens (int): Tokens del prompt, para el limitador de tasa.
+            
+        Returns:
+            str: Texto generado.
+        """
+        # Respetar los límites RPM/TPM del proveedor (prompt + tokens de respuesta);
+        # cada reintento consume capacidad igual que la solicitud original
+        rate_limiter = getattr(self, 'rate_limiter', None)
+        if rate_limiter is not None:
+            await rate_limiter.acquire(prompt_tokens + data.get('max_tokens', 0))
+        
+        stream = get_settings().STREAM_RESPONSES
+        payload = {**data, "stream": True} if stream else data
+        
+        async with session.post(self.api_base, headers=self.headers, json=payload) as response:
+            if response.status >= 400:
+                logger.warning(f"Detalles: {await response.text()}")
+            # La espera de Retry-After la aplica `retry_transient_errors` a partir del error
+            response.raise_for_status()
+            if not stream:
+                return self.extract_text(await response.json())
+            return await self._read_stream(response)
+    
+    async def _read_stream(self, response: aiohttp.ClientResponse) -> str:
+        """
+        Lee una respuesta SSE y concatena los fragmentos de texto.
+        
+        Args:
+            response (aiohttp.ClientResponse): Respuesta abierta con `stream: True`.
+            
+        Returns:
+            str: Texto generado completo.
+        """
+        loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+        # Los fragmentos se acumulan en una lista y se unen al final (evita el coste
+        # cuadrático de concatenar cadenas)
+        parts = []
+        # Iterar por líneas: un evento SSE puede llegar partido entre varios chunks
+        async for line in response.content:
+            line = line.strip()
+            if not line.startswith(b"data:"):
+                continue
+            payload = line[5:].strip()
+            if payload == b"[DONE]":
+                break
+            delta = self.extract_stream_delta(loads(payload))
+            if delta:
+                parts.append(delta)
+        return "".join(parts).strip()
+    
+    @retry_transient_errors
+    def _post_sync(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Versión síncrona de `_post_async` basada en requests.
+        
+        Args:
+            data (dict): Cuerpo JSON de la solicitud.
+            
+        Returns:
+            dict: Respuesta JSON de la API.
+        """
+        response = self.get_http_session().post(
+            self.api_base, headers=self.headers, json=data, timeout=HTTP_TIMEOUT
+        )
+        if response.status_code >= 400:
+            logger.warning(f"Detalles: {response.text}")
+        response.raise_for_status()
+        return response.json()
 
 
 class OpenAIClient(AIClient):
     """Cliente para la API de OpenAI."""
     
+    max_tokens = 2000
+    
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
         """
         Inicializa el cliente de OpenAI.
@@ -67,18 +647,39 @@ class OpenAIClient(AIClient):
             model (str, optional): Modelo de OpenAI a utilizar. Si no se proporciona,
                                    se usa la configuración de OPENAI_MODEL.
         """
-        self.api_key = api_key or OPENAI_API_KEY
+        self.api_key = api_key or get_settings().OPENAI_API_KEY
         if not self.api_key:
             raise ValueError("Se requiere una API key de OpenAI. Configúrala en el archivo .env")
         
-        self.model = model or OPENAI_MODEL
+        self.model = model or get_settings().OPENAI_MODEL
         self.api_base = "https://api.openai.com/v1/chat/completions"
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
         }
+        self.rate_limiter = AsyncRateLimiter(get_settings().OPENAI_RPM, get_settings().OPENAI_TPM)
         logger.info(f"Cliente OpenAI inicializado con modelo: {self.model}")
     
+    def build_request_data(self, prompt: str, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Construye el cuerpo de la solicitud a la API de OpenAI."""
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": get_settings().GENERATION_TEMPERATURE,
+            "max_tokens": max_tokens or self.max_tokens
+        }
+    
+    def extract_text(self, response_data: Dict[str, Any]) -> str:
+        """Extrae el texto generado de una respuesta de OpenAI."""
+        return response_data["choices"][0]["message"]["content"].strip()
+    
+    def extract_stream_delta(self, event: Dict[str, Any]) -> str:
+        """Extrae el fragmento de texto de un evento SSE de OpenAI."""
+        choices = event.get("choices")
+        if not choices:
+            return ""
+        return choices[0].get("delta", {}).get("content") or ""
+    
     def generate_text(self, prompt: str) -> str:
         """
         Genera texto usando la API de OpenAI.
@@ -92,30 +693,23 @@ class OpenAIClient(AIClient):
         Raises:
             Exception: Si hay un error en la llamada a la API.
         """
-        data = {
-            "model": self.model,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.5,
-            "max_tokens": 2000
-        }
+        data = self.build_request_data(prompt)
+        
+        cache_key, cached_text = self.lookup_cache(data, prompt)
+        if cached_text is not None:
+            logger.debug("Respuesta de OpenAI obtenida de la caché")
+            return cached_text
         
         try:
             logger.debug(f"Enviando solicitud a OpenAI (longitud prompt: {len(prompt)} caracteres)")
-            response = requests.post(
-                self.api_base,
-                headers=self.headers,
-                json=data
-            )
-            response.raise_for_status()
-            
-            response_data = response.json()
+            response_data = self._post_sync(data)
             logger.debug("Respuesta recibida correctamente de OpenAI")
-            return response_data["choices"][0]["message"]["content"].strip()
+            text = self.extract_text(response_data)
+            self.store_cache(cache_key, data, prompt, text)
+            return text
         
         except Exception as e:
             logger.error(f"Error en la llamada a la API de OpenAI: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                logger.error(f"Detalles: {e.response.text}")
             raise
     
     def get_api_info(self) -> Dict[str, Any]:
@@ -135,6 +729,8 @@ class OpenAIClient(AIClient):
 class AnthropicClient(AIClient):
     """Cliente para la API de Anthropic (Claude)."""
     
+    max_tokens = 4000
+    
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
         """
         Inicializa el cliente de Anthropic.
@@ -145,19 +741,41 @@ class AnthropicClient(AIClient):
             model (str, optional): Modelo de Anthropic a utilizar. Si no se proporciona,
                                    se usa la configuración de ANTHROPIC_MODEL.
         """
-        self.api_key = api_key or ANTHROPIC_API_KEY
+        self.api_key = api_key or get_settings().ANTHROPIC_API_KEY
         if not self.api_key:
             raise ValueError("Se requiere una API key de Anthropic. Configúrala en el archivo .env")
         
-        self.model = model or ANTHROPIC_MODEL
+        self.model = model or get_settings().ANTHROPIC_MODEL
         self.api_base = "https://api.anthropic.com/v1/messages"
         self.headers = {
             "Content-Type": "application/json",
             "anthropic-version": "2023-06-01",
             "x-api-key": self.api_key
         }
+        self.rate_limiter = AsyncRateLimiter(get_settings().ANTHROPIC_RPM, get_settings().ANTHROPIC_TPM)
         logger.info(f"Cliente Anthropic inicializado con modelo: {self.model}")
     
+    def build_request_data(self, prompt: str, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Construye el cuerpo de la solicitud a la API de Anthropic."""
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": get_settings().GENERATION_TEMPERATURE,
+            "max_tokens": max_tokens or self.max_tokens
+        }
+    
+    def extract_text(self, response_data: Dict[str, Any]) -> str:
+        """Extrae el texto generado de una respuesta de Anthropic."""
+        return response_data["content"][0]["text"].strip()
+    
+    def extract_stream_delta(self, event: Dict[str, Any]) -> str:
+        """Extrae el fragmento de texto de un evento SSE de Anthropic."""
+        if event.get("type") == "error":
+            raise RuntimeError(f"Error en el streaming de Anthropic: {event.get('error')}")
+        if event.get("type") != "content_block_delta":
+            return ""
+        return event.get("delta", {}).get("text") or ""
+    
     def generate_text(self, prompt: str) -> str:
         """
         Genera texto usando la API de Anthropic.
@@ -171,30 +789,23 @@ class AnthropicClient(AIClient):
         Raises:
             Exception: Si hay un error en la llamada a la API.
         """
-        data = {
-            "model": self.model,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.5,
-            "max_tokens": 4000
-        }
+        data = self.build_request_data(prompt)
+        
+        cache_key, cached_text = self.lookup_cache(data, prompt)
+        if cached_text is not None:
+            logger.debug("Respuesta de Anthropic obtenida de la caché")
+            return cached_text
         
         try:
             logger.debug(f"Enviando solicitud a Anthropic (longitud prompt: {len(prompt)} caracteres)")
-            response = requests.post(
-                self.api_base,
-                headers=self.headers,
-                json=data
-            )
-            response.raise_for_status()
-            
-            response_data = response.json()
+            response_data = self._post_sync(data)
             logger.debug("Respuesta recibida correctamente de Anthropic")
-            return response_data["content"][0]["text"].strip()
+            text = self.extract_text(response_data)
+            self.store_cache(cache_key, data, prompt, text)
+            return text
         
         except Exception as e:
             logger.error(f"Error en la llamada a la API de Anthropic: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                logger.error(f"Detalles: {e.response.text}")
             raise
     
     def get_api_info(self) -> Dict[str, Any]:
@@ -211,55 +822,286 @@ class AnthropicClient(AIClient):
         }
 
 
-def create_section_prompt(section: Dict[str, Any], segments: List[Dict[str, Any]]) -> str:
+# Estados en los que un lote de la Batch API ya no avanza
+BATCH_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchOpenAIClient(OpenAIClient):
     """
-    Crea un prompt para la generación de contenido de una sección.
+    Cliente para la Batch API de OpenAI.
     
-    Args:
-        section (dict): Información de la sección.
-        segments (list): Lista de segmentos relevantes para la sección.
-        
-    Returns:
-        str: Prompt para la API de IA.
+    Envía todas las solicitudes en un único lote que se procesa de forma diferida
+    (hasta 24 h) a mitad de precio y sin consumir los límites RPM/TPM del endpoint
+    síncrono. Las llamadas individuales (`generate_text`) siguen usando la API normal.
     """
-    # Información básica de la sección
-    section_info = f"""
-# Información de la sección
-- Título: {section['titulo']}
-- ID: {section['id']}
-- Nivel: {section['nivel']}
-- Ruta: {section['path']}
-"""
     
-    if 'descripcion' in section and section['descripcion']:
-        section_info += f"- Descripción: {section['descripcion']}\n"
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None,
+                 poll_interval: Optional[int] = None):
+        """
+        Inicializa el cliente de la Batch API de OpenAI.
+        
+        Args:
+            api_key (str, optional): API key para OpenAI.
+            model (str, optional): Modelo de OpenAI a utilizar.
+            poll_interval (int, optional): Segundos entre consultas del estado del lote.
+                                           Por defecto, BATCH_POLL_INTERVAL.
+        """
+        super().__init__(api_key, model)
+        self.api_root = "https://api.openai.com/v1"
+        self.poll_interval = poll_interval or get_settings().BATCH_POLL_INTERVAL
     
-    if 'palabras_clave' in section and section['palabras_clave']:
-        section_info += f"- Palabras clave: {', '.join(section['palabras_clave'])}\n"
+    @retry_transient_errors
+    def _batch_request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Realiza una solicitud a los endpoints de archivos/lotes, reintentando errores transitorios.
+        
+        Args:
+            method (str): Método HTTP.
+            path (str): Ruta relativa a la raíz de la API (p. ej. "/batches").
+            **kwargs: Argumentos adicionales para requests.request.
+            
+        Returns:
+            requests.Response: Respuesta correcta de la API.
+        """
+        headers = {"Authorization": self.headers["Authorization"]}
+        headers.update(kwargs.pop("headers", {}))
+        kwargs.setdefault("timeout", HTTP_TIMEOUT)
+        response = self.get_http_session().request(method, f"{self.api_root}{path}", headers=headers, **kwargs)
+        if response.status_code >= 400:
+            logger.warning(f"Detalles: {response.text}")
+        response.raise_for_status()
+        return response
     
-    # Extraer y formatear el contenido de los segmentos
-    segments_text = ""
-    if segments:
-        segments_text = "# Segmentos relevantes encontrados en las transcripciones\n\n"
-        
-        # Ordenar segmentos por score de similitud (de mayor a menor)
-        sorted_segments = sorted(segments, key=lambda x: x.get('similarity_score', 0), reverse=True)
-        
-        for i, segment in enumerate(sorted_segments):
-            # Truncar texto muy largo para el prompt
-            text = segment['text']
-            if len(text) > 1000:  # Limitar segmentos muy largos
-                text = text[:1000] + "... [truncado]"
+    def build_batch_file(self, prompts: Dict[str, str]) -> bytes:
+        """
+        Construye el archivo JSONL de entrada del lote.
+        
+        Args:
+            prompts (dict): Prompts a enviar {custom_id: prompt}.
             
-            segments_text += f"## Segmento {i+1}\n"
-            if 'timestamp' in segment:
-                segments_text += f"Timestamp: {segment['timestamp'].get('start', '')} - {segment['timestamp'].get('end', '')}\n"
-            segments_text += f"Texto: {text}\n\n"
-    else:
-        segments_text = "# No se encontraron segmentos relevantes en las transcripciones para esta sección.\n"
+        Returns:
+            bytes: Contenido JSONL, una solicitud por línea.
+        """
+        lines = [
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self.build_request_data(prompt)
+            }, ensure_ascii=False)
+            for custom_id, prompt in prompts.items()
+        ]
+        return ("\n".join(lines) + "\n").encode("utf-8")
     
-    # Crear el prompt completo
-    prompt = f"""
+    def run_batch(self, prompts: Dict[str, str]) -> Dict[str, Union[str, Exception]]:
+        """
+        Envía un lote de prompts, espera a que termine y descarga los resultados.
+        
+        Args:
+            prompts (dict): Prompts a enviar {custom_id: prompt}.
+            
+        Returns:
+            dict: {custom_id: texto generado, o la excepción si esa solicitud falló}.
+            
+        Raises:
+            RuntimeError: Si el lote falla o se cancela.
+        """
+        upload = self._batch_request(
+            "POST", "/files",
+            data={"purpose": "batch"},
+            files={"file": ("requests.jsonl", self.build_batch_file(prompts), "application/jsonl")}
+        ).json()
+        
+        batch = self._batch_request(
+            "POST", "/batches",
+            json={
+                "input_file_id": upload["id"],
+                "endpoint": "/v1/chat/completions",
+                "completion_window": "24h"
+            }
+        ).json()
+        logger.info(f"Lote {batch['id']} creado con {len(prompts)} solicitudes")
+        
+        while batch["status"] not in BATCH_FINAL_STATUSES:
+            time.sleep(self.poll_interval)
+            batch = self._batch_request("GET", f"/batches/{batch['id']}").json()
+            counts = batch.get("request_counts") or {}
+            logger.info(f"Lote {batch['id']}: {batch['status']} "
+                        f"({counts.get('completed', 0)}/{counts.get('total', len(prompts))} completadas)")
+        
+        # Un lote caducado conserva los resultados de las solicitudes que sí terminaron
+        if batch["status"] not in ("completed", "expired"):
+            raise RuntimeError(f"El lote {batch['id']} terminó con estado '{batch['status']}': {batch.get('errors')}")
+        
+        results = {}
+        for file_id in (batch.get("output_file_id"), batch.get("error_file_id")):
+            if not file_id:
+                continue
+            content = self._batch_request("GET", f"/files/{file_id}/content").text
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                if response.get("status_code") == 200:
+                    results[entry["custom_id"]] = self.extract_text(response["body"])
+                else:
+                    error = entry.get("error") or (response.get("body") or {}).get("error")
+                    results[entry["custom_id"]] = RuntimeError(f"Error en la solicitud del lote: {error}")
+        
+        for custom_id in prompts:
+            results.setdefault(custom_id, RuntimeError(f"La solicitud no figura en la salida del lote {batch['id']}"))
+        return results
+
+
+# Segundos durante los que un cliente del pool que acaba de fallar pasa al final
+# del orden de preferencia
+POOL_FAILURE_COOLDOWN = 60
+
+
+class AIClientPool:
+    """
+    Pool de clientes de varios proveedores con reparto de carga y failover.
+    
+    Cada solicitud se envía al cliente con menor ocupación relativa (solicitudes en
+    curso / límite de concurrencia) y, si falla (tras agotar sus propios reintentos),
+    se repite con el siguiente. Un cliente que falla queda relegado durante
+    POOL_FAILURE_COOLDOWN segundos, de modo que una caída de un proveedor a mitad
+    de la ejecución no penaliza a las secciones siguientes.
+    """
+    
+    def __init__(self, clients: List[Tuple[AIClient, int]]):
+        """
+        Inicializa el pool.
+        
+        Args:
+            clients (list): Tuplas (cliente, máximo de solicitudes simultáneas), en
+                            orden de preferencia.
+                            
+        Raises:
+            ValueError: Si no se proporciona ningún cliente.
+        """
+        if not clients:
+            raise ValueError("El pool de clientes de IA necesita al menos un cliente")
+        
+        self.clients = [client for client, _ in clients]
+        self.limits = [limit for _, limit in clients]
+        self.semaphores = [asyncio.Semaphore(limit) for limit in self.limits]
+        self.inflight = [0] * len(clients)
+        self.failed_until = [0.0] * len(clients)
+        # El modelo del cliente preferente se usa para presupuestar los prompts
+        self.model = self.clients[0].model
+        self.max_tokens = min(client.max_tokens for client in self.clients)
+        self.capacity = sum(self.limits)
+    
+    def _candidates(self) -> List[int]:
+        """
+        Ordena los clientes por preferencia para la siguiente solicitud.
+        
+        Returns:
+            list: Índices de los clientes; primero los disponibles, de menor a mayor ocupación.
+        """
+        now = time.monotonic()
+        return sorted(
+            range(len(self.clients)),
+            key=lambda i: (self.failed_until[i] > now, self.inflight[i] / self.limits[i])
+        )
+    
+    def _mark_failed(self, index: int, error: Exception) -> None:
+        """Relega temporalmente un cliente que ha fallado."""
+        self.failed_until[index] = time.monotonic() + POOL_FAILURE_COOLDOWN
+        provider = get_shared_api_info(self.clients[index])['provider']
+        logger.warning(f"Fallo en {provider}, se intentará con otro proveedor: {error}")
+    
+    async def generate_text_with_client_async(self, prompt: str, max_tokens: Optional[int] = None,
+                                              validate: Optional[Callable[[str], bool]] = None
+                                              ) -> Tuple[str, AIClient]:
+        """
+        Genera texto con el cliente menos ocupado, pasando al siguiente si falla.
+        
+        Args:
+            prompt (str): Instrucción o contexto para la generación.
+            max_tokens (int, optional): Máximo de tokens de respuesta.
+            validate (callable, optional): Comprobación de la respuesta antes de
+                                           cachearla (ver `AIClient.generate_text_async`).
+            
+        Returns:
+            tuple: (texto generado, cliente que lo generó).
+            
+        Raises:
+            Exception: El error del último cliente si fallan todos.
+        """
+        last_error = None
+        for index in self._candidates():
+            self.inflight[index] += 1
+            try:
+                async with self.semaphores[index]:
+                    text = await self.clients[index].generate_text_async(prompt, max_tokens=max_tokens,
+                                                                         validate=validate)
+                    return text, self.clients[index]
+            except Exception as e:
+                self._mark_failed(index, e)
+                last_error = e
+            finally:
+                self.inflight[index] -= 1
+        raise last_error
+    
+    def generate_text_with_client(self, prompt: str) -> Tuple[str, AIClient]:
+        """
+        Versión síncrona de `generate_text_with_client_async` (solo failover, sin reparto de carga).
+        
+        Args:
+            prompt (str): Instrucción o contexto para la generación.
+            
+        Returns:
+            tuple: (texto generado, cliente que lo generó).
+            
+        Raises:
+            Exception: El error del último cliente si fallan todos.
+        """
+        last_error = None
+        for index in self._candidates():
+            try:
+                return self.clients[index].generate_text(prompt), self.clients[index]
+            except Exception as e:
+                self._mark_failed(index, e)
+                last_error = e
+        raise last_error
+    
+    async def generate_text_async(self, prompt: str, max_tokens: Optional[int] = None,
+                                  validate: Optional[Callable[[str], bool]] = None) -> str:
+        """Genera texto con el pool y devuelve solo el texto."""
+        text, _ = await self.generate_text_with_client_async(prompt, max_tokens, validate)
+        return text
+    
+    def generate_text(self, prompt: str) -> str:
+        """Versión síncrona de `generate_text_async`."""
+        text, _ = self.generate_text_with_client(prompt)
+        return text
+    
+    def get_api_info(self) -> Dict[str, Any]:
+        """
+        Obtiene información sobre las APIs del pool.
+        
+        Returns:
+            dict: Información de la API, con los proveedores y modelos del pool.
+        """
+        infos = [get_shared_api_info(client) for client in self.clients]
+        return {
+            "provider": "+".join(info['provider'] for info in infos),
+            "model": ", ".join(info['model'] for info in infos),
+            "api_version": "pool"
+        }
+    
+    async def close(self) -> None:
+        """Cierra las sesiones HTTP de todos los clientes del pool."""
+        for client in self.clients:
+            await client.close()
+
+
+# Plantilla del prompt de sección. La parte estática (instrucciones y resultado
+# esperado) se define una sola vez; str.format solo inserta los datos de cada sección
+_PROMPT_TEMPLATE = """
 Eres un especialista en análisis ambiental creando un informe técnico de "Línea Base" a partir de transcripciones de entrevistas.
 
 {section_info}
@@ -267,7 +1109,7 @@ Eres un especialista en análisis ambiental creando un informe técnico de "Lín
 {segments_text}
 
 # Instrucciones
-1. Genera contenido técnico para la sección "{section['titulo']}" basado en los segmentos proporcionados.
+1. Genera contenido técnico para la sección "{titulo}" basado en los segmentos proporcionados.
 2. El contenido debe seguir un formato académico y técnico adecuado para un informe ambiental.
 3. Extrae y sintetiza la información relevante de los segmentos.
 4. Si no hay información suficiente, indica claramente qué datos serían necesarios completar.
@@ -277,80 +1119,645 @@ Eres un especialista en análisis ambiental creando un informe técnico de "Lín
 8. La extensión debe ser adecuada para la cantidad de información disponible.
 
 # Resultado esperado
-Genera el contenido para la sección "{section['titulo']}" siguiendo las instrucciones anteriores:
+Genera el contenido para la sección "{titulo}" siguiendo las instrucciones anteriores:
+
+"""
 
+_SECTION_INFO_TEMPLATE = """
+# Información de la sección
+- Título: {titulo}
+- ID: {id}
+- Nivel: {nivel}
+- Ruta: {path}
 """
+
+_SEGMENTS_HEADER = "# Segmentos relevantes encontrados en las transcripciones\n\n"
+_NO_SEGMENTS_TEXT = "# No se encontraron segmentos relevantes en las transcripciones para esta sección.\n"
+
+
+# Línea con el ID de la sección en `_SECTION_INFO_TEMPLATE`
+_SECTION_ID_LINE_RE = re.compile(r'^- ID: ', re.MULTILINE)
+_INSTRUCTIONS_HEADER = "\n# Instrucciones"
+
+
+def split_semantic_prompt(prompt: str) -> Optional[Tuple[str, str]]:
+    """
+    Separa un prompt de sección en su ámbito y su parte variable para la caché semántica.
+    
+    El ámbito es todo lo anterior a los segmentos (plantilla e información de la
+    sección, incluido su ID), de modo que solo se comparan prompts de la misma
+    sección; la parte variable es el bloque de segmentos.
     
-    return prompt
+    Args:
+        prompt (str): Prompt creado con `create_section_prompt`.
+        
+    Returns:
+        tuple o None: (ámbito, bloque de segmentos), o None si el prompt no es de
+                      una única sección con segmentos (prompts agrupados, sin
+                      segmentos u otros), que solo usan la caché exacta.
+    """
+    if len(_SECTION_ID_LINE_RE.findall(prompt)) != 1:
+        return None
+    start = prompt.find(_SEGMENTS_HEADER)
+    end = prompt.find(_INSTRUCTIONS_HEADER, start)
+    if start == -1 or end == -1:
+        return None
+    return prompt[:start], prompt[start:end]
 
 
-def generate_section_content(section: Dict[str, Any], segments: List[Dict[str, Any]], client: AIClient) -> Dict[str, Any]:
+def _section_key(section: Dict[str, Any]) -> Tuple:
     """
-    Genera contenido para una sección usando IA.
+    Convierte una sección en una clave hashable con los campos que se usan en el prompt.
+    
+    Args:
+        section (dict): Información de la sección.
+        
+    Returns:
+        tuple: (titulo, id, nivel, path, descripcion, palabras_clave).
+    """
+    return (
+        section['titulo'],
+        section['id'],
+        section['nivel'],
+        section['path'],
+        section.get('descripcion') or None,
+        tuple(section.get('palabras_clave') or ()),
+    )
+
+
+def _segments_key(segments: List[Dict[str, Any]]) -> Tuple:
+    """
+    Convierte los segmentos en una clave hashable con todo lo que se usa en el prompt.
+    
+    Args:
+        segments (list): Lista de segmentos relevantes para la sección.
+        
+    Returns:
+        tuple: Tuplas (texto, score, inicio, fin) en el orden recibido; inicio y fin
+               son None si el segmento no tiene timestamp.
+    """
+    key = []
+    for segment in segments:
+        timestamp = segment.get('timestamp')
+        key.append((
+            segment['text'],
+            segment.get('similarity_score', 0),
+            timestamp.get('start', '') if timestamp is not None else None,
+            timestamp.get('end', '') if timestamp is not None else None,
+        ))
+    return tuple(key)
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_segments_block(segments_key: Tuple, budget: int, model: str) -> str:
+    """
+    Formatea el bloque de segmentos del prompt dentro de un presupuesto de tokens.
+    
+    Args:
+        segments_key (tuple): Segmentos, según `_segments_key`.
+        budget (int): Tokens disponibles para los segmentos.
+        model (str): Modelo cuyo tokenizador se usa para medir el texto.
+        
+    Returns:
+        str: Bloque de segmentos en Markdown.
+    """
+    max_segment_tokens = get_settings().MAX_SEGMENT_TOKENS
+    segment_parts = [_SEGMENTS_HEADER]
+    
+    # El asignador ya entrega los segmentos por similitud descendente; solo se
+    # reordenan (con un sort estable) si llegan de otra fuente desordenados
+    scores = [segment[1] for segment in segments_key]
+    if all(a >= b for a, b in zip(scores, scores[1:])):
+        sorted_segments = segments_key
+    else:
+        sorted_segments = sorted(segments_key, key=operator.itemgetter(1), reverse=True)
+    
+    for i, (text, _, start, end) in enumerate(sorted_segments):
+        header = f"## Segmento {i+1}\n"
+        if start is not None:
+            header += f"Timestamp: {start} - {end}\n"
+        
+        # Cabecera, prefijo "Texto:" y marca de truncado cuentan contra el presupuesto
+        available = budget - count_tokens(header + "Texto: ... [truncado]", model)
+        if available <= 0:
+            logger.debug(f"Presupuesto de tokens agotado: se descartan {len(sorted_segments) - i} segmentos")
+            break
+        
+        # Truncar texto muy largo para el prompt (por tokens, no por caracteres)
+        text, n_tokens, truncated = truncate_to_tokens(text, min(max_segment_tokens, available), model)
+        if truncated:
+            text += "... [truncado]"
+        budget = available - n_tokens
+        
+        segment_parts.append(header)
+        segment_parts.append(f"Texto: {text}\n\n")
+    
+    return "".join(segment_parts)
+
+
+def _format_section_info(section_key: Tuple) -> str:
+    """
+    Formatea el bloque de información de una sección.
+    
+    Args:
+        section_key (tuple): (titulo, id, nivel, path, descripcion, palabras_clave).
+        
+    Returns:
+        str: Información de la sección en Markdown.
+    """
+    titulo, section_id, nivel, path, descripcion, palabras_clave = section_key
+    
+    # Información básica de la sección. Las partes se acumulan en listas y se unen
+    # al final para no copiar la cadena completa en cada concatenación
+    info_parts = [_SECTION_INFO_TEMPLATE.format(titulo=titulo, id=section_id, nivel=nivel, path=path)]
+    
+    if descripcion:
+        info_parts.append(f"- Descripción: {descripcion}\n")
+    
+    if palabras_clave:
+        info_parts.append(f"- Palabras clave: {', '.join(palabras_clave)}\n")
+    
+    return "".join(info_parts)
+
+
+@functools.lru_cache(maxsize=4096)
+def _build_section_prompt(section_key: Tuple, segments_key: Tuple, model: str) -> str:
+    """
+    Construye el prompt de una sección a partir de claves hashables (memoizado).
+    
+    Args:
+        section_key (tuple): (titulo, id, nivel, path, descripcion, palabras_clave).
+        segments_key (tuple): Segmentos, según `_segments_key`.
+        model (str): Modelo cuyo tokenizador se usa para medir el prompt.
+        
+    Returns:
+        str: Prompt para la API de IA.
+    """
+    titulo = section_key[0]
+    section_info = _format_section_info(section_key)
+    
+    # Extraer y formatear el contenido de los segmentos
+    if segments_key:
+        # Tokens disponibles para los segmentos tras la parte fija del prompt
+        base_tokens = count_tokens(
+            _PROMPT_TEMPLATE.format(section_info=section_info, segments_text=_SEGMENTS_HEADER, titulo=titulo),
+            model
+        )
+        segments_text = _format_segments_block(segments_key, get_settings().MAX_PROMPT_TOKENS - base_tokens, model)
+    else:
+        segments_text = _NO_SEGMENTS_TEXT
+    
+    # Crear el prompt completo
+    return _PROMPT_TEMPLATE.format(
+        section_info=section_info,
+        segments_text=segments_text,
+        titulo=titulo
+    )
+
+
+def create_section_prompt(section: Dict[str, Any], segments: List[Dict[str, Any]],
+                          model: Optional[str] = None) -> str:
+    """
+    Crea un prompt para la generación de contenido de una sección.
+    
+    Cada segmento se limita a MAX_SEGMENT_TOKENS tokens y el prompt completo a
+    MAX_PROMPT_TOKENS: los segmentos se añaden por similitud descendente, el que
+    sobrepasa el presupuesto se recorta y los siguientes se descartan. El resultado
+    se memoiza por contenido de la sección y de los segmentos.
     
     Args:
         section (dict): Información de la sección.
         segments (list): Lista de segmentos relevantes para la sección.
+        model (str, optional): Modelo cuyo tokenizador se usa para medir el prompt.
+                               Por defecto, OPENAI_MODEL.
+        
+    Returns:
+        str: Prompt para la API de IA.
+    """
+    return _build_section_prompt(_section_key(section), _segments_key(segments), model or get_settings().OPENAI_MODEL)
+
+
+# Plantilla del prompt que agrupa varias secciones en una sola solicitud
+_GROUP_PROMPT_TEMPLATE = """
+Eres un especialista en análisis ambiental creando un informe técnico de "Línea Base" a partir de transcripciones de entrevistas.
+
+A continuación se describen {num_sections} secciones del informe, cada una con los segmentos de las transcripciones que le son relevantes.
+
+{sections_text}
+
+# Instrucciones
+1. Genera contenido técnico para cada sección basado únicamente en sus propios segmentos.
+2. El contenido debe seguir un formato académico y técnico adecuado para un informe ambiental.
+3. Extrae y sintetiza la información relevante de los segmentos.
+4. Si no hay información suficiente, indica claramente qué datos serían necesarios completar.
+5. Si los segmentos no contienen información relevante para una sección, genera una nota indicando que no se encontró información aplicable.
+6. Incluye, cuando sea posible, datos cuantitativos y cualitativos mencionados en los segmentos.
+7. El contenido de cada sección debe estar en formato Markdown.
+8. La extensión de cada sección debe ser adecuada para la cantidad de información disponible, sin superar unos {section_tokens} tokens por sección.
+
+# Resultado esperado
+Responde únicamente con un objeto JSON, sin texto adicional, cuyas claves sean los ID de las secciones ({section_ids}) y cuyos valores sean el contenido Markdown de cada sección.
+"""
+
+_GROUP_SECTION_SEPARATOR = "\n---\n"
+
+# Respuesta JSON envuelta en un bloque de código Markdown
+_JSON_FENCE_RE = re.compile(r'^```(?:json)?\s*(.*?)\s*```$', re.DOTALL)
+
+
+def create_group_prompt(group: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+                        model: Optional[str] = None, section_tokens: int = 2000) -> str:
+    """
+    Crea un único prompt que pide el contenido de varias secciones en formato JSON.
+    
+    El presupuesto MAX_PROMPT_TOKENS se reparte a partes iguales entre las secciones
+    del grupo, de modo que el prompt agrupado no es mayor que uno individual.
+    
+    Args:
+        group (list): Tuplas (sección, segmentos relevantes).
+        model (str, optional): Modelo cuyo tokenizador se usa para medir el prompt.
+                               Por defecto, OPENAI_MODEL.
+        section_tokens (int): Extensión máxima de cada sección que se pide al modelo,
+                              acorde con el `max_tokens` de la solicitud.
+        
+    Returns:
+        str: Prompt para la API de IA.
+    """
+    model = model or get_settings().OPENAI_MODEL
+    section_ids = [section['id'] for section, _ in group]
+    base_tokens = count_tokens(
+        _GROUP_PROMPT_TEMPLATE.format(num_sections=len(group), sections_text="",
+                                      section_ids=", ".join(section_ids),
+                                      section_tokens=section_tokens),
+        model
+    )
+    section_budget = (get_settings().MAX_PROMPT_TOKENS - base_tokens) // len(group)
+    
+    section_parts = []
+    for section, segments in group:
+        section_info = _format_section_info(_section_key(section))
+        if segments:
+            budget = section_budget - count_tokens(section_info + _GROUP_SECTION_SEPARATOR, model)
+            segments_text = _format_segments_block(_segments_key(segments), budget, model)
+        else:
+            segments_text = _NO_SEGMENTS_TEXT
+        section_parts.append(f"{section_info}\n{segments_text}")
+    
+    return _GROUP_PROMPT_TEMPLATE.format(
+        num_sections=len(group),
+        sections_text=_GROUP_SECTION_SEPARATOR.join(section_parts),
+        section_ids=", ".join(section_ids),
+        section_tokens=section_tokens
+    )
+
+
+def parse_group_response(text: str, section_ids: List[str]) -> Dict[str, str]:
+    """
+    Extrae el contenido de cada sección de la respuesta JSON a un prompt agrupado.
+    
+    Args:
+        text (str): Texto generado.
+        section_ids (list): IDs de las secciones del grupo.
+        
+    Returns:
+        dict: {section_id: contenido} de las secciones presentes y no vacías.
+        
+    Raises:
+        ValueError: Si la respuesta no es un objeto JSON.
+    """
+    text = text.strip()
+    match = _JSON_FENCE_RE.match(text)
+    if match:
+        text = match.group(1)
+    
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("La respuesta agrupada no es un objeto JSON")
+    
+    return {
+        section_id: data[section_id].strip()
+        for section_id in section_ids
+        if isinstance(data.get(section_id), str) and data[section_id].strip()
+    }
+
+
+def get_shared_api_info(client: AIClient) -> Dict[str, Any]:
+    """
+    Obtiene la información de la API del cliente, compartida por todos sus resultados.
+    
+    Args:
         client (AIClient): Cliente de API de IA.
         
+    Returns:
+        dict: Información de la API (el mismo objeto en cada llamada; no debe modificarse).
+    """
+    api_info = getattr(client, '_api_info', None)
+    if api_info is None:
+        api_info = client._api_info = client.get_api_info()
+    return api_info
+
+
+def build_section_result(section: Dict[str, Any], segments: List[Dict[str, Any]], client: AIClient,
+                         content: str, elapsed_time: float) -> Dict[str, Any]:
+    """
+    Construye el resultado de una sección con su contenido generado.
+    
+    Args:
+        section (dict): Información de la sección.
+        segments (list): Lista de segmentos usados para la sección.
+        client (AIClient): Cliente de API de IA utilizado.
+        content (str): Contenido generado.
+        elapsed_time (float): Tiempo de generación en segundos.
+        
+    Returns:
+        dict: Sección con contenido generado.
+    """
+    # Un único dict nuevo que comparte los valores de la sección (sin copiarlos)
+    metadata = {
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'tiempo_ejecucion': round(elapsed_time, 2),
+        'api_info': get_shared_api_info(client),
+        'num_segmentos_usados': len(segments)
+    }
+    result = {**section, 'contenido_generado': content, 'metadatos_generacion': metadata}
+    
+    logger.info(f"✓ Contenido generado ({metadata['tiempo_ejecucion']}s)")
+    return result
+
+
+def build_section_error(section: Dict[str, Any], segments: List[Dict[str, Any]], client: AIClient,
+                        error: Exception) -> Dict[str, Any]:
+    """
+    Construye el resultado de una sección cuya generación ha fallado.
+    
+    Args:
+        section (dict): Información de la sección.
+        segments (list): Lista de segmentos usados para la sección.
+        client (AIClient): Cliente de API de IA utilizado.
+        error (Exception): Error producido durante la generación.
+        
+    Returns:
+        dict: Sección con un mensaje de error como contenido.
+    """
+    logger.error(f"✗ Error al generar contenido: {error}")
+    return {
+        **section,
+        'contenido_generado': f"**ERROR**: No se pudo generar contenido para esta sección debido a: {str(error)}",
+        'metadatos_generacion': {
+            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'error': str(error),
+            'api_info': get_shared_api_info(client),
+            'num_segmentos_usados': len(segments)
+        }
+    }
+
+
+def generate_section_content(section: Dict[str, Any], segments: List[Dict[str, Any]],
+                             client: Union[AIClient, AIClientPool]) -> Dict[str, Any]:
+    """
+    Genera contenido para una sección usando IA.
+    
+    Args:
+        section (dict): Información de la sección.
+        segments (list): Lista de segmentos relevantes para la sección.
+        client (AIClient o AIClientPool): Cliente o pool de clientes de API de IA.
+        
     Returns:
         dict: Sección con contenido generado.
     """
     logger.info(f"Generando contenido para sección: {section['titulo']}")
     
     # Crear prompt para la IA
-    prompt = create_section_prompt(section, segments)
+    prompt = create_section_prompt(section, segments, client.model)
     
     # Llamar a la API de IA
     try:
         start_time = time.time()
-        content = client.generate_text(prompt)
-        end_time = time.time()
+        if isinstance(client, AIClientPool):
+            # Los metadatos reflejan el proveedor que atendió realmente la solicitud
+            content, used_client = client.generate_text_with_client(prompt)
+        else:
+            content, used_client = client.generate_text(prompt), client
+        return build_section_result(section, segments, used_client, content, time.time() - start_time)
+    
+    except Exception as e:
+        return build_section_error(section, segments, client, e)
+
+
+def generate_sections_batch(section_ids: List[str], sections_dict: Dict[str, Dict[str, Any]],
+                            assignments: Dict[str, List[Dict[str, Any]]],
+                            client: BatchOpenAIClient) -> List[Dict[str, Any]]:
+    """
+    Genera contenido para varias secciones en un único lote de la Batch API.
+    
+    Las secciones cuya respuesta ya está en la caché no se incluyen en el lote.
+    
+    Args:
+        section_ids (list): IDs de las secciones a generar.
+        sections_dict (dict): Secciones indexadas por ID.
+        assignments (dict): Diccionario de asignaciones {section_id: [segments]}.
+        client (BatchOpenAIClient): Cliente de la Batch API.
         
-        # Crear resultado
-        result = section.copy()
-        result['contenido_generado'] = content
-        result['metadatos_generacion'] = {
-            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
-            'tiempo_ejecucion': round(end_time - start_time, 2),
-            'api_info': client.get_api_info(),
-            'num_segmentos_usados': len(segments)
-        }
+    Returns:
+        list: Resultados de las secciones, en el orden de section_ids.
+    """
+    prompts = {}
+    cache_keys = {}
+    contents = {}
+    for section_id in section_ids:
+        prompt = create_section_prompt(sections_dict[section_id], assignments[section_id], client.model)
+        cache_key, cached_text = client.lookup_cache(client.build_request_data(prompt), prompt)
+        if cached_text is not None:
+            contents[section_id] = cached_text
+        else:
+            prompts[section_id] = prompt
+            cache_keys[section_id] = cache_key
+    
+    start_time = time.time()
+    if prompts:
+        logger.info(f"Enviando {len(prompts)} secciones a la Batch API ({len(contents)} en caché)")
+        try:
+            contents.update(client.run_batch(prompts))
+        except Exception as e:
+            logger.error(f"Error en el lote de la Batch API: {e}")
+            contents.update({section_id: e for section_id in prompts})
+    elapsed_time = time.time() - start_time
+    
+    results = []
+    for section_id in section_ids:
+        section, segments = sections_dict[section_id], assignments[section_id]
+        content = contents[section_id]
+        if isinstance(content, Exception):
+            results.append(build_section_error(section, segments, client, content))
+            continue
+        if section_id in prompts:
+            client.store_cache(cache_keys[section_id], client.build_request_data(prompts[section_id]),
+                               prompts[section_id], content)
+            results.append(build_section_result(section, segments, client, content, elapsed_time))
+        else:
+            results.append(build_section_result(section, segments, client, content, 0.0))
+    return results
+
+
+async def generate_section_content_async(section: Dict[str, Any], segments: List[Dict[str, Any]],
+                                         client: Union[AIClient, AIClientPool]) -> Dict[str, Any]:
+    """
+    Genera contenido para una sección usando IA de forma asíncrona.
+    
+    Args:
+        section (dict): Información de la sección.
+        segments (list): Lista de segmentos relevantes para la sección.
+        client (AIClient o AIClientPool): Cliente o pool de clientes de API de IA.
         
-        logger.info(f"✓ Contenido generado ({result['metadatos_generacion']['tiempo_ejecucion']}s)")
-        return result
+    Returns:
+        dict: Sección con contenido generado.
+    """
+    logger.info(f"Generando contenido para sección: {section['titulo']}")
+    
+    # Crear prompt para la IA
+    prompt = create_section_prompt(section, segments, client.model)
+    
+    # Llamar a la API de IA
+    try:
+        start_time = time.time()
+        if isinstance(client, AIClientPool):
+            # Los metadatos reflejan el proveedor que atendió realmente la solicitud
+            content, used_client = await client.generate_text_with_client_async(prompt)
+        else:
+            content, used_client = await client.generate_text_async(prompt), client
+        return build_section_result(section, segments, used_client, content, time.time() - start_time)
     
     except Exception as e:
-        logger.error(f"✗ Error al generar contenido: {e}")
-        # Crear resultado con error
-        result = section.copy()
-        result['contenido_generado'] = f"**ERROR**: No se pudo generar contenido para esta sección debido a: {str(e)}"
-        result['metadatos_generacion'] = {
-            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
-            'error': str(e),
-            'api_info': client.get_api_info(),
-            'num_segmentos_usados': len(segments)
-        }
-        return result
+        return build_section_error(section, segments, client, e)
 
 
-def process_all_sections(assignments: Dict[str, List[Dict[str, Any]]], 
-                        sections: List[Dict[str, Any]], 
-                        structure: Dict[str, Any],
-                        client_type: str = "openai") -> Dict[str, Any]:
+async def generate_section_group_async(group: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+                                       client: Union[AIClient, AIClientPool],
+                                       semaphore: Optional[asyncio.Semaphore] = None) -> List[Dict[str, Any]]:
     """
-    Procesa todas las secciones y genera contenido para cada una.
+    Genera el contenido de varias secciones con una única solicitud a la API.
+    
+    Las secciones que falten en la respuesta (o todas, si no es un JSON válido) se
+    generan después por separado con `generate_section_content_async`.
     
     Args:
-        assignments (dict): Diccionario de asignaciones {section_id: [segments]}.
-        sections (list): Lista de secciones.
-        structure (dict): Estructura completa del informe.
-        client_type (str): Tipo de cliente a usar ('openai' o 'anthropic').
+        group (list): Tuplas (sección, segmentos relevantes).
+        client (AIClient o AIClientPool): Cliente o pool de clientes de API de IA.
+        semaphore (asyncio.Semaphore, optional): Límite de solicitudes simultáneas.
+                                                 Se toma para la solicitud agrupada y,
+                                                 por separado, para cada sección que
+                                                 se genere después, de modo que un
+                                                 grupo nunca ocupa más de un hueco.
         
     Returns:
-        dict: Estructura con contenido generado.
+        list: Resultado de cada sección, en el orden del grupo.
+    """
+    limiter = semaphore or contextlib.nullcontext()
+    
+    async def generate_one(section, segments):
+        async with limiter:
+            return await generate_section_content_async(section, segments, client)
+    
+    if len(group) == 1:
+        return [await generate_one(*group[0])]
+    
+    section_ids = [section['id'] for section, _ in group]
+    logger.info(f"Generando contenido para {len(group)} secciones en una solicitud: {', '.join(section_ids)}")
+    
+    # La respuesta debe admitir el contenido de todas las secciones del grupo sin
+    # pasar del máximo de respuesta del modelo ni de su ventana de contexto; cada
+    # sección recibe la parte proporcional, que también se indica en el prompt
+    limit = response_token_limit(client, get_settings().MAX_PROMPT_TOKENS)
+    section_tokens = min(client.max_tokens, limit // len(group))
+    prompt = create_group_prompt(group, client.model, section_tokens)
+    max_tokens = min(section_tokens * len(group),
+                     response_token_limit(client, count_tokens(prompt, client.model)))
+    
+    # Solo se cachea una respuesta con todas las secciones; una truncada o que no
+    # es JSON quedaría guardada y las siguientes ejecuciones nunca la repetirían
+    def is_complete(text):
+        try:
+            return len(parse_group_response(text, section_ids)) == len(section_ids)
+        except ValueError:
+            return False
+    
+    contents = {}
+    used_client = client
+    elapsed_time = 0.0
+    try:
+        async with limiter:
+            start_time = time.time()
+            try:
+                if isinstance(client, AIClientPool):
+                    text, used_client = await client.generate_text_with_client_async(prompt, max_tokens,
+                                                                                     is_complete)
+                else:
+                    text = await client.generate_text_async(prompt, max_tokens=max_tokens, validate=is_complete)
+            finally:
+                elapsed_time = time.time() - start_time
+        contents = parse_group_response(text, section_ids)
+    except Exception as e:
+        logger.warning(f"No se pudo generar el grupo de secciones de una vez ({e}); se generarán por separado")
+    
+    missing = [(section, segments) for section, segments in group if section['id'] not in contents]
+    if contents and missing:
+        logger.warning(f"Faltan {len(missing)} secciones en la respuesta agrupada; se generarán por separado")
+    # El hueco de la solicitud agrupada ya se ha liberado; cada sección pendiente
+    # espera el suyo como cualquier otra solicitud
+    fallback = await asyncio.gather(*(generate_one(section, segments) for section, segments in missing))
+    fallback_results = {section['id']: result for (section, _), result in zip(missing, fallback)}
+    
+    return [
+        fallback_results[section['id']] if section['id'] in fallback_results
+        else build_section_result(section, segments, used_client, contents[section['id']], elapsed_time)
+        for section, segments in group
+    ]
+
+
+def create_client_pool() -> AIClientPool:
+    """
+    Crea un pool con todos los proveedores que puedan inicializarse.
+    
+    Returns:
+        AIClientPool: Pool con OpenAI y/o Anthropic, con los límites de concurrencia
+                      OPENAI_MAX_CONCURRENT y ANTHROPIC_MAX_CONCURRENT.
+        
+    Raises:
+        ValueError: Si no se pudo inicializar ningún cliente.
+    """
+    settings = get_settings()
+    clients = []
+    for client_class, limit in ((OpenAIClient, settings.OPENAI_MAX_CONCURRENT),
+                                (AnthropicClient, settings.ANTHROPIC_MAX_CONCURRENT)):
+        try:
+            clients.append((client_class(), limit))
+        except Exception as e:
+            logger.error(f"Error al inicializar {client_class.__name__} para el pool: {e}")
+    
+    if not clients:
+        raise ValueError("No se pudo inicializar ningún cliente de IA. Verifica las claves API en el archivo .env")
+    
+    logger.info(f"Usando un pool de {len(clients)} proveedores para generación de contenido")
+    return AIClientPool(clients)
+
+
+def create_client(client_type: str = "openai") -> Union[AIClient, AIClientPool]:
+    """
+    Crea el cliente de IA según el tipo especificado, con fallback al otro proveedor.
+    
+    Args:
+        client_type (str): Tipo de cliente a usar ('openai', 'openai-batch', 'anthropic'
+                           o 'pool' para repartir las solicitudes entre ambos proveedores).
+        
+    Returns:
+        AIClient o AIClientPool: Cliente de API de IA inicializado.
+        
+    Raises:
+        ValueError: Si no se pudo inicializar ningún cliente.
     """
-    # Crear cliente de IA según el tipo especificado
+    if client_type.lower() == "pool":
+        return create_client_pool()
+    
     if client_type.lower() == "anthropic":
         try:
             client = AnthropicClient()
@@ -361,8 +1768,12 @@ def process_all_sections(assignments: Dict[str, List[Dict[str, Any]]],
             client = OpenAIClient()
     else:
         try:
-            client = OpenAIClient()
-            logger.info("Usando OpenAI para generación de contenido")
+            if client_type.lower() == "openai-batch":
+                client = BatchOpenAIClient()
+                logger.info("Usando la Batch API de OpenAI para generación de contenido")
+            else:
+                client = OpenAIClient()
+                logger.info("Usando OpenAI para generación de contenido")
         except Exception as e:
             logger.error(f"Error al inicializar cliente de OpenAI: {e}")
             try:
@@ -371,6 +1782,208 @@ def process_all_sections(assignments: Dict[str, List[Dict[str, Any]]],
             except:
                 raise ValueError("No se pudo inicializar ningún cliente de IA. Verifica las claves API en el archivo .env")
     
+    return client
+
+
+def load_json(path: str) -> Any:
+    """
+    Carga un archivo JSON, usando orjson si está disponible.
+    
+    Args:
+        path (str): Ruta del archivo.
+        
+    Returns:
+        Datos deserializados.
+    """
+    if ORJSON_AVAILABLE:
+        with open(path, 'rb') as file:
+            return orjson.loads(file.read())
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_json(data: Any, path: str) -> None:
+    """
+    Guarda datos en un archivo JSON indentado, usando orjson si está disponible.
+    
+    Args:
+        data: Datos serializables a JSON.
+        path (str): Ruta del archivo de salida.
+    """
+    if ORJSON_AVAILABLE:
+        with open(path, 'wb') as file:
+            file.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
+
+
+def dumps_json_line(data: Any) -> bytes:
+    """
+    Serializa datos como una línea JSONL en UTF-8.
+    
+    Args:
+        data: Datos serializables a JSON.
+        
+    Returns:
+        bytes: JSON compacto terminado en salto de línea.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(data, ensure_ascii=False) + "\n").encode('utf-8')
+
+
+def section_prompt_hash(section: Dict[str, Any], segments: List[Dict[str, Any]], model: str) -> str:
+    """
+    Calcula la huella del prompt de una sección, que identifica sus datos de entrada.
+    
+    Args:
+        section (dict): Información de la sección.
+        segments (list): Segmentos relevantes para la sección.
+        model (str): Modelo cuyo tokenizador se usa para medir el prompt.
+        
+    Returns:
+        str: Hash hexadecimal del prompt de la sección.
+    """
+    prompt = create_section_prompt(section, segments, model)
+    return hashlib.blake2b(prompt.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def load_checkpoint(checkpoint_path: str,
+                    prompt_hashes: Optional[Dict[str, str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Carga las secciones ya generadas de un checkpoint JSONL.
+    
+    Args:
+        checkpoint_path (str): Ruta al checkpoint (una línea {"section_id", "prompt_hash",
+                               "result"} por sección).
+        prompt_hashes (dict, optional): Huella actual del prompt de cada sección
+                                        (ver `section_prompt_hash`). Las entradas
+                                        cuya huella no coincide se descartan, porque
+                                        se generaron con otros datos de entrada.
+        
+    Returns:
+        dict: Resultados completados {section_id: resultado}. Vacío si el archivo no existe.
+    """
+    completed = {}
+    if not os.path.exists(checkpoint_path):
+        return completed
+    
+    stale = 0
+
+    loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+    with open(checkpoint_path, 'rb') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                entry = loads(line)
+            except ValueError:
+                # Última línea a medio escribir si el proceso se interrumpió
+                logger.warning(f"Línea incompleta en el checkpoint {checkpoint_path}, se ignora")
+                continue
+            if prompt_hashes is not None and entry.get('prompt_hash') != prompt_hashes.get(entry['section_id']):
+                stale += 1
+                continue
+            completed[entry['section_id']] = entry['result']
+    
+    if stale:
+        logger.info(f"Checkpoint: {stale} secciones descartadas porque su prompt ha cambiado")
+    logger.info(f"Checkpoint cargado: {len(completed)} secciones ya generadas")
+    return completed
+
+
+def open_checkpoint(checkpoint_path: str):
+    """
+    Abre el checkpoint JSONL para añadir secciones.
+    
+    Args:
+        checkpoint_path (str): Ruta al checkpoint.
+        
+    Returns:
+        file: Archivo abierto en modo append binario.
+    """
+    file = open(checkpoint_path, 'ab')
+    if file.tell() > 0:
+        # Cerrar una posible línea incompleta para que la siguiente entrada sea válida
+        with open(checkpoint_path, 'rb') as existing:
+            existing.seek(-1, os.SEEK_END)
+            if existing.read(1) != b"\n":
+                file.write(b"\n")
+    return file
+
+
+def append_checkpoint(file, section_id: str, result: Dict[str, Any], prompt_hash: Optional[str] = None) -> None:
+    """
+    Añade una sección generada al checkpoint y la fuerza a disco.
+    
+    Args:
+        file: Archivo del checkpoint abierto con `open_checkpoint`.
+        section_id (str): ID de la sección.
+        result (dict): Resultado de la sección.
+        prompt_hash (str, optional): Huella del prompt de la sección (ver `section_prompt_hash`).
+    """
+    file.write(dumps_json_line({'section_id': section_id, 'prompt_hash': prompt_hash, 'result': result}))
+    file.flush()
+    os.fsync(file.fileno())
+
+
+def override_rate_limits(client: Union[AIClient, AIClientPool], rpm: Optional[int] = None,
+                         tpm: Optional[int] = None) -> None:
+    """
+    Sustituye los límites RPM/TPM configurados de un cliente (o de cada cliente de un pool).
+    
+    Args:
+        client (AIClient o AIClientPool): Cliente o pool de clientes de API de IA.
+        rpm (int, optional): Solicitudes por minuto. Si es None se mantiene el configurado.
+        tpm (int, optional): Tokens por minuto. Si es None se mantiene el configurado.
+    """
+    if rpm is None and tpm is None:
+        return
+    for target in (client.clients if isinstance(client, AIClientPool) else [client]):
+        limiter = target.rate_limiter
+        target.rate_limiter = AsyncRateLimiter(
+            rpm if rpm is not None else limiter.max_requests_per_minute,
+            tpm if tpm is not None else limiter.max_tokens_per_minute
+        )
+
+
+async def process_all_sections_async(assignments: Dict[str, List[Dict[str, Any]]], 
+                                     sections: List[Dict[str, Any]], 
+                                     structure: Dict[str, Any],
+                                     client_type: str = "openai",
+                                     concurrency_limit: Optional[int] = None,
+                                     checkpoint_path: Optional[str] = None,
+                                     rpm: Optional[int] = None,
+                                     tpm: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Procesa todas las secciones de forma concurrente y genera contenido para cada una.
+    
+    Args:
+        assignments (dict): Diccionario de asignaciones {section_id: [segments]}.
+        sections (list): Lista de secciones.
+        structure (dict): Estructura completa del informe.
+        client_type (str): Tipo de cliente a usar ('openai', 'openai-batch', 'anthropic' o 'pool').
+        concurrency_limit (int, optional): Máximo de solicitudes simultáneas. Si no
+                                           se proporciona, se usa MAX_CONCURRENT_REQUESTS.
+        checkpoint_path (str, optional): Checkpoint JSONL. Cada sección generada con éxito
+                                         se añade al terminar, y las que ya figuran en él
+                                         con el mismo prompt no se vuelven a generar.
+        rpm (int, optional): Solicitudes por minuto; sustituye al límite configurado del proveedor.
+        tpm (int, optional): Tokens por minuto; sustituye al límite configurado del proveedor.
+        
+    Returns:
+        dict: Estructura con contenido generado.
+    """
+    client = create_client(client_type)
+    override_rate_limits(client, rpm, tpm)
+    llm_cache.reset_stats()
+    # Con un pool, el límite por defecto es la suma de los límites de sus clientes
+    if concurrency_limit is None and isinstance(client, AIClientPool):
+        concurrency_limit = client.capacity
+    semaphore = asyncio.Semaphore(concurrency_limit or get_settings().MAX_CONCURRENT_REQUESTS)
+    group_size = max_group_size(client, get_settings().SECTION_GROUP_SIZE)
+    
     # Convertir lista de secciones a diccionario para facilitar acceso
     sections_dict = {section['id']: section for section in sections}
     
@@ -378,54 +1991,203 @@ def process_all_sections(assignments: Dict[str, List[Dict[str, Any]]],
     result_structure = structure.copy()
     result_structure['secciones_generadas'] = {}
     
-    # Generar contenido para cada sección
-    for section_id, segment_list in assignments.items():
-        if section_id in sections_dict:
-            section = sections_dict[section_id]
-            result = generate_section_content(section, segment_list, client)
-            result_structure['secciones_generadas'][section_id] = result
+    section_ids = [section_id for section_id in assignments if section_id in sections_dict]
+    
+    # Cada entrada del checkpoint lleva la huella del prompt de su sección, para no
+    # reutilizar contenido generado a partir de otros segmentos
+    prompt_hashes = {
+        section_id: section_prompt_hash(sections_dict[section_id], assignments[section_id], client.model)
+        for section_id in section_ids
+    } if checkpoint_path else {}
+    completed = load_checkpoint(checkpoint_path, prompt_hashes) if checkpoint_path else {}
+    checkpoint_file = open_checkpoint(checkpoint_path) if checkpoint_path else None
+    checkpoint_lock = asyncio.Lock()
+    
+    async def save_checkpoint(section_id, result):
+        # Solo se guardan las secciones correctas, para reintentar las fallidas al reanudar
+        if checkpoint_file is not None and 'error' not in result['metadatos_generacion']:
+            async with checkpoint_lock:
+                await asyncio.to_thread(append_checkpoint, checkpoint_file, section_id, result,
+                                        prompt_hashes[section_id])
+    
+    async def bounded_generate(section_id, segment_list):
+        async with semaphore:
+            result = await generate_section_content_async(sections_dict[section_id], segment_list, client)
+        await save_checkpoint(section_id, result)
+        return result
+    
+    async def bounded_generate_group(group_ids):
+        # El semáforo se toma dentro, por solicitud: la agrupada y cada sección que
+        # haya que generar por separado si falla
+        group_results = await generate_section_group_async(
+            [(sections_dict[section_id], assignments[section_id]) for section_id in group_ids],
+            client, semaphore
+        )
+        for section_id, result in zip(group_ids, group_results):
+            await save_checkpoint(section_id, result)
+        return group_results
+    
+    # Generar contenido para todas las secciones a la vez, limitado por el semáforo.
+    # Todas las solicitudes comparten el pool de conexiones de la sesión del cliente
+    pending_ids = [section_id for section_id in section_ids if section_id not in completed]
+    if completed:
+        logger.info(f"Reanudando: {len(section_ids) - len(pending_ids)} secciones tomadas del checkpoint")
+    try:
+        if isinstance(client, BatchOpenAIClient):
+            # Todo el lote se envía de una vez; la espera bloqueante va a un hilo
+            results = await asyncio.to_thread(generate_sections_batch, pending_ids, sections_dict,
+                                              assignments, client)
+            if checkpoint_file is not None:
+                for section_id, result in zip(pending_ids, results):
+                    if 'error' not in result['metadatos_generacion']:
+                        append_checkpoint(checkpoint_file, section_id, result, prompt_hashes[section_id])
+        elif group_size > 1:
+            # Varias secciones por solicitud: grupos consecutivos, así que aplanar
+            # los resultados conserva el orden de pending_ids
+            groups = [pending_ids[i:i + group_size] for i in range(0, len(pending_ids), group_size)]
+            group_results = await asyncio.gather(*(bounded_generate_group(group) for group in groups))
+            results = [result for group in group_results for result in group]
+        else:
+            results = await asyncio.gather(*(
+                bounded_generate(section_id, assignments[section_id])
+                for section_id in pending_ids
+            ))
+    finally:
+        await client.close()
+        if checkpoint_file is not None:
+            checkpoint_file.close()
+    
+    completed.update(zip(pending_ids, results))
+    for section_id in section_ids:
+        result_structure['secciones_generadas'][section_id] = completed[section_id]
+    
+    llm_cache.save_semantic_index()
+    logger.info(f"Caché de respuestas: {llm_cache.stats['hits']} aciertos, "
+                f"{llm_cache.stats['semantic_hits']} aciertos semánticos, {llm_cache.stats['misses']} fallos, "
+                f"{llm_cache.stats['inflight_hits']} solicitudes duplicadas evitadas")
     
     return result_structure
 
 
-def process_content_for_report(assignments_path: str, structure_path: str, output_path: str = None, client_type: str = "openai") -> Dict[str, Any]:
+def process_all_sections(assignments: Dict[str, List[Dict[str, Any]]], 
+                        sections: List[Dict[str, Any]], 
+                        structure: Dict[str, Any],
+                        client_type: str = "openai",
+                        checkpoint_path: Optional[str] = None,
+                        concurrency_limit: Optional[int] = None,
+                        rpm: Optional[int] = None,
+                        tpm: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Procesa todas las secciones y genera contenido para cada una.
+    
+    Las solicitudes a la API se envían de forma concurrente; ver
+    `process_all_sections_async`.
+    
+    Args:
+        assignments (dict): Diccionario de asignaciones {section_id: [segments]}.
+        sections (list): Lista de secciones.
+        structure (dict): Estructura completa del informe.
+        client_type (str): Tipo de cliente a usar ('openai', 'openai-batch', 'anthropic' o 'pool').
+        checkpoint_path (str, optional): Checkpoint JSONL para reanudar una ejecución interrumpida.
+        concurrency_limit (int, optional): Máximo de solicitudes simultáneas.
+        rpm (int, optional): Solicitudes por minuto (por defecto, las del proveedor).
+        tpm (int, optional): Tokens por minuto (por defecto, los del proveedor).
+        
+    Returns:
+        dict: Estructura con contenido generado.
+    """
+    return asyncio.run(process_all_sections_async(assignments, sections, structure, client_type,
+                                                  concurrency_limit=concurrency_limit,
+                                                  checkpoint_path=checkpoint_path, rpm=rpm, tpm=tpm))
+
+
+def get_checkpoint_path(output_path: str, assignments_path: str, structure_path: str,
+                        client_type: str = "openai") -> str:
+    """
+    Obtiene la ruta del checkpoint JSONL de una generación.
+    
+    El nombre se deriva del contenido de las asignaciones, la ruta de la estructura
+    y el cliente y los modelos configurados, no del nombre del archivo de salida
+    (que lleva la marca de tiempo de cada ejecución), de modo que al repetir una
+    ejecución interrumpida se encuentra el checkpoint de la anterior.
+    
+    Args:
+        output_path (str): Ruta del archivo de contenido generado (el checkpoint se
+                           guarda en su mismo directorio).
+        assignments_path (str): Ruta al archivo JSON con asignaciones.
+        structure_path (str): Ruta al archivo JSON con la estructura.
+        client_type (str): Tipo de cliente de IA.
+        
+    Returns:
+        str: Ruta del checkpoint (p. ej. salida/checkpoint_<hash>.jsonl).
+    """
+    settings = get_settings()
+    hasher = hashlib.blake2b(digest_size=12)
+    with open(assignments_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            hasher.update(block)
+    hasher.update(f"\0{os.path.abspath(structure_path)}\0{client_type}\0"
+                  f"{settings.OPENAI_MODEL}\0{settings.ANTHROPIC_MODEL}".encode('utf-8'))
+    return os.path.join(os.path.dirname(output_path), f"checkpoint_{hasher.hexdigest()}.jsonl")
+
+
+def process_content_for_report(assignments_path: str, structure_path: str, output_path: str = None,
+                               client_type: str = "openai", checkpoint_path: Optional[str] = None,
+                               concurrency_limit: Optional[int] = None, rpm: Optional[int] = None,
+                               tpm: Optional[int] = None) -> Dict[str, Any]:
     """
     Función principal para procesar contenido para el informe.
     
+    Si la generación se interrumpe, las secciones ya generadas quedan en el checkpoint
+    y la siguiente ejecución solo genera las que faltan. El checkpoint se elimina una
+    vez guardado el resultado completo.
+    
     Args:
         assignments_path (str): Ruta al archivo JSON con asignaciones.
         structure_path (str): Ruta al archivo JSON con la estructura.
         output_path (str, optional): Ruta para guardar el contenido generado.
-        client_type (str): Tipo de cliente a usar ('openai' o 'anthropic').
+        client_type (str): Tipo de cliente a usar ('openai', 'openai-batch', 'anthropic' o 'pool').
+        checkpoint_path (str, optional): Checkpoint JSONL. Por defecto se deriva de
+                                         las asignaciones, la estructura y el modelo
+                                         (ver `get_checkpoint_path`).
+        concurrency_limit (int, optional): Máximo de solicitudes simultáneas. Por
+                                           defecto, MAX_CONCURRENT_REQUESTS.
+        rpm (int, optional): Solicitudes por minuto (por defecto, las del proveedor).
+        tpm (int, optional): Tokens por minuto (por defecto, los del proveedor).
         
     Returns:
         dict: Estructura con contenido generado.
     """
     # Cargar asignaciones y estructura
     try:
-        with open(assignments_path, 'r', encoding='utf-8') as file:
-            assignments = json.load(file)
+        assignments = load_json(assignments_path)
+        structure = load_json(structure_path)
         
-        with open(structure_path, 'r', encoding='utf-8') as file:
-            structure = json.load(file)
-        
-        # Extraer secciones
-        from analysis.vectorizer import extract_sections_data
-        sections = extract_sections_data(structure)
+        # Extraer secciones (reutiliza el resultado de ejecuciones anteriores)
+        from analysis.vectorizer import load_sections_data
+        sections = load_sections_data(structure_path, structure)
         
         logger.info(f"Datos cargados: {len(assignments)} secciones con asignaciones")
     except Exception as e:
         logger.error(f"Error al cargar datos: {e}")
         return {}
     
+    if checkpoint_path is None and output_path:
+        checkpoint_path = get_checkpoint_path(output_path, assignments_path, structure_path, client_type)
+    
     # Procesar secciones
-    result = process_all_sections(assignments, sections, structure, client_type)
+    result = process_all_sections(assignments, sections, structure, client_type, checkpoint_path,
+                                  concurrency_limit=concurrency_limit, rpm=rpm, tpm=tpm)
     
     # Guardar resultado si se especificó ruta
     if output_path:
-        with open(output_path, 'w', encoding='utf-8') as file:
-            json.dump(result, file, ensure_ascii=False, indent=2)
+        save_json(result, output_path)
         logger.info(f"Contenido generado guardado en {output_path}")
+        
+        # El resultado completo ya está a salvo; un checkpoint antiguo podría
+        # reutilizar contenido de asignaciones distintas en la próxima ejecución
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
     
     return result
 
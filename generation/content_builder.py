@@ -9,26 +9,54 @@ import os
 import json
 import re
 import datetime
+import logging
+import functools
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Dict, List, Any, Optional, Tuple
 
-# Intentar importar librerias para generación de documentos
-try:
-    import markdown
-    MARKDOWN_AVAILABLE = True
-except ImportError:
-    MARKDOWN_AVAILABLE = False
-    print("Advertencia: python-markdown no está instalado. No se podrá convertir a HTML.")
-    print("Para instalar: pip install markdown")
+logger = logging.getLogger(__name__)
+
+# A partir de este tamaño (caracteres) el Markdown se convierte a HTML por secciones
+# principales en varios procesos; por debajo, el coste de arrancarlos no compensa
+HTML_PARALLEL_THRESHOLD = int(os.getenv("HTML_PARALLEL_THRESHOLD", 1_000_000))
+
+# La conversión en paralelo se lanza desde un hilo mientras otro escribe el DOCX;
+# los procesos se crean con forkserver (spawn si no existe) y no con fork, que
+# copiaría los locks que esos hilos tuvieran tomados
+_HTML_MP_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
 
+# Librerías para generación de documentos. Solo se comprueba que estén instaladas;
+# se importan dentro del generador correspondiente, cuando se pide ese formato
+MARKDOWN_AVAILABLE = importlib.util.find_spec('markdown') is not None
+DOCX_AVAILABLE = importlib.util.find_spec('docx') is not None
+
+# Intentar importar orjson para leer JSON más rápido
 try:
-    from docx import Document
-    from docx.shared import Pt, Inches
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    DOCX_AVAILABLE = True
+    import orjson
+    ORJSON_AVAILABLE = True
 except ImportError:
-    DOCX_AVAILABLE = False
-    print("Advertencia: python-docx no está instalado. No se podrá generar DOCX.")
-    print("Para instalar: pip install python-docx")
+    ORJSON_AVAILABLE = False
+
+
+def load_json(path: str) -> Any:
+    """
+    Carga un archivo JSON, usando orjson si está disponible.
+    
+    Args:
+        path (str): Ruta del archivo.
+        
+    Returns:
+        Datos deserializados.
+    """
+    if ORJSON_AVAILABLE:
+        with open(path, 'rb') as file:
+            return orjson.loads(file.read())
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
 
 
 def extract_sections_hierarchy(structure: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -60,11 +88,36 @@ def find_section_content(section_id: str, generated_content: Dict[str, Dict[str,
     return None
 
 
+def flatten_sections(hierarchy: List[Dict[str, Any]], level: int = 1) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    Aplana la jerarquía de secciones en preorden con un recorrido iterativo.
+    
+    Args:
+        hierarchy (list): Jerarquía de secciones.
+        level (int): Nivel asignado a las secciones de primer nivel.
+        
+    Returns:
+        list: Tuplas (nivel, sección) en el orden en que aparecen en el informe.
+    """
+    flat = []
+    stack = [(level, section) for section in reversed(hierarchy)]
+    while stack:
+        section_level, section = stack.pop()
+        flat.append((section_level, section))
+        # Apilar las subsecciones en orden inverso para visitarlas en su orden original
+        for subsection in reversed(section.get('subsecciones') or []):
+            stack.append((section_level + 1, subsection))
+    return flat
+
+
 def process_section_for_markdown(section: Dict[str, Any], 
                               generated_content: Dict[str, Dict[str, Any]], 
                               level: int = 1) -> Tuple[str, bool]:
     """
-    Procesa una sección para formato Markdown.
+    Procesa una sección (con sus subsecciones) para formato Markdown.
+    
+    Recorre el árbol de forma iterativa con `flatten_sections` y acumula los
+    fragmentos en una lista que se une al final.
     
     Args:
         section (dict): Información de la sección.
@@ -74,47 +127,49 @@ def process_section_for_markdown(section: Dict[str, Any],
     Returns:
         tuple: (texto markdown, flag indicando si hay contenido)
     """
-    # Buscar contenido para esta sección
-    content = find_section_content(section['id'], generated_content)
-    has_content = content is not None and content.strip() != ""
-    
-    # Crear encabezado según nivel
-    header_level = "#" * (level + 1)  # Nivel base + 1 para que título principal sea h2
-    markdown_text = f"{header_level} {section['titulo']}\n\n"
-    
-    # Añadir contenido si existe
-    if has_content:
-        markdown_text += f"{content}\n\n"
-    else:
-        markdown_text += "*No se ha generado contenido para esta sección.*\n\n"
-    
-    # Procesar subsecciones recursivamente
-    if 'subsecciones' in section and section['subsecciones']:
-        for subsection in section['subsecciones']:
-            sub_text, sub_has_content = process_section_for_markdown(
-                subsection, generated_content, level + 1
-            )
-            markdown_text += sub_text
-            has_content = has_content or sub_has_content
+    parts = []
+    has_content = False
+    for section_level, subsection in flatten_sections([section], level):
+        content = find_section_content(subsection['id'], generated_content)
+        
+        # Crear encabezado según nivel (nivel base + 1 para que título principal sea h2)
+        parts.append(f"{'#' * (section_level + 1)} {subsection['titulo']}\n\n")
+        if content is not None and content.strip() != "":
+            parts.append(f"{content}\n\n")
+            has_content = True
+        else:
+            parts.append("*No se ha generado contenido para esta sección.*\n\n")
     
-    return markdown_text, has_content
+    return "".join(parts), has_content
 
 
-def generate_markdown_report(hierarchy: List[Dict[str, Any]], 
-                           generated_content: Dict[str, Dict[str, Any]]) -> str:
+def build_markdown_sections(hierarchy: List[Dict[str, Any]], 
+                            generated_content: Dict[str, Dict[str, Any]]) -> List[str]:
     """
-    Genera un informe en formato Markdown.
+    Genera el Markdown de cada sección principal (con sus subsecciones).
     
     Args:
         hierarchy (list): Jerarquía de secciones.
         generated_content (dict): Diccionario con contenido generado.
         
     Returns:
-        str: Documento Markdown completo.
+        list: Un fragmento Markdown por sección principal, en orden.
+    """
+    return [
+        process_section_for_markdown(section, generated_content)[0]
+        for section in hierarchy
+    ]
+
+
+def build_markdown_header() -> str:
+    """
+    Genera los metadatos y el título del informe Markdown.
+    
+    Returns:
+        str: Cabecera del documento.
     """
-    # Metadata y título
     now = datetime.datetime.now()
-    markdown_text = f"""---
+    return f"""---
 title: Línea Base - Informe Ambiental
 date: {now.strftime('%Y-%m-%d')}
 author: Sistema de Generación Automática de Informes
@@ -125,109 +180,328 @@ author: Sistema de Generación Automática de Informes
 *Documento generado automáticamente el {now.strftime('%d de %B de %Y')}*
 
 """
-    
-    # Procesar secciones principales
-    for section in hierarchy:
-        section_text, _ = process_section_for_markdown(section, generated_content)
-        markdown_text += section_text
-    
-    # Añadir pie de página
-    markdown_text += """
+
+
+MARKDOWN_FOOTER = """
 ---
 
 *Este documento ha sido generado automáticamente a partir de transcripciones procesadas
 con técnicas de procesamiento de lenguaje natural e inteligencia artificial.*
 """
-    
-    return markdown_text
 
 
-def generate_html_report(markdown_text: str) -> Optional[str]:
+def generate_markdown_report(hierarchy: List[Dict[str, Any]], 
+                           generated_content: Dict[str, Dict[str, Any]]) -> str:
     """
-    Convierte un informe Markdown a HTML.
+    Genera un informe en formato Markdown.
     
     Args:
-        markdown_text (str): Texto en formato Markdown.
+        hierarchy (list): Jerarquía de secciones.
+        generated_content (dict): Diccionario con contenido generado.
         
     Returns:
-        str or None: Documento HTML o None si no está disponible.
+        str: Documento Markdown completo.
     """
-    if not MARKDOWN_AVAILABLE:
-        return None
-    
-    # Convertir Markdown a HTML
-    html = markdown.markdown(markdown_text, extensions=['tables', 'fenced_code'])
-    
-    # Añadir estilos básicos
-    html_document = f"""<!DOCTYPE html>
+    return "".join([
+        build_markdown_header(),
+        *build_markdown_sections(hierarchy, generated_content),
+        MARKDOWN_FOOTER
+    ])
+
+
+# Plantilla del documento HTML con estilos básicos. Se parte una sola vez en el
+# marcador {body}: las llaves del CSS son literales y no se formatean
+_HTML_TEMPLATE = """<!DOCTYPE html>
 <html lang="es">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Línea Base - Informe Ambiental</title>
     <style>
-        body {{
+        body {
             font-family: Arial, sans-serif;
             line-height: 1.6;
             color: #333;
             max-width: 900px;
             margin: 0 auto;
             padding: 20px;
-        }}
-        h1, h2, h3, h4, h5, h6 {{
+        }
+        h1, h2, h3, h4, h5, h6 {
             color: #2c5282;
             margin-top: 1.5em;
-        }}
-        h1 {{
+        }
+        h1 {
             text-align: center;
             border-bottom: 2px solid #2c5282;
             padding-bottom: 10px;
-        }}
-        table {{
+        }
+        table {
             border-collapse: collapse;
             width: 100%;
             margin: 20px 0;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #ddd;
             padding: 8px;
             text-align: left;
-        }}
-        th {{
+        }
+        th {
             background-color: #f2f2f2;
-        }}
-        code {{
+        }
+        code {
             background-color: #f5f5f5;
             padding: 2px 4px;
             border-radius: 4px;
-        }}
-        pre {{
+        }
+        pre {
             background-color: #f5f5f5;
             padding: 10px;
             border-radius: 4px;
             overflow-x: auto;
-        }}
-        blockquote {{
+        }
+        blockquote {
             border-left: 4px solid #ccc;
             padding-left: 10px;
             margin-left: 20px;
             color: #666;
-        }}
-        img {{
+        }
+        img {
             max-width: 100%;
             height: auto;
-        }}
-        @media print {{
-            body {{
+        }
+        @media print {
+            body {
                 padding: 0;
-            }}
-        }}
+            }
+        }
     </style>
 </head>
 <body>
-    {html}
+    {body}
 </body>
 </html>
 """
+_HTML_PREFIX, _HTML_SUFFIX = _HTML_TEMPLATE.split("{body}")
+
+
+@functools.lru_cache(maxsize=None)
+def get_markdown_converter():
+    """
+    Crea (una vez por proceso) el conversor Markdown con sus extensiones cargadas.
+    
+    Returns:
+        markdown.Markdown: Conversor reutilizable.
+    """
+    import markdown
+    return markdown.Markdown(extensions=['tables', 'fenced_code'])
+
+
+def _markdown_to_html(markdown_text: str) -> str:
+    """Convierte un fragmento Markdown a HTML (función de nivel de módulo para ProcessPoolExecutor)."""
+    return get_markdown_converter().reset().convert(markdown_text)
+
+
+def convert_markdown_to_html(markdown_text: str, chunks: Optional[List[str]] = None) -> str:
+    """
+    Convierte Markdown a HTML, en paralelo por fragmentos si el documento es grande.
+    
+    Args:
+        markdown_text (str): Texto en formato Markdown.
+        chunks (list, optional): El mismo documento dividido en fragmentos que empiezan
+                                 en un encabezado (p. ej. uno por sección principal).
+                                 Solo se usan si el documento supera HTML_PARALLEL_THRESHOLD.
+        
+    Returns:
+        str: Cuerpo HTML.
+    """
+    if not chunks or len(chunks) < 2 or len(markdown_text) < HTML_PARALLEL_THRESHOLD:
+        return _markdown_to_html(markdown_text)
+    
+    # Cada fragmento empieza en un encabezado, así que convertirlos por separado
+    # produce los mismos bloques que convertir el documento entero
+    with ProcessPoolExecutor(max_workers=min(len(chunks), os.cpu_count() or 1),
+                             mp_context=_HTML_MP_CONTEXT) as executor:
+        return "\n".join(executor.map(_markdown_to_html, chunks))
+
+
+def generate_html_report(markdown_text: str, chunks: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Convierte un informe Markdown a HTML.
+    
+    Args:
+        markdown_text (str): Texto en formato Markdown.
+        chunks (list, optional): Fragmentos del documento para la conversión en
+                                 paralelo (ver `convert_markdown_to_html`).
+        
+    Returns:
+        str or None: Documento HTML o None si no está disponible.
+    """
+    if not MARKDOWN_AVAILABLE:
+        logger.warning("python-markdown no está instalado. No se podrá convertir a HTML. "
+                       "Para instalar: pip install markdown")
+        return None
+    
+    # Convertir Markdown a HTML
+    html = convert_markdown_to_html(markdown_text, chunks)
+    
+    # Insertar el cuerpo en la plantilla con estilos básicos
+    html_document = _HTML_PREFIX + html + _HTML_SUFFIX
+    
+    return html_document
+
+
+# Elementos de línea del contenido Markdown generado que se trasladan a DOCX
+_MD_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*)$')
+_MD_BULLET_RE = re.compile(r'^\s*[-*+]\s+(.*)$')
+_MD_NUMBERED_RE = re.compile(r'^\s*\d+[.)]\s+(.*)$')
+_MD_BOLD_RE = re.compile(r'(\*\*[^*]+\*\*)')
+
+
+def _add_markdown_runs(paragraph, text: str) -> None:
+    """Añade texto a un párrafo DOCX respetando las negritas (**texto**)."""
+    for part in _MD_BOLD_RE.split(text):
+        if part.startswith('**') and part.endswith('**') and len(part) > 4:
+            paragraph.add_run(part[2:-2]).bold = True
+        elif part:
+            paragraph.add_run(part)
+
+
+def _add_markdown_content(document, content: str, base_level: int) -> None:
+    """
+    Añade contenido Markdown a un documento DOCX (encabezados, listas, párrafos y negritas).
+    
+    Args:
+        document (docx.Document): Documento de destino.
+        content (str): Contenido Markdown de una sección.
+        base_level (int): Nivel de encabezado de la sección; los encabezados del
+                          contenido se anidan por debajo.
+    """
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        heading = _MD_HEADING_RE.match(line)
+        bullet = _MD_BULLET_RE.match(line)
+        numbered = _MD_NUMBERED_RE.match(line)
+        if heading:
+            level = min(base_level + len(heading.group(1)), 9)
+            document.add_heading(heading.group(2).strip(), level=level)
+        elif bullet:
+            _add_markdown_runs(document.add_paragraph(style='List Bullet'), bullet.group(1))
+        elif numbered:
+            _add_markdown_runs(document.add_paragraph(style='List Number'), numbered.group(1))
+        else:
+            _add_markdown_runs(document.add_paragraph(), line.strip())
+
+
+def generate_docx_report(hierarchy: List[Dict[str, Any]], 
+                         generated_content: Dict[str, Dict[str, Any]],
+                         output_path: str) -> Optional[str]:
+    """
+    Genera un informe en formato DOCX.
+    
+    Args:
+        hierarchy (list): Jerarquía de secciones.
+        generated_content (dict): Diccionario con contenido generado.
+        output_path (str): Ruta del archivo DOCX.
+        
+    Returns:
+        str or None: Ruta del documento o None si python-docx no está disponible.
+    """
+    if not DOCX_AVAILABLE:
+        logger.warning("python-docx no está instalado. No se podrá generar DOCX. "
+                       "Para instalar: pip install python-docx")
+        return None
+    
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    
+    document = Document()
+    title = document.add_heading('Línea Base - Informe Ambiental', level=0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    subtitle = document.add_paragraph()
+    subtitle.add_run(
+        f"Documento generado automáticamente el {datetime.datetime.now().strftime('%d de %B de %Y')}"
+    ).italic = True
+    subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    for level, section in flatten_sections(hierarchy):
+        document.add_heading(section['titulo'], level=min(level, 9))
+        content = find_section_content(section['id'], generated_content)
+        if content is not None and content.strip() != "":
+            _add_markdown_content(document, content, level)
+        else:
+            document.add_paragraph().add_run("No se ha generado contenido para esta sección.").italic = True
+    
+    document.save(output_path)
+    return output_path
+
+
+def build_report(content_path: str, structure_path: str, output_base: str,
+                 formats: List[str]) -> Dict[str, str]:
+    """
+    Construye el informe final en los formatos solicitados.
+    
+    Args:
+        content_path (str): Ruta al JSON de contenido generado (con 'secciones_generadas').
+        structure_path (str): Ruta al JSON con la estructura del informe.
+        output_base (str): Ruta base de los archivos de salida, sin extensión.
+        formats (list): Formatos a generar ('markdown', 'html', 'docx').
+        
+    Returns:
+        dict: Archivos generados {formato: ruta}.
+    """
+    content = load_json(content_path)
+    structure = load_json(structure_path)
+    
+    hierarchy = extract_sections_hierarchy(structure)
+    generated_content = content.get('secciones_generadas', {})
+    
+    # El Markdown es la base de todos los formatos; las secciones principales se
+    # conservan por separado para poder convertirlas a HTML en paralelo
+    chunks = [build_markdown_header(), *build_markdown_sections(hierarchy, generated_content), MARKDOWN_FOOTER]
+    markdown_text = "".join(chunks)
+    
+    formats = [fmt.strip().lower() for fmt in formats]
+    
+    def write_markdown():
+        md_path = f"{output_base}.md"
+        with open(md_path, 'w', encoding='utf-8') as file:
+            file.write(markdown_text)
+        return md_path
+    
+    def write_html():
+        html_document = generate_html_report(markdown_text, chunks)
+        if html_document is None:
+            return None
+        html_path = f"{output_base}.html"
+        with open(html_path, 'w', encoding='utf-8') as file:
+            file.write(html_document)
+        return html_path
+    
+    def write_docx():
+        return generate_docx_report(hierarchy, generated_content, f"{output_base}.docx")
+    
+    writers = {}
+    if 'markdown' in formats or 'md' in formats:
+        writers['markdown'] = write_markdown
+    if 'html' in formats:
+        writers['html'] = write_html
+    if 'docx' in formats:
+        writers['docx'] = write_docx
+    
+    # Los formatos son independientes entre sí: con varios, se generan a la vez
+    # (la conversión a HTML por procesos y la escritura del DOCX se solapan)
+    if len(writers) > 1:
+        with ThreadPoolExecutor(max_workers=len(writers)) as executor:
+            futures = {fmt: executor.submit(writer) for fmt, writer in writers.items()}
+            paths = {fmt: future.result() for fmt, future in futures.items()}
+    else:
+        paths = {fmt: writer() for fmt, writer in writers.items()}
+    
+    generated_files = {fmt: path for fmt, path in paths.items() if path is not None}
+    
+    for fmt in formats:
+        if fmt not in ('markdown', 'md', 'html', 'docx'):
+            logger.warning(f"Formato de salida no soportado: {fmt}")
     
-    return html_document
\ No newline at end of file
+    return generated_files
@@ -0,0 +1,360 @@
+"""
+Caché en disco de respuestas de las APIs de IA.
+
+Las respuestas se indexan por el SHA-256 del cuerpo de la solicitud (modelo, prompt,
+temperatura, max_tokens...), de modo que volver a procesar secciones sin cambios no
+repite llamadas a la API. Usa `diskcache` si está instalado y, si no, una tabla
+SQLite de la biblioteca estándar en el mismo directorio.
+
+Con LLM_CACHE_REFRESH=1 (o `--no-cache` en main.py) no se leen respuestas de la
+caché, pero las nuevas sí se guardan, sustituyendo a las anteriores.
+
+Opcionalmente (LLM_SEMANTIC_CACHE=1) se mantiene además una caché semántica: una
+solicitud reutiliza la respuesta de otra previa del mismo ámbito (la misma sección,
+con los mismos parámetros) cuyo texto, vectorizado con sentence-transformers, tenga
+una similitud coseno superior al umbral. Se vectoriza solo la parte variable del
+prompt (los segmentos), sin truncarla, ya que la plantilla común dominaría la
+similitud. Solo se aplica a solicitudes deterministas (temperatura 0), donde
+reutilizar una respuesta equivale a repetir la llamada.
+"""
+
+import os
+import json
+import pickle
+import sqlite3
+import hashlib
+import logging
+import functools
+import threading
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+# Intentar importar diskcache para persistir las respuestas
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
+# Intentar importar faiss para la búsqueda de vecinos de la caché semántica
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Directorio de la caché de respuestas
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join("cache", "llm"))
+
+# Si es True, las consultas a la caché siempre fallan (ver `set_refresh`)
+REFRESH = os.getenv("LLM_CACHE_REFRESH", "0") == "1"
+
+# Caché semántica: activación, umbral de similitud coseno y modelo de embeddings.
+# Si no se indica modelo se usa el mismo que el vectorizador de segmentos
+SEMANTIC_CACHE_ENABLED = os.getenv("LLM_SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("LLM_SEMANTIC_THRESHOLD", 0.95))
+SEMANTIC_CACHE_MODEL = os.getenv("LLM_SEMANTIC_MODEL", "")
+
+# Clave reservada de la caché en disco donde se persiste el índice semántico
+SEMANTIC_INDEX_KEY = "__semantic_index__"
+
+# Aciertos y fallos acumulados desde el último reset_stats(); inflight_hits cuenta las
+# solicitudes que reutilizaron la respuesta de otra idéntica aún en curso
+stats = {"hits": 0, "misses": 0, "semantic_hits": 0, "inflight_hits": 0}
+
+
+class SQLiteCache:
+    """
+    Caché clave-valor sobre sqlite3, con la interfaz `get`/`set` de diskcache que
+    usa este módulo. Los valores se serializan con pickle.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Abre (creándola si no existe) la base de datos de la caché.
+
+        Args:
+            directory (str): Directorio de la caché.
+        """
+        os.makedirs(directory, exist_ok=True)
+        # Las consultas llegan desde hilos de asyncio.to_thread; el lock serializa
+        # el uso de la conexión compartida
+        self._connection = sqlite3.connect(
+            os.path.join(directory, "responses.sqlite"), timeout=30, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS resp (key TEXT PRIMARY KEY, response BLOB NOT NULL)")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Devuelve el valor de una clave, o `default` si no existe."""
+        with self._lock:
+            row = self._connection.execute("SELECT response FROM resp WHERE key = ?", (key,)).fetchone()
+        return pickle.loads(row[0]) if row is not None else default
+
+    def set(self, key: str, value: Any) -> None:
+        """Guarda (o sustituye) el valor de una clave."""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO resp (key, response) VALUES (?, ?)", (key, blob))
+
+
+@functools.lru_cache(maxsize=None)
+def get_cache(cache_dir: str = LLM_CACHE_DIR):
+    """
+    Abre (una sola vez) la caché en disco.
+
+    Args:
+        cache_dir (str): Directorio de la caché.
+
+    Returns:
+        diskcache.Cache o SQLiteCache: Caché abierta.
+    """
+    if not DISKCACHE_AVAILABLE:
+        logger.info("diskcache no está instalado; las respuestas se cachean con sqlite3")
+        return SQLiteCache(cache_dir)
+    return diskcache.Cache(cache_dir)
+
+
+def set_refresh(refresh: bool) -> None:
+    """
+    Activa o desactiva la lectura de la caché.
+
+    Con `refresh=True` todas las consultas son fallos y las respuestas nuevas
+    sustituyen a las cacheadas, lo que invalida la caché de las solicitudes que
+    se repitan.
+
+    Args:
+        refresh (bool): Si es True, no se reutilizan respuestas cacheadas.
+    """
+    global REFRESH
+    REFRESH = refresh
+
+
+def make_key(request_data: Dict[str, Any]) -> str:
+    """
+    Calcula la clave de caché de una solicitud.
+
+    Args:
+        request_data (dict): Cuerpo JSON de la solicitud a la API.
+
+    Returns:
+        str: Hash SHA-256 hexadecimal del cuerpo serializado de forma canónica.
+    """
+    payload = json.dumps(request_data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get(key: str) -> Optional[str]:
+    """
+    Busca una respuesta en la caché y actualiza las estadísticas.
+
+    Args:
+        key (str): Clave calculada con `make_key`.
+
+    Returns:
+        str o None: Texto cacheado, o None si no existe.
+    """
+    cache = get_cache()
+    value = cache.get(key) if cache is not None and not REFRESH else None
+    stats["hits" if value is not None else "misses"] += 1
+    return value
+
+
+def set(key: str, value: str) -> None:
+    """
+    Guarda una respuesta en la caché.
+
+    Args:
+        key (str): Clave calculada con `make_key`.
+        value (str): Texto generado.
+    """
+    cache = get_cache()
+    if cache is not None:
+        cache.set(key, value)
+
+
+def reset_stats() -> None:
+    """Pone a cero los contadores de aciertos y fallos."""
+    for name in stats:
+        stats[name] = 0
+
+
+class SemanticIndex:
+    """
+    Índice de producto interno sobre embeddings normalizados de prompts.
+    
+    Cada vector apunta a la clave exacta de la respuesta en la caché en disco. Usa
+    `faiss.IndexFlatIP` si faiss está instalado y, si no, un producto matricial de NumPy
+    (ambos hacen una búsqueda exhaustiva, por lo que el resultado es el mismo).
+    """
+    
+    def __init__(self, dim: int):
+        """
+        Inicializa un índice vacío.
+        
+        Args:
+            dim (int): Dimensión de los embeddings.
+        """
+        self.dim = dim
+        self.keys = []
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.index = faiss.IndexFlatIP(dim) if FAISS_AVAILABLE else None
+    
+    def add(self, vector: np.ndarray, key: str) -> None:
+        """Añade un embedding normalizado asociado a una clave de la caché."""
+        vector = np.ascontiguousarray(vector, dtype=np.float32).reshape(1, -1)
+        self.vectors = np.vstack([self.vectors, vector])
+        self.keys.append(key)
+        if self.index is not None:
+            self.index.add(vector)
+    
+    def search(self, vector: np.ndarray):
+        """
+        Busca el vecino más similar a un embedding.
+        
+        Returns:
+            tuple: (similitud, clave) del vecino más cercano, o (None, None) si está vacío.
+        """
+        if not self.keys:
+            return None, None
+        vector = np.ascontiguousarray(vector, dtype=np.float32).reshape(1, -1)
+        if self.index is not None:
+            scores, indices = self.index.search(vector, 1)
+            return float(scores[0, 0]), self.keys[int(indices[0, 0])]
+        scores = self.vectors @ vector[0]
+        best = int(np.argmax(scores))
+        return float(scores[best]), self.keys[best]
+    
+    def __getstate__(self):
+        # El índice de faiss no es serializable; se reconstruye desde los vectores
+        return {"dim": self.dim, "keys": self.keys, "vectors": self.vectors}
+    
+    def __setstate__(self, state):
+        self.dim = state["dim"]
+        self.keys = state["keys"]
+        self.vectors = state["vectors"]
+        self.index = faiss.IndexFlatIP(self.dim) if FAISS_AVAILABLE else None
+        if self.index is not None and len(self.keys):
+            self.index.add(self.vectors)
+
+
+# Índices semánticos por ámbito y parámetros de la solicitud (modelo, max_tokens...)
+_semantic_indexes = None
+_semantic_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def get_semantic_model():
+    """
+    Carga (una sola vez) el modelo de embeddings de la caché semántica.
+    
+    El modelo codifica los textos con la longitud máxima que admite, no con el
+    límite ST_MAX_SEQ_LEN del vectorizador: lo que distingue dos solicitudes puede
+    estar en cualquier parte del texto.
+    
+    Returns:
+        SentenceTransformer o None: Modelo, o None si la caché semántica no puede usarse.
+    """
+    # Importación diferida: el vectorizador arrastra sklearn y sentence-transformers
+    from analysis.vectorizer import TRANSFORMERS_AVAILABLE, DEFAULT_EMBEDDING_MODEL, load_embedding_model
+    
+    if not TRANSFORMERS_AVAILABLE:
+        logger.warning("La caché semántica requiere sentence-transformers; queda desactivada")
+        return None
+    return load_embedding_model(SEMANTIC_CACHE_MODEL or DEFAULT_EMBEDDING_MODEL, max_seq_length=None)
+
+
+def _semantic_namespace(request_data: Dict[str, Any], scope: str) -> str:
+    """Identifica el ámbito y los parámetros de la solicitud distintos del prompt."""
+    params = {k: v for k, v in request_data.items() if k != "messages"}
+    return make_key({"scope": scope, "params": params})
+
+
+def _semantic_applicable(request_data: Dict[str, Any]) -> bool:
+    """Indica si la caché semántica puede usarse para una solicitud."""
+    if not SEMANTIC_CACHE_ENABLED or get_cache() is None:
+        return False
+    # Con temperatura > 0 cada llamada es una muestra distinta; no se reutilizan respuestas
+    return request_data.get("temperature", 0) <= 0 and get_semantic_model() is not None
+
+
+def _embed_text(text: str) -> np.ndarray:
+    """Calcula el embedding normalizado de la parte variable de un prompt."""
+    return get_semantic_model().encode([text], normalize_embeddings=True, convert_to_numpy=True)[0]
+
+
+def _get_semantic_indexes() -> Dict[str, SemanticIndex]:
+    """Obtiene los índices semánticos, cargándolos de la caché en disco la primera vez."""
+    global _semantic_indexes
+    if _semantic_indexes is None:
+        _semantic_indexes = get_cache().get(SEMANTIC_INDEX_KEY, {})
+    return _semantic_indexes
+
+
+def get_similar(request_data: Dict[str, Any], scope: str, text: str) -> Optional[str]:
+    """
+    Busca la respuesta de una solicitud semánticamente equivalente del mismo ámbito.
+    
+    Args:
+        request_data (dict): Cuerpo JSON de la solicitud a la API.
+        scope (str): Parte fija del prompt que delimita el ámbito (p. ej. la
+                     información de la sección); solo se comparan solicitudes
+                     con el mismo ámbito.
+        text (str): Parte variable del prompt que se compara por similitud.
+        
+    Returns:
+        str o None: Texto cacheado si alguna solicitud previa supera el umbral de similitud.
+    """
+    if REFRESH or not _semantic_applicable(request_data):
+        return None
+    
+    vector = _embed_text(text)
+    with _semantic_lock:
+        index = _get_semantic_indexes().get(_semantic_namespace(request_data, scope))
+        if index is None:
+            return None
+        score, key = index.search(vector)
+    
+    if score is None or score < SEMANTIC_CACHE_THRESHOLD:
+        return None
+    
+    value = get_cache().get(key)
+    if value is not None:
+        stats["semantic_hits"] += 1
+        logger.debug(f"Acierto de la caché semántica (similitud {score:.3f})")
+    return value
+
+
+def add_similar(request_data: Dict[str, Any], scope: str, text: str, key: str) -> None:
+    """
+    Registra el embedding de una solicitud ya respondida en la caché semántica.
+    
+    Args:
+        request_data (dict): Cuerpo JSON de la solicitud a la API.
+        scope (str): Parte fija del prompt que delimita el ámbito.
+        text (str): Parte variable del prompt que se compara por similitud.
+        key (str): Clave exacta de la respuesta, calculada con `make_key`.
+    """
+    if not _semantic_applicable(request_data):
+        return
+    
+    vector = _embed_text(text)
+    with _semantic_lock:
+        indexes = _get_semantic_indexes()
+        namespace = _semantic_namespace(request_data, scope)
+        if namespace not in indexes:
+            indexes[namespace] = SemanticIndex(vector.shape[0])
+        indexes[namespace].add(vector, key)
+
+
+def save_semantic_index() -> None:
+    """Persiste los índices semánticos en la caché en disco."""
+    if _semantic_indexes is None or get_cache() is None:
+        return
+    with _semantic_lock:
+        get_cache().set(SEMANTIC_INDEX_KEY, _semantic_indexes)
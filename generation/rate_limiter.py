@@ -0,0 +1,94 @@
+"""
+Limitador de tasa asíncrono para las llamadas a las APIs de IA.
+
+Este módulo implementa un token bucket que acota simultáneamente las solicitudes
+por minuto (RPM) y los tokens por minuto (TPM), de modo que la generación
+concurrente de secciones no supere los límites del proveedor.
+"""
+
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRateLimiter:
+    """Token bucket asíncrono que limita solicitudes y tokens por minuto."""
+
+    def __init__(self, max_requests_per_minute: int, max_tokens_per_minute: int):
+        """
+        Inicializa el limitador con ambos cubos llenos.
+
+        Args:
+            max_requests_per_minute (int): Máximo de solicitudes por minuto.
+                                           Un valor <= 0 desactiva este límite.
+            max_tokens_per_minute (int): Máximo de tokens por minuto.
+                                         Un valor <= 0 desactiva este límite.
+        """
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self._available_requests = float(max(max_requests_per_minute, 0))
+        self._available_tokens = float(max(max_tokens_per_minute, 0))
+        self._last_update = time.monotonic()
+        self._lock = None
+        self._lock_loop = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        """Obtiene el lock del bucle de eventos actual (el cliente puede reutilizarse entre bucles)."""
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def _refill(self) -> None:
+        """Repone la capacidad de ambos cubos según el tiempo transcurrido."""
+        now = time.monotonic()
+        elapsed = now - self._last_update
+        self._last_update = now
+
+        if self.max_requests_per_minute > 0:
+            self._available_requests = min(
+                self.max_requests_per_minute,
+                self._available_requests + elapsed * self.max_requests_per_minute / 60
+            )
+        if self.max_tokens_per_minute > 0:
+            self._available_tokens = min(
+                self.max_tokens_per_minute,
+                self._available_tokens + elapsed * self.max_tokens_per_minute / 60
+            )
+
+    def _wait_time(self, tokens: int) -> float:
+        """Calcula cuánto esperar hasta disponer de una solicitud y `tokens` tokens."""
+        wait = 0.0
+        if self.max_requests_per_minute > 0 and self._available_requests < 1:
+            wait = max(wait, (1 - self._available_requests) * 60 / self.max_requests_per_minute)
+        if self.max_tokens_per_minute > 0 and self._available_tokens < tokens:
+            wait = max(wait, (tokens - self._available_tokens) * 60 / self.max_tokens_per_minute)
+        return wait
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """
+        Espera hasta que haya capacidad para una solicitud de `tokens` tokens y la consume.
+
+        Args:
+            tokens (int): Tokens estimados de la solicitud (prompt + respuesta).
+        """
+        # Una solicitud mayor que el límite TPM nunca cabría; se limita al máximo
+        if self.max_tokens_per_minute > 0:
+            tokens = min(tokens, self.max_tokens_per_minute)
+
+        async with self._get_lock():
+            while True:
+                self._refill()
+                wait = self._wait_time(tokens)
+                if wait <= 0:
+                    break
+                logger.debug(f"Límite de tasa alcanzado, esperando {wait:.2f}s")
+                await asyncio.sleep(wait)
+
+            if self.max_requests_per_minute > 0:
+                self._available_requests -= 1
+            if self.max_tokens_per_minute > 0:
+                self._available_tokens -= tokens
@@ -0,0 +1,128 @@
+"""
+Lectura y escritura de los archivos intermedios del proceso (segmentos limpios y
+segmentos para análisis).
+
+El formato se deduce de la extensión del archivo: `.msgpack` usa MessagePack,
+binario y más compacto y rápido de leer que JSON; cualquier otra extensión usa
+JSON. MessagePack es opcional y requiere `pip install msgpack`.
+"""
+
+import os
+import json
+import logging
+from dataclasses import dataclass
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+# Intentar importar msgpack para el formato intermedio binario
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# Intentar importar orjson para leer y escribir JSON más rápido
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Formatos intermedios soportados y extensión de sus archivos
+INTERMEDIATE_EXTENSIONS = {
+    'json': '.json',
+    'msgpack': '.msgpack',
+}
+
+
+@dataclass(frozen=True)
+class StagePaths:
+    """Rutas de los archivos intermedios y finales de una transcripción."""
+
+    cleaned: str
+    segments: str
+    assignments: str
+    content: str
+    report: str
+
+
+def build_output_paths(output_dir, suffix, intermediate_format='json'):
+    """
+    Define las rutas de los archivos intermedios y finales de una transcripción.
+
+    Args:
+        output_dir (str): Directorio de salida.
+        suffix (str): Sufijo común de los archivos (marca de tiempo de la ejecución).
+        intermediate_format (str): Formato de los segmentos limpios y de análisis
+                                   ('json' o 'msgpack'). Las asignaciones y el
+                                   contenido se guardan siempre en JSON.
+
+    Returns:
+        StagePaths: Rutas de los archivos. `report` no lleva extensión; cada
+                    formato de informe añade la suya.
+    """
+    extension = INTERMEDIATE_EXTENSIONS[intermediate_format]
+    return StagePaths(
+        cleaned=os.path.join(output_dir, f"cleaned_{suffix}{extension}"),
+        segments=os.path.join(output_dir, f"segments_{suffix}{extension}"),
+        assignments=os.path.join(output_dir, f"assignments_{suffix}.json"),
+        content=os.path.join(output_dir, f"content_{suffix}.json"),
+        report=os.path.join(output_dir, f"informe_{suffix}"),
+    )
+
+
+def is_msgpack_path(path):
+    """Indica si una ruta corresponde a un archivo intermedio MessagePack."""
+    return os.path.splitext(path)[1].lower() == INTERMEDIATE_EXTENSIONS['msgpack']
+
+
+def save_records(data, path):
+    """
+    Guarda un archivo intermedio en el formato que indica su extensión.
+
+    Args:
+        data: Datos serializables (listas y diccionarios).
+        path (str): Ruta del archivo de salida.
+
+    Raises:
+        ImportError: Si se pide MessagePack y msgpack no está instalado.
+    """
+    if is_msgpack_path(path):
+        if not MSGPACK_AVAILABLE:
+            raise ImportError("msgpack no está instalado. Para instalar: pip install msgpack")
+        with open(path, 'wb') as file:
+            file.write(msgpack.packb(data, use_bin_type=True))
+    elif ORJSON_AVAILABLE:
+        # orjson serializa con sangría en una sola pasada en C (json.dump con
+        # indent no usa el codificador en C) y escribe los bytes directamente
+        with open(path, 'wb') as file:
+            file.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
+
+
+def load_records(path):
+    """
+    Carga un archivo intermedio en el formato que indica su extensión.
+
+    Args:
+        path (str): Ruta del archivo.
+
+    Returns:
+        Datos deserializados.
+
+    Raises:
+        ImportError: Si el archivo es MessagePack y msgpack no está instalado.
+    """
+    if is_msgpack_path(path):
+        if not MSGPACK_AVAILABLE:
+            raise ImportError("msgpack no está instalado. Para instalar: pip install msgpack")
+        with open(path, 'rb') as file:
+            return msgpack.unpackb(file.read(), raw=False)
+    if ORJSON_AVAILABLE:
+        with open(path, 'rb') as file:
+            return orjson.loads(file.read())
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
@@ -15,11 +15,9 @@ import glob
 from datetime import datetime
 
 # Importar configuración del módulo centralizado
-from config import (
-    DEFAULT_OUTPUT_DIR,
-    DEFAULT_FORMATS,
-    validate_config
-)
+from config import get_settings, validate_config, start_queue_logging
+from pipeline import DAGPipeline, run_staged
+from intermediate import INTERMEDIATE_EXTENSIONS, MSGPACK_AVAILABLE, build_output_paths
 
 # Configuración de logging
 logging.basicConfig(
@@ -36,6 +34,346 @@ def create_directory(dir_path):
         logger.info(f"Directorio creado: {dir_path}")
 
 
+def find_latest_file(output_dir, prefix):
+    """
+    Busca el archivo intermedio más reciente de un tipo en el directorio de salida,
+    en cualquiera de los formatos intermedios soportados.
+    
+    Args:
+        output_dir (str): Directorio de salida.
+        prefix (str): Prefijo del archivo ('segments', 'assignments', 'content').
+        
+    Returns:
+        str o None: Ruta del archivo más reciente, o None si no hay ninguno.
+    """
+    extensions = tuple(INTERMEDIATE_EXTENSIONS.values())
+    
+    # Una sola pasada con os.scandir: DirEntry reutiliza los datos del listado y
+    # cada archivo candidato se consulta con stat una única vez
+    try:
+        with os.scandir(output_dir) as entries:
+            matching_files = [
+                entry for entry in entries
+                if entry.name.startswith(f"{prefix}_") and entry.name.endswith(extensions)
+                and entry.is_file()
+            ]
+    except FileNotFoundError:
+        return None
+    
+    if not matching_files:
+        return None
+    # A igual fecha de modificación decide el nombre, que lleva la marca de tiempo
+    return max(matching_files, key=lambda entry: (entry.stat().st_mtime, entry.name)).path
+
+
+def use_existing_file(output_dir, prefix, description):
+    """
+    Devuelve el archivo intermedio más reciente para una etapa omitida.
+    
+    Args:
+        output_dir (str): Directorio de salida.
+        prefix (str): Prefijo del archivo.
+        description (str): Descripción del archivo para los mensajes de log.
+        
+    Returns:
+        str: Ruta del archivo más reciente.
+        
+    Raises:
+        FileNotFoundError: Si no existe ningún archivo de ese tipo.
+    """
+    file_path = find_latest_file(output_dir, prefix)
+    if file_path is None:
+        raise FileNotFoundError(f"No se encontraron archivos de {description} existentes.")
+    logger.info(f"Usando archivo de {description} existente: {file_path}")
+    return file_path
+
+
+def run_stage(label, fn):
+    """
+    Envuelve una etapa para registrar su error con el nombre de la etapa.
+    
+    Args:
+        label (str): Nombre de la etapa para los mensajes de error.
+        fn (callable): Función de la etapa; recibe los resultados previos del pipeline.
+        
+    Returns:
+        callable: Función de la tarea del pipeline.
+    """
+    def task(results):
+        try:
+            return fn(results)
+        except Exception as e:
+            logger.error(f"ERROR en {label}: {e}")
+            raise
+    return task
+
+
+def clean_stage(transcription, paths):
+    """Limpia la transcripción y guarda los segmentos limpios."""
+    from preprocessing.cleaner import clean_transcription
+    
+    logger.info("Limpiando transcripción...")
+    return clean_transcription(transcription, paths.cleaned)
+
+
+def segment_stage(transcription, paths):
+    """
+    Segmenta la transcripción para el análisis.
+    
+    Returns:
+        str: Ruta del archivo de segmentos.
+    """
+    from preprocessing.segmenter import process_transcription_for_analysis
+    
+    start_time = time.time()
+    logger.info("Segmentando transcripción...")
+    segments = process_transcription_for_analysis(
+        transcription, paths.segments, paths.cleaned
+    )
+    
+    # Mostrar estadísticas
+    elapsed_time = time.time() - start_time
+    logger.info(f"Preprocesamiento completado en {elapsed_time:.2f} segundos")
+    logger.info(f"Segmentos generados: {len(segments)}")
+    return paths.segments
+
+
+def analysis_stage(segments_file, structure_file, paths):
+    """
+    Vectoriza los segmentos y los asigna a las secciones del informe.
+    
+    Returns:
+        str: Ruta del archivo de asignaciones.
+    """
+    from analysis.vectorizer import process_segments_and_sections
+    
+    start_time = time.time()
+    logger.info("Vectorizando y asignando segmentos a secciones...")
+    assignments = process_segments_and_sections(
+        segments_file, structure_file, paths.assignments
+    )
+    
+    # Mostrar estadísticas
+    elapsed_time = time.time() - start_time
+    logger.info(f"Análisis completado en {elapsed_time:.2f} segundos")
+    
+    # Contar asignaciones
+    total_assignments = sum(len(segments) for segments in assignments.values())
+    sections_with_content = sum(1 for segments in assignments.values() if segments)
+    
+    logger.info(f"Total de asignaciones: {total_assignments}")
+    logger.info(f"Secciones con contenido: {sections_with_content}")
+    return paths.assignments
+
+
+def generation_stage(assignments_file, args, paths):
+    """
+    Genera el contenido de cada sección con la API de IA.
+    
+    Las solicitudes se envían de forma concurrente, limitadas por --max-concurrent
+    y por los límites --rpm/--tpm (o los configurados para el proveedor).
+    
+    Returns:
+        str: Ruta del archivo de contenido generado.
+    """
+    from generation.ai_client import process_content_for_report
+    from generation import llm_cache
+    
+    if args.no_cache:
+        llm_cache.set_refresh(True)
+    
+    start_time = time.time()
+    logger.info(f"Generando contenido con {args.client}...")
+    content = process_content_for_report(
+        assignments_file, args.structure, paths.content, args.client,
+        checkpoint_path=args.checkpoint, concurrency_limit=args.max_concurrent,
+        rpm=args.rpm, tpm=args.tpm
+    )
+    
+    # Mostrar estadísticas
+    elapsed_time = time.time() - start_time
+    logger.info(f"Generación completada en {elapsed_time:.2f} segundos")
+    
+    # Contar secciones generadas
+    sections_generated = len(content.get('secciones_generadas', {}))
+    logger.info(f"Secciones generadas: {sections_generated}")
+    return paths.content
+
+
+def build_stage(content_file, structure_file, paths, formats):
+    """
+    Construye el informe final en los formatos solicitados.
+    
+    Returns:
+        dict: Archivos generados {formato: ruta}.
+    """
+    from generation.content_builder import build_report
+    
+    start_time = time.time()
+    logger.info(f"Generando informe en formatos: {', '.join(formats)}...")
+    generated_files = build_report(
+        content_file, structure_file, paths.report, formats
+    )
+    
+    # Mostrar estadísticas
+    elapsed_time = time.time() - start_time
+    logger.info(f"Construcción completada en {elapsed_time:.2f} segundos")
+    return generated_files
+
+
+def build_pipeline(args, paths, formats):
+    """
+    Registra las etapas del proceso como tareas con dependencias.
+    
+    Las etapas omitidas con --skip-* se sustituyen por una tarea sin dependencias
+    que localiza el último archivo intermedio generado. La carga del modelo de
+    embeddings no depende de nada, por lo que se solapa con el preprocesamiento.
+    
+    Args:
+        args (argparse.Namespace): Argumentos de línea de comandos.
+        paths (StagePaths): Rutas de los archivos intermedios y finales de esta ejecución.
+        formats (list): Formatos de salida del informe.
+        
+    Returns:
+        DAGPipeline: Pipeline listo para ejecutar.
+    """
+    transcription = args.transcription[0]
+    pipeline = DAGPipeline()
+    
+    # PASO 1: Preprocesamiento
+    if not args.skip_preprocessing:
+        def clean(results):
+            logger.info("\n--- ETAPA 1: PREPROCESAMIENTO ---")
+            return clean_stage(transcription, paths)
+        
+        pipeline.add('clean', run_stage("preprocesamiento", clean))
+        pipeline.add('segment', run_stage("preprocesamiento", lambda results: segment_stage(transcription, paths)),
+                     deps=('clean',))
+    else:
+        def segment(results):
+            logger.info("\n--- ETAPA 1: PREPROCESAMIENTO [OMITIDO] ---")
+            return use_existing_file(args.output, "segments", "segmentos")
+        
+        pipeline.add('segment', run_stage("preprocesamiento", segment))
+    
+    # PASO 2: Análisis y clasificación
+    if not args.skip_analysis:
+        def load_model(results):
+            # Importar el vectorizador y cargar el modelo mientras se preprocesa
+            from analysis.vectorizer import load_embedding_model
+            return load_embedding_model()
+        
+        def vectorize(results):
+            logger.info("\n--- ETAPA 2: ANÁLISIS Y CLASIFICACIÓN ---")
+            return analysis_stage(results['segment'], args.structure, paths)
+        
+        pipeline.add('load_model', run_stage("análisis", load_model))
+        pipeline.add('vectorize', run_stage("análisis", vectorize), deps=('segment', 'load_model'))
+    else:
+        def vectorize(results):
+            logger.info("\n--- ETAPA 2: ANÁLISIS Y CLASIFICACIÓN [OMITIDO] ---")
+            return use_existing_file(args.output, "assignments", "asignaciones")
+        
+        pipeline.add('vectorize', run_stage("análisis", vectorize))
+    
+    # PASO 3: Generación de contenido
+    if not args.skip_generation:
+        def generate(results):
+            logger.info("\n--- ETAPA 3: GENERACIÓN DE CONTENIDO ---")
+            return generation_stage(results['vectorize'], args, paths)
+        
+        pipeline.add('generate', run_stage("generación", generate), deps=('vectorize',))
+    else:
+        def generate(results):
+            logger.info("\n--- ETAPA 3: GENERACIÓN DE CONTENIDO [OMITIDO] ---")
+            return use_existing_file(args.output, "content", "contenido")
+        
+        pipeline.add('generate', run_stage("generación", generate))
+    
+    # PASO 4: Construcción del informe final
+    def build(results):
+        logger.info("\n--- ETAPA 4: CONSTRUCCIÓN DEL INFORME ---")
+        return build_stage(results['generate'], args.structure, paths, formats)
+    
+    pipeline.add('build', run_stage("construcción", build), deps=('generate',))
+    
+    return pipeline
+
+
+def expand_transcriptions(patterns):
+    """
+    Expande las rutas o patrones glob de transcripciones indicados con -t.
+    
+    Args:
+        patterns (list): Rutas o patrones (p. ej. "transcripciones/*.txt").
+        
+    Returns:
+        list: Rutas de transcripción sin duplicados, en el orden indicado. Un patrón
+              sin coincidencias se conserva tal cual para que falle al cargarlo.
+    """
+    transcriptions = []
+    for pattern in patterns:
+        transcriptions.extend(sorted(glob.glob(pattern)) or [pattern])
+    return list(dict.fromkeys(transcriptions))
+
+
+def run_batch(args, transcriptions, timestamp, formats):
+    """
+    Procesa varias transcripciones con un pipeline de tres etapas encadenadas.
+    
+    Mientras una transcripción se preprocesa, la anterior se vectoriza y la
+    anterior a esa espera a la API de IA; el tiempo total queda limitado por la
+    etapa más lenta (normalmente la generación) y no por la suma de las tres.
+    
+    Args:
+        args (argparse.Namespace): Argumentos de línea de comandos.
+        transcriptions (list): Rutas de las transcripciones.
+        timestamp (str): Marca de tiempo de la ejecución.
+        formats (list): Formatos de salida del informe.
+        
+    Returns:
+        list: Tuplas (trabajo, error o None) por transcripción, en orden.
+    """
+    # Sufijo por transcripción: marca de tiempo + nombre del archivo (con índice
+    # si dos transcripciones comparten nombre)
+    names = [os.path.splitext(os.path.basename(path))[0] for path in transcriptions]
+    jobs = [
+        {
+            'transcription': path,
+            'paths': build_output_paths(
+                args.output,
+                f"{timestamp}_{name}" if names.count(name) == 1 else f"{timestamp}_{i + 1}_{name}",
+                args.intermediate_format
+            ),
+        }
+        for i, (path, name) in enumerate(zip(transcriptions, names))
+    ]
+    
+    def preprocess(job):
+        logger.info(f"\n--- ETAPA 1: PREPROCESAMIENTO ({job['transcription']}) ---")
+        clean_stage(job['transcription'], job['paths'])
+        job['segments'] = segment_stage(job['transcription'], job['paths'])
+        return job
+    
+    def analyze(job):
+        logger.info(f"\n--- ETAPA 2: ANÁLISIS Y CLASIFICACIÓN ({job['transcription']}) ---")
+        job['assignments'] = analysis_stage(job['segments'], args.structure, job['paths'])
+        return job
+    
+    def generate(job):
+        logger.info(f"\n--- ETAPA 3: GENERACIÓN DE CONTENIDO ({job['transcription']}) ---")
+        job['content'] = generation_stage(job['assignments'], args, job['paths'])
+        logger.info(f"\n--- ETAPA 4: CONSTRUCCIÓN DEL INFORME ({job['transcription']}) ---")
+        job['files'] = build_stage(job['content'], args.structure, job['paths'], formats)
+        return job
+    
+    return run_staged(jobs, [
+        ("preprocesamiento", preprocess),
+        ("análisis", analyze),
+        ("generación", generate),
+    ])
+
+
 def main():
     """Función principal que coordina todo el proceso."""
     # Validar configuración inicial
@@ -43,6 +381,8 @@ def main():
         logger.error("La configuración no es válida. Revisa el archivo .env")
         return 1
     
+    settings = get_settings()
+    
     # Configurar el parser de argumentos
     parser = argparse.ArgumentParser(
         description="Generador automático de informes a partir de transcripciones"
@@ -51,7 +391,8 @@ def main():
     parser.add_argument(
         "-t", "--transcription",
         required=True,
-        help="Ruta al archivo de transcripción"
+        action="append",
+        help="Ruta o patrón glob de transcripciones (puede repetirse para procesar varias)"
     )
     
     parser.add_argument(
@@ -62,23 +403,64 @@ def main():
     
     parser.add_argument(
         "-o", "--output",
-        default=DEFAULT_OUTPUT_DIR,
-        help=f"Directorio de salida (por defecto: {DEFAULT_OUTPUT_DIR})"
+        default=settings.DEFAULT_OUTPUT_DIR,
+        help=f"Directorio de salida (por defecto: {settings.DEFAULT_OUTPUT_DIR})"
     )
     
     parser.add_argument(
         "-f", "--formats",
-        default=",".join(DEFAULT_FORMATS),
-        help=f"Formatos de salida separados por comas (por defecto: {','.join(DEFAULT_FORMATS)})"
+        default=",".join(settings.DEFAULT_FORMATS),
+        help=f"Formatos de salida separados por comas (por defecto: {','.join(settings.DEFAULT_FORMATS)})"
     )
     
     parser.add_argument(
         "-c", "--client",
         default="openai",
-        choices=["openai", "anthropic"],
+        choices=["openai", "openai-batch", "anthropic", "pool"],
         help="Cliente de IA a utilizar (por defecto: openai)"
     )
     
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        default=None,
+        help=f"Máximo de solicitudes simultáneas a la API (por defecto: {settings.MAX_CONCURRENT_REQUESTS})"
+    )
+    
+    parser.add_argument(
+        "--rpm",
+        type=int,
+        default=None,
+        help="Límite de solicitudes por minuto (por defecto: el configurado para el proveedor)"
+    )
+    
+    parser.add_argument(
+        "--tpm",
+        type=int,
+        default=None,
+        help="Límite de tokens por minuto (por defecto: el configurado para el proveedor)"
+    )
+    
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="No reutilizar respuestas cacheadas de la API (las nuevas sustituyen a las anteriores)"
+    )
+    
+    parser.add_argument(
+        "--checkpoint",
+        default=None,
+        help="Checkpoint JSONL de la generación para reanudarla (por defecto se deriva de las "
+             "asignaciones, la estructura y el modelo, así que repetir la ejecución lo reutiliza)"
+    )
+    
+    parser.add_argument(
+        "--intermediate-format",
+        choices=list(INTERMEDIATE_EXTENSIONS),
+        default="json",
+        help="Formato de los segmentos intermedios: json o msgpack (binario, requiere msgpack)"
+    )
+    
     parser.add_argument(
         "--skip-preprocessing",
         action="store_true",
@@ -103,20 +485,24 @@ def main():
     # Crear directorio de salida
     create_directory(args.output)
     
-    # Definir rutas de archivos intermedios y finales
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    cleaned_file = os.path.join(args.output, f"cleaned_{timestamp}.json")
-    segments_file = os.path.join(args.output, f"segments_{timestamp}.json")
-    assignments_file = os.path.join(args.output, f"assignments_{timestamp}.json")
-    content_file = os.path.join(args.output, f"content_{timestamp}.json")
-    report_base = os.path.join(args.output, f"informe_{timestamp}")
+    transcriptions = expand_transcriptions(args.transcription)
+    if len(transcriptions) > 1 and (args.skip_preprocessing or args.skip_analysis or args.skip_generation):
+        parser.error("Las opciones --skip-* solo admiten una única transcripción")
+    if len(transcriptions) > 1 and args.checkpoint:
+        parser.error("La opción --checkpoint solo admite una única transcripción")
+    args.transcription = transcriptions
+    
+    if args.intermediate_format == "msgpack" and not MSGPACK_AVAILABLE:
+        parser.error("--intermediate-format msgpack requiere msgpack. Para instalar: pip install msgpack")
     
+    start_datetime = datetime.now()
+    timestamp = start_datetime.strftime("%Y%m%d_%H%M%S")
     formats = [f.strip() for f in args.formats.split(",")]
     
     # Mostrar información inicial
     logger.info("\n==== GENERADOR AUTOMÁTICO DE INFORMES AMBIENTALES ====")
-    logger.info(f"Hora de inicio: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info(f"Archivo de transcripción: {args.transcription}")
+    logger.info(f"Hora de inicio: {start_datetime.strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info(f"Archivo(s) de transcripción: {', '.join(transcriptions)}")
     logger.info(f"Archivo de estructura: {args.structure}")
     logger.info(f"Directorio de salida: {args.output}")
     logger.info(f"Formatos de salida: {', '.join(formats)}")
@@ -126,155 +512,36 @@ def main():
     # Registrar tiempo de inicio global
     start_time_global = time.time()
     
-    # PASO 1: Preprocesamiento
-    if not args.skip_preprocessing:
-        logger.info("\n--- ETAPA 1: PREPROCESAMIENTO ---")
-        start_time = time.time()
-        
-        try:
-            # Importar módulos de preprocesamiento
-            from preprocessing.cleaner import clean_transcription
-            from preprocessing.segmenter import process_transcription_for_analysis
-            
-            # Limpiar transcripción
-            logger.info("Limpiando transcripción...")
-            clean_segments = clean_transcription(args.transcription, cleaned_file)
-            
-            # Procesar para análisis
-            logger.info("Segmentando transcripción...")
-            segments = process_transcription_for_analysis(
-                args.transcription, segments_file, cleaned_file
-            )
-            
-            # Mostrar estadísticas
-            elapsed_time = time.time() - start_time
-            logger.info(f"Preprocesamiento completado en {elapsed_time:.2f} segundos")
-            logger.info(f"Segmentos generados: {len(segments)}")
-        
-        except Exception as e:
-            logger.error(f"ERROR en preprocesamiento: {e}")
-            return 1
-    else:
-        logger.info("\n--- ETAPA 1: PREPROCESAMIENTO [OMITIDO] ---")
-        # Usar último archivo de segmentos generado
-        segments_glob = os.path.join(args.output, "segments_*.json")
-        matching_files = sorted(glob.glob(segments_glob), key=os.path.getmtime, reverse=True)
-        
-        if matching_files:
-            segments_file = matching_files[0]
-            logger.info(f"Usando archivo de segmentos existente: {segments_file}")
-        else:
-            logger.error("No se encontraron archivos de segmentos existentes.")
-            return 1
-    
-    # PASO 2: Análisis y clasificación
-    if not args.skip_analysis:
-        logger.info("\n--- ETAPA 2: ANÁLISIS Y CLASIFICACIÓN ---")
-        start_time = time.time()
-        
-        try:
-            # Importar módulo de análisis
-            from analysis.vectorizer import process_segments_and_sections
-            
-            # Procesar segmentos y secciones
-            logger.info("Vectorizando y asignando segmentos a secciones...")
-            assignments = process_segments_and_sections(
-                segments_file, args.structure, assignments_file
-            )
-            
-            # Mostrar estadísticas
-            elapsed_time = time.time() - start_time
-            logger.info(f"Análisis completado en {elapsed_time:.2f} segundos")
-            
-            # Contar asignaciones
-            total_assignments = sum(len(segments) for segments in assignments.values())
-            sections_with_content = sum(1 for segments in assignments.values() if segments)
-            
-            logger.info(f"Total de asignaciones: {total_assignments}")
-            logger.info(f"Secciones con contenido: {sections_with_content}")
-        
-        except Exception as e:
-            logger.error(f"ERROR en análisis: {e}")
+    if len(transcriptions) > 1:
+        # Varias transcripciones: pipeline por etapas encadenadas con colas
+        failed = 0
+        logger.info("\nARCHIVOS GENERADOS:")
+        for job, error in run_batch(args, transcriptions, timestamp, formats):
+            if error is not None:
+                failed += 1
+                logger.error(f"- {job['transcription']}: ERROR ({error})")
+                continue
+            for fmt, file_path in job['files'].items():
+                logger.info(f"- {job['transcription']} [{fmt.upper()}]: {file_path}")
+        if failed:
+            logger.error(f"{failed} de {len(transcriptions)} transcripciones no se pudieron procesar")
             return 1
     else:
-        logger.info("\n--- ETAPA 2: ANÁLISIS Y CLASIFICACIÓN [OMITIDO] ---")
-        # Usar último archivo de asignaciones generado
-        assignments_glob = os.path.join(args.output, "assignments_*.json")
-        matching_files = sorted(glob.glob(assignments_glob), key=os.path.getmtime, reverse=True)
-        
-        if matching_files:
-            assignments_file = matching_files[0]
-            logger.info(f"Usando archivo de asignaciones existente: {assignments_file}")
-        else:
-            logger.error("No se encontraron archivos de asignaciones existentes.")
-            return 1
-    
-    # PASO 3: Generación de contenido
-    if not args.skip_generation:
-        logger.info("\n--- ETAPA 3: GENERACIÓN DE CONTENIDO ---")
-        start_time = time.time()
+        # Construir el grafo de etapas; las independientes se ejecutan en paralelo
+        paths = build_output_paths(args.output, timestamp, args.intermediate_format)
+        pipeline = build_pipeline(args, paths, formats)
         
         try:
-            # Importar módulo de generación
-            from generation.ai_client import process_content_for_report
-            
-            # Generar contenido
-            logger.info(f"Generando contenido con {args.client}...")
-            content = process_content_for_report(
-                assignments_file, args.structure, content_file, args.client
-            )
-            
-            # Mostrar estadísticas
-            elapsed_time = time.time() - start_time
-            logger.info(f"Generación completada en {elapsed_time:.2f} segundos")
-            
-            # Contar secciones generadas
-            sections_generated = len(content.get('secciones_generadas', {}))
-            logger.info(f"Secciones generadas: {sections_generated}")
-        
-        except Exception as e:
-            logger.error(f"ERROR en generación: {e}")
+            results = pipeline.run()
+        except Exception:
+            # Cada etapa ya ha registrado su error
             return 1
-    else:
-        logger.info("\n--- ETAPA 3: GENERACIÓN DE CONTENIDO [OMITIDO] ---")
-        # Usar último archivo de contenido generado
-        content_glob = os.path.join(args.output, "content_*.json")
-        matching_files = sorted(glob.glob(content_glob), key=os.path.getmtime, reverse=True)
-        
-        if matching_files:
-            content_file = matching_files[0]
-            logger.info(f"Usando archivo de contenido existente: {content_file}")
-        else:
-            logger.error("No se encontraron archivos de contenido existentes.")
-            return 1
-    
-    # PASO 4: Construcción del informe final
-    logger.info("\n--- ETAPA 4: CONSTRUCCIÓN DEL INFORME ---")
-    start_time = time.time()
-    
-    try:
-        # Importar módulo de construcción
-        from generation.content_builder import build_report
-        
-        # Construir informe
-        logger.info(f"Generando informe en formatos: {', '.join(formats)}...")
-        generated_files = build_report(
-            content_file, args.structure, report_base, formats
-        )
-        
-        # Mostrar estadísticas
-        elapsed_time = time.time() - start_time
-        logger.info(f"Construcción completada en {elapsed_time:.2f} segundos")
         
         # Listar archivos generados
         logger.info("\nARCHIVOS GENERADOS:")
-        for fmt, file_path in generated_files.items():
+        for fmt, file_path in results['build'].items():
             logger.info(f"- {fmt.upper()}: {file_path}")
     
-    except Exception as e:
-        logger.error(f"ERROR en construcción: {e}")
-        return 1
-    
     # Mostrar tiempo total
     elapsed_time_global = time.time() - start_time_global
     logger.info(f"\nProceso completado en {elapsed_time_global:.2f} segundos")
@@ -283,4 +550,10 @@ def main():
 
 
 if __name__ == "__main__":
-    exit(main())
\ No newline at end of file
+    # Escribir los logs desde un hilo aparte mientras se ejecutan las etapas
+    log_listener = start_queue_logging()
+    try:
+        exit_code = main()
+    finally:
+        log_listener.stop()
+    exit(exit_code)
\ No newline at end of file
@@ -18,10 +18,23 @@ import json
 import time
 import glob
 import argparse
+import heapq
+import functools
+import importlib
+import itertools
 from datetime import datetime
 from pprint import pprint
 import logging
 
+from intermediate import build_output_paths
+
+# Intentar importar orjson para leer y escribir JSON más rápido
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -35,6 +48,17 @@ def create_directory(dir_path):
         os.makedirs(dir_path)
         print(f"✓ Directorio creado: {dir_path}")
 
+@functools.cache
+def _vectorizer():
+    """
+    Importa el módulo de vectorización la primera vez que se necesita.
+    
+    Returns:
+        module: Módulo `analysis.vectorizer`.
+    """
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return importlib.import_module('analysis.vectorizer')
+
 def print_section_separator(title):
     """Imprime un separador de sección con título para mejor visualización."""
     separator = "=" * 80
@@ -56,8 +80,8 @@ def json_pretty_print(data, limit=3):
     """
     if isinstance(data, dict):
         print("{")
-        items = list(data.items())
-        for i, (key, value) in enumerate(items[:limit]):
+        # Recorrer solo los primeros elementos, sin copiar el diccionario completo
+        for key, value in itertools.islice(data.items(), limit):
             if isinstance(value, (dict, list)) and len(value) > limit:
                 if isinstance(value, dict):
                     print(f"  '{key}': {{ ... }} ({len(value)} elementos)")
@@ -70,7 +94,7 @@ def json_pretty_print(data, limit=3):
         print("}")
     elif isinstance(data, list):
         print("[")
-        for i, item in enumerate(data[:limit]):
+        for item in itertools.islice(data, limit):
             if isinstance(item, (dict, list)) and len(item) > limit:
                 if isinstance(item, dict):
                     print(f"  {{ ... }} ({len(item)} elementos)")
@@ -111,10 +135,16 @@ def load_file(file_path, expected_type=None):
     # Cargar según tipo
     try:
         if file_ext == '.json':
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-                print(f"✓ Archivo JSON cargado correctamente (tamaño: {len(json.dumps(data))} bytes)")
-                return data
+            # El tamaño se toma del sistema de archivos para no volver a serializar los datos
+            size_bytes = os.path.getsize(file_path)
+            if ORJSON_AVAILABLE:
+                with open(file_path, 'rb') as file:
+                    data = orjson.loads(file.read())
+            else:
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    data = json.load(file)
+            print(f"✓ Archivo JSON cargado correctamente (tamaño: {size_bytes} bytes)")
+            return data
         else:  # Texto plano por defecto
             with open(file_path, 'r', encoding='utf-8') as file:
                 data = file.read()
@@ -124,6 +154,35 @@ def load_file(file_path, expected_type=None):
         print(f"✗ Error al cargar el archivo: {str(e)}")
         sys.exit(1)
 
+def load_text_preview(file_path, n_lines=5):
+    """
+    Lee las primeras líneas de un archivo de texto y cuenta las restantes sin
+    cargar el archivo completo en memoria.
+    
+    Args:
+        file_path: Ruta al archivo
+        n_lines: Número de líneas a devolver para mostrarlas
+        
+    Returns:
+        tuple: (primeras líneas sin salto de línea, número total de líneas)
+    """
+    print_step_info(f"Cargando archivo: {file_path}")
+    
+    if not os.path.exists(file_path):
+        print(f"✗ Error: El archivo {file_path} no existe")
+        sys.exit(1)
+    
+    try:
+        size_bytes = os.path.getsize(file_path)
+        with open(file_path, 'r', encoding='utf-8') as file:
+            head = [line.rstrip("\n") for line in itertools.islice(file, n_lines)]
+            line_count = len(head) + sum(1 for _ in file)
+        print(f"✓ Archivo de texto cargado correctamente (tamaño: {size_bytes} bytes)")
+        return head, line_count
+    except Exception as e:
+        print(f"✗ Error al cargar el archivo: {str(e)}")
+        sys.exit(1)
+
 def save_file(data, file_path):
     """
     Guarda datos en un archivo.
@@ -139,9 +198,13 @@ def save_file(data, file_path):
         file_ext = os.path.splitext(file_path)[1].lower()
         
         if file_ext == '.json':
-            with open(file_path, 'w', encoding='utf-8') as file:
-                json.dump(data, file, ensure_ascii=False, indent=2)
-                print(f"✓ Archivo JSON guardado correctamente")
+            if ORJSON_AVAILABLE:
+                with open(file_path, 'wb') as file:
+                    file.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            else:
+                with open(file_path, 'w', encoding='utf-8') as file:
+                    json.dump(data, file, ensure_ascii=False, indent=2)
+            print(f"✓ Archivo JSON guardado correctamente")
         else:  # Texto plano por defecto
             with open(file_path, 'w', encoding='utf-8') as file:
                 file.write(data)
@@ -192,14 +255,13 @@ def main():
     create_directory(args.output)
     
     # Definir rutas de archivos intermedios
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    cleaned_file = os.path.join(args.output, f"cleaned_{timestamp}.json")
-    segments_file = os.path.join(args.output, f"segments_{timestamp}.json")
-    assignments_file = os.path.join(args.output, f"assignments_{timestamp}.json")
+    start_datetime = datetime.now()
+    timestamp = start_datetime.strftime("%Y%m%d_%H%M%S")
+    paths = build_output_paths(args.output, timestamp)
     
     # Mostrar información inicial
     print_section_separator("PROCESAMIENTO DE TRANSCRIPCIONES AMBIENTALES")
-    print(f"Fecha y hora: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Fecha y hora: {start_datetime.strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"Archivo de transcripción: {args.transcription}")
     print(f"Archivo de estructura: {args.structure}")
     print(f"Directorio de salida: {args.output}")
@@ -220,11 +282,9 @@ def main():
     # 1.2 Extraer y mostrar información de secciones
     print_step_info("Analizando estructura del informe")
     
-    # Importar función para extraer secciones (permite ver la estructura plana)
-    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from analysis.vectorizer import extract_sections_data
-    
-    sections = extract_sections_data(structure)
+    # Extraer secciones (permite ver la estructura plana); el resultado se
+    # reutiliza entre ejecuciones mientras el archivo de estructura no cambie
+    sections = _vectorizer().load_sections_data(args.structure, structure)
     
     # Mostrar estadísticas de la estructura
     print(f"✓ Estructura cargada: {len(sections)} secciones identificadas")
@@ -255,21 +315,21 @@ def main():
     
     # 2.1 Cargar transcripción original
     print_step_info("Cargando archivo de transcripción")
-    transcription_content = load_file(args.transcription)
+    # Solo se leen las líneas a mostrar; la limpieza lee el archivo desde su ruta
+    head, line_count = load_text_preview(args.transcription)
     
     # Mostrar fragmento de la transcripción
-    lines = transcription_content.split("\n")
     print("\nFragmento de la transcripción original:")
-    for line in lines[:5]:
+    for line in head:
         print(f"  {line}")
-    if len(lines) > 5:
-        print(f"  ... ({len(lines)} líneas en total)")
+    if line_count > 5:
+        print(f"  ... ({line_count} líneas en total)")
     
     # 2.2 Limpiar transcripción
     print_step_info("Limpiando transcripción")
     from preprocessing.cleaner import clean_transcription
     
-    clean_segments = clean_transcription(args.transcription, cleaned_file)
+    clean_segments = clean_transcription(args.transcription, paths.cleaned)
     
     # Mostrar ejemplos de segmentos limpios
     print(f"\n✓ Limpieza completada: {len(clean_segments)} segmentos extraídos")
@@ -287,7 +347,7 @@ def main():
     from preprocessing.segmenter import process_transcription_for_analysis
     
     analysis_segments = process_transcription_for_analysis(
-        args.transcription, segments_file, cleaned_file
+        args.transcription, paths.segments, paths.cleaned
     )
     
     # Mostrar ejemplos de segmentos temáticos
@@ -314,11 +374,9 @@ def main():
     
     # 3.1 Vectorizar y clasificar segmentos
     print_step_info("Vectorizando y clasificando segmentos")
-    from analysis.vectorizer import process_segments_and_sections
-    
     # Procesar segmentos y asignarlos a secciones
-    assignments = process_segments_and_sections(
-        segments_file, args.structure, assignments_file
+    assignments = _vectorizer().process_segments_and_sections(
+        paths.segments, args.structure, paths.assignments
     )
     
     # 3.2 Analizar y mostrar resultados de clasificación
@@ -334,10 +392,12 @@ def main():
     
     # Mostrar las secciones con más contenido
     print("\nSecciones con más contenido:")
-    top_sections = sorted(
-        [(section_id, len(segments)) for section_id, segments in assignments.items()],
-        key=lambda x: x[1], reverse=True
-    )[:5]
+    # nlargest evita ordenar todas las secciones para quedarse con cinco
+    top_sections = heapq.nlargest(
+        5,
+        ((section_id, len(segments)) for section_id, segments in assignments.items()),
+        key=lambda x: x[1]
+    )
     
     for section_id, count in top_sections:
         if count > 0:
@@ -346,7 +406,7 @@ def main():
             print(f"  • {section_title}: {count} segmentos")
     
     # Guardar asignaciones
-    save_file(assignments, assignments_file)
+    save_file(assignments, paths.assignments)
     
     elapsed_time = time.time() - start_time
     print(f"\n✓ Vectorización y clasificación completadas en {elapsed_time:.2f} segundos")
@@ -408,9 +468,9 @@ def main():
     print(f"Total de segmentos asignados a secciones: {total_segments_assigned}")
     print(f"Secciones con contenido: {sections_with_content} de {len(sections)}")
     print(f"\nArchivos generados:")
-    print(f"  • Segmentos limpios: {cleaned_file}")
-    print(f"  • Segmentos para análisis: {segments_file}")
-    print(f"  • Asignaciones a secciones: {assignments_file}")
+    print(f"  • Segmentos limpios: {paths.cleaned}")
+    print(f"  • Segmentos para análisis: {paths.segments}")
+    print(f"  • Asignaciones a secciones: {paths.assignments}")
     
     print(f"\n✓ Proceso completado con éxito")
     
@@ -423,4 +483,11 @@ def main():
     return 0
 
 if __name__ == "__main__":
-    exit(main())
\ No newline at end of file
+    # Escribir los logs de los módulos de análisis desde un hilo aparte
+    from config import start_queue_logging
+    log_listener = start_queue_logging()
+    try:
+        exit_code = main()
+    finally:
+        log_listener.stop()
+    exit(exit_code)
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Planificador de tareas con dependencias para el proceso de generación de informes.
+
+Las etapas del proceso se registran como tareas de un grafo acíclico dirigido (DAG)
+y se ejecutan en hilos en orden topológico (algoritmo de Kahn): cada tarea se lanza
+en cuanto terminan todas sus dependencias, de modo que las tareas independientes
+(p. ej. la carga del modelo de embeddings y el preprocesamiento) se solapan.
+
+Para varios elementos (p. ej. varias transcripciones), `run_staged` encadena las
+etapas con colas y una hebra por etapa, de modo que cada etapa trabaja sobre un
+elemento distinto a la vez.
+"""
+
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Task:
+    """
+    Tarea del pipeline.
+
+    `fn` recibe un diccionario con los resultados de las tareas ya terminadas
+    (al menos los de sus dependencias) y devuelve el resultado de la tarea.
+    """
+
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    deps: Tuple[str, ...] = field(default_factory=tuple)
+
+
+class DAGPipeline:
+    """Conjunto de tareas con dependencias que se ejecutan en orden topológico."""
+
+    def __init__(self):
+        """Inicializa un pipeline sin tareas."""
+        self.tasks: Dict[str, Task] = {}
+
+    def add(self, name: str, fn: Callable[[Dict[str, Any]], Any], deps: Tuple[str, ...] = ()) -> None:
+        """
+        Registra una tarea.
+
+        Args:
+            name (str): Nombre único de la tarea.
+            fn (callable): Función que ejecuta la tarea a partir de los resultados previos.
+            deps (tuple): Nombres de las tareas que deben terminar antes.
+
+        Raises:
+            ValueError: Si ya existe una tarea con ese nombre.
+        """
+        if name in self.tasks:
+            raise ValueError(f"La tarea '{name}' ya está registrada en el pipeline")
+        self.tasks[name] = Task(name, fn, tuple(deps))
+
+    def _build_graph(self) -> Tuple[Dict[str, int], Dict[str, List[str]]]:
+        """
+        Calcula el grado de entrada de cada tarea y sus dependientes.
+
+        Returns:
+            tuple: (grado de entrada por tarea, lista de dependientes por tarea).
+
+        Raises:
+            ValueError: Si una dependencia no existe o el grafo tiene ciclos.
+        """
+        indegree = {name: len(task.deps) for name, task in self.tasks.items()}
+        dependents = {name: [] for name in self.tasks}
+        for task in self.tasks.values():
+            for dep in task.deps:
+                if dep not in self.tasks:
+                    raise ValueError(f"La tarea '{task.name}' depende de '{dep}', que no está registrada")
+                dependents[dep].append(task.name)
+
+        # Comprobar ciclos antes de lanzar nada: Kahn en seco sobre una copia
+        remaining = dict(indegree)
+        ready = [name for name, degree in remaining.items() if degree == 0]
+        visited = 0
+        while ready:
+            name = ready.pop()
+            visited += 1
+            for dependent in dependents[name]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        if visited != len(self.tasks):
+            raise ValueError("El pipeline contiene dependencias cíclicas")
+
+        return indegree, dependents
+
+    def run(self, max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Ejecuta todas las tareas respetando sus dependencias.
+
+        Si una tarea falla no se lanzan más tareas; se espera a las que están en
+        curso y se propaga el primer error.
+
+        Args:
+            max_workers (int, optional): Máximo de tareas simultáneas. Por defecto,
+                                         tantas como tareas registradas.
+
+        Returns:
+            dict: Resultado de cada tarea {nombre: resultado}.
+        """
+        indegree, dependents = self._build_graph()
+        results: Dict[str, Any] = {}
+        if not self.tasks:
+            return results
+
+        error = None
+        with ThreadPoolExecutor(max_workers=max_workers or len(self.tasks)) as executor:
+            running = {}
+
+            def submit_ready(names):
+                for name in names:
+                    logger.debug(f"Lanzando tarea del pipeline: {name}")
+                    running[executor.submit(self.tasks[name].fn, results)] = name
+
+            submit_ready([name for name, degree in indegree.items() if degree == 0])
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        error = error or e
+                        continue
+
+                    if error is None:
+                        ready = []
+                        for dependent in dependents[name]:
+                            indegree[dependent] -= 1
+                            if indegree[dependent] == 0:
+                                ready.append(dependent)
+                        submit_ready(ready)
+
+        if error is not None:
+            raise error
+        return results
+
+
+# Marca de fin de la entrada de una etapa de `run_staged`
+_END_OF_STREAM = object()
+
+
+def run_staged(items: List[Any], stages: List[Tuple[str, Callable[[Any], Any]]],
+               maxsize: int = 2) -> List[Tuple[Any, Optional[Exception]]]:
+    """
+    Procesa una lista de elementos a través de etapas encadenadas por colas.
+    
+    Cada etapa se ejecuta en su propia hebra, así que mientras la etapa k procesa el
+    elemento n, la etapa k-1 ya trabaja con el n+1. El rendimiento queda limitado
+    por la etapa más lenta y no por la suma de todas. Las colas intermedias
+    tienen capacidad `maxsize` para que una etapa rápida no se adelante demasiado.
+    
+    Args:
+        items (list): Elementos de entrada, en orden.
+        stages (list): Tuplas (nombre, función). Cada función recibe el resultado
+                       de la etapa anterior (o el elemento original en la primera)
+                       y devuelve la entrada de la siguiente.
+        maxsize (int): Capacidad de las colas entre etapas.
+        
+    Returns:
+        list: Tuplas (último resultado, error o None) en el orden de entrada. Un
+              elemento cuya etapa falla no pasa por las etapas siguientes y
+              conserva el último resultado correcto.
+    """
+    queues = [queue.Queue(maxsize=maxsize) for _ in stages] + [queue.Queue()]
+    
+    def worker(name, fn, q_in, q_out):
+        while True:
+            entry = q_in.get()
+            if entry is _END_OF_STREAM:
+                q_out.put(_END_OF_STREAM)
+                return
+            value, error = entry
+            if error is None:
+                try:
+                    value = fn(value)
+                except Exception as e:
+                    logger.error(f"Error en la etapa '{name}': {e}")
+                    error = e
+            q_out.put((value, error))
+    
+    threads = [
+        threading.Thread(target=worker, args=(name, fn, queues[i], queues[i + 1]),
+                         name=f"stage-{name}", daemon=True)
+        for i, (name, fn) in enumerate(stages)
+    ]
+    for thread in threads:
+        thread.start()
+    
+    for item in items:
+        queues[0].put((item, None))
+    queues[0].put(_END_OF_STREAM)
+    
+    results = []
+    while True:
+        entry = queues[-1].get()
+        if entry is _END_OF_STREAM:
+            break
+        results.append(entry)
+    
+    for thread in threads:
+        thread.join()
+    return results
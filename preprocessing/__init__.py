@@ -1,5 +1,24 @@
 """
 Módulos de preprocesamiento para transcripciones.
+
+Las funciones se importan bajo demanda (PEP 562): importar un submódulo del
+paquete no carga los demás ni sus dependencias.
 """
-from preprocessing.cleaner import clean_transcription
-from preprocessing.segmenter import process_transcription_for_analysis
\ No newline at end of file
+import importlib
+
+# Nombre exportado -> submódulo que lo define
+_EXPORTS = {
+    'clean_transcription': 'preprocessing.cleaner',
+    'process_transcription_for_analysis': 'preprocessing.segmenter',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    """Importa el submódulo que define `name` la primera vez que se accede a él."""
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,18 +7,121 @@ de audio antes de su procesamiento para clasificación y generación de contenid
 
 import re
 import os
-import json
+import mmap
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+# A partir de cuántos segmentos se limpian en varios procesos: por debajo, el
+# arranque de los procesos cuesta más que la limpieza en serie
+PARALLEL_CLEANING_MIN_SEGMENTS = 2000
+PARALLEL_CLEANING_CHUNKSIZE = 64
+
+# Arranque de los procesos de limpieza. Cuando se limpia, el pipeline ya tiene
+# otros hilos vivos (etapas en paralelo, la carga del modelo de embeddings, el
+# listener de logging) y hacer fork de un proceso con hilos puede dejar un lock
+# tomado en el hijo; forkserver parte de un proceso limpio (spawn donde no existe)
+_CLEANING_MP_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+# A partir de este tamaño la transcripción se mapea en memoria en lugar de leerse
+MMAP_THRESHOLD_BYTES = 4 * 1024 * 1024
+
+# Correcciones de errores comunes de transcripción automática (claves en minúsculas)
+TRANSCRIPTION_CORRECTIONS = {
+    # Errores típicos de nombres propios y términos técnicos
+    'comfama': 'Comfama',
+    'san luis': 'San Luis',
+    'bosquecinos': 'Bosquecinos',
+    'cubas': 'Cuba',
+    'pantagoras': 'Pantagoras',
+    'arnulfo': 'Arnulfo',
+    'ndvi': 'NDVI',
+    
+    # Errores de puntuación
+    ',,': ',',
+    '..': '.',
+    ' ,': ',',
+    ' .': '.',
+    
+    # Errores de espaciado
+    '  ': ' ',
+    
+    # Términos mal transcritos comunes. "este" y "cierto" no se eliminan: además
+    # de muletillas son palabras con contenido ("al este del río", "es cierto que")
+    'eh': '',
+    'pues': '',
+    'digamos': '',
+}
+
+
+
+def _build_corrections_pattern(corrections):
+    """
+    Compila todas las correcciones en una única alternancia, de modo que cada
+    texto se recorre una sola vez.
+    
+    Las palabras se delimitan con \\b para no corregir fragmentos de otras
+    palabras; las correcciones de puntuación y espaciado no empiezan ni terminan
+    en un carácter de palabra, así que con \\b casi nunca coincidirían y se
+    buscan sin delimitar. Las claves más largas van primero para que prevalezcan
+    sobre las que empiezan igual.
+    
+    Args:
+        corrections (dict): Correcciones {error en minúsculas: corrección}.
+        
+    Returns:
+        re.Pattern: Patrón compilado (sin distinguir mayúsculas).
+    """
+    keys = sorted(corrections, key=len, reverse=True)
+    words = [re.escape(key) for key in keys if re.fullmatch(r'\w(.*\w)?', key)]
+    symbols = [re.escape(key) for key in keys if not re.fullmatch(r'\w(.*\w)?', key)]
+    
+    alternatives = []
+    if words:
+        alternatives.append(r'\b(?:' + '|'.join(words) + r')\b')
+    alternatives.extend(symbols)
+    return re.compile('|'.join(alternatives), re.IGNORECASE)
+
+
+_CORRECTIONS_RE = _build_corrections_pattern(TRANSCRIPTION_CORRECTIONS)
+
+# Segmento con marca temporal: [HH:MM:SS - HH:MM:SS]: texto. El texto abarca
+# líneas hasta la siguiente que empiece por "[" o el final; se expresa como
+# bucle desenrollado (línea, y más líneas que no empiecen por "[") para que el
+# emparejamiento sea voraz y lineal, sin la búsqueda perezosa que comprobaba la
+# anticipación en cada carácter. El texto puede contener corchetes ("[inaudible]")
+_TIMESTAMPED_SEGMENT_PATTERN = r'\[(\d{2}:\d{2}:\d{2}) - (\d{2}:\d{2}:\d{2})\]:([^\n]*(?:\n(?!\[)[^\n]*)*)'
+_TIMESTAMPED_SEGMENT_RE = re.compile(_TIMESTAMPED_SEGMENT_PATTERN)
+# Misma expresión sobre bytes, para transcripciones mapeadas en memoria
+_TIMESTAMPED_SEGMENT_BYTES_RE = re.compile(_TIMESTAMPED_SEGMENT_PATTERN.encode('ascii'))
+
+# Patrón de normalización de puntuación
+# Sobre texto con los espacios ya colapsados, una sola pasada cubre el espacio
+# sobrante antes de un signo o de ")", el espacio tras "(", los puntos
+# suspensivos y el espacio que falta tras un signo (los grupos indican qué caso
+# ha coincidido; tras un signo seguido de otro signo no se inserta espacio)
+_PUNCTUATION_RE = re.compile(r' (?=[.,;:!?)])|\( |(\.{2,})(?=([^\s).,;:!?])?)|[.,;:!?](?=[^\s).,;:!?])')
 
 
 def load_transcription(file_path):
     """
     Carga un archivo de transcripción.
     
+    Los archivos de más de `MMAP_THRESHOLD_BYTES` no se leen ni se decodifican
+    completos: se mapean en memoria de solo lectura, el sistema operativo carga
+    las páginas a medida que se recorren y solo se decodifica el texto de cada
+    segmento. Quien reciba el mapa debe cerrarlo al terminar.
+    
     Args:
         file_path (str): Ruta al archivo de transcripción.
         
     Returns:
-        str: Contenido del archivo de transcripción.
+        str | mmap.mmap: Contenido del archivo de transcripción, o el archivo
+                         mapeado en memoria si es grande.
         
     Raises:
         FileNotFoundError: Si el archivo no existe.
@@ -26,6 +129,10 @@ def load_transcription(file_path):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"El archivo de transcripción {file_path} no existe.")
     
+    if os.path.getsize(file_path) > MMAP_THRESHOLD_BYTES:
+        with open(file_path, 'rb') as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    
     with open(file_path, 'r', encoding='utf-8') as file:
         transcription = file.read()
     
@@ -37,18 +144,23 @@ def extract_timestamped_segments(transcription):
     Extrae segmentos con marcas temporales de una transcripción.
     
     Args:
-        transcription (str): Contenido de la transcripción.
+        transcription (str | bytes | mmap.mmap): Contenido de la transcripción.
+                                                 Si son bytes (UTF-8), solo se
+                                                 decodifica cada segmento.
         
     Returns:
         list: Lista de diccionarios con los segmentos y sus marcas temporales.
               Cada diccionario tiene las claves 'timestamp' y 'text'.
     """
-    # Patrón para buscar: [HH:MM:SS - HH:MM:SS]: texto
-    pattern = r'\[(\d{2}:\d{2}:\d{2}) - (\d{2}:\d{2}:\d{2})\]:(.*?)(?=\n\[|$)'
-    matches = re.findall(pattern, transcription, re.DOTALL)
+    is_text = isinstance(transcription, str)
+    pattern = _TIMESTAMPED_SEGMENT_RE if is_text else _TIMESTAMPED_SEGMENT_BYTES_RE
     
     segments = []
-    for start_time, end_time, text in matches:
+    for match in pattern.finditer(transcription):
+        start_time, end_time, text = match.groups()
+        if not is_text:
+            start_time, end_time = start_time.decode('ascii'), end_time.decode('ascii')
+            text = text.decode('utf-8')
         segments.append({
             'timestamp': {
                 'start': start_time,
@@ -70,39 +182,7 @@ def correct_common_transcription_errors(text):
     Returns:
         str: Texto corregido.
     """
-    # Corregir errores comunes de transcripción automática
-    corrections = {
-        # Errores típicos de nombres propios y términos técnicos
-        'comfama': 'Comfama',
-        'san luis': 'San Luis',
-        'bosquecinos': 'Bosquecinos',
-        'cubas': 'Cuba',
-        'pantagoras': 'Pantagoras',
-        'arnulfo': 'Arnulfo',
-        'ndvi': 'NDVI',
-        
-        # Errores de puntuación
-        ',,': ',',
-        '..': '.',
-        ' ,': ',',
-        ' .': '.',
-        
-        # Errores de espaciado
-        '  ': ' ',
-        
-        # Términos mal transcritos comunes
-        'eh': '',
-        'este': '',
-        'pues': '',
-        'cierto': '',
-        'digamos': '',
-    }
-    
-    # Aplicar correcciones
-    for error, correction in corrections.items():
-        text = re.sub(r'\\b' + error + r'\\b', correction, text, flags=re.IGNORECASE)
-    
-    return text
+    return _CORRECTIONS_RE.sub(lambda match: TRANSCRIPTION_CORRECTIONS[match.group(0).lower()], text)
 
 
 def normalize_punctuation(text):
@@ -115,42 +195,117 @@ def normalize_punctuation(text):
     Returns:
         str: Texto con puntuación normalizada.
     """
-    # Eliminar espacios antes de signos de puntuación
-    text = re.sub(r'\s+([.,;:!?])', r'\1', text)
+    # Colapsar cualquier secuencia de espacios en blanco en un solo espacio y
+    # recortar los extremos (str.split recorre el texto en C)
+    text = " ".join(text.split())
+    return _PUNCTUATION_RE.sub(_fix_punctuation, text)
+
+
+def _fix_punctuation(match):
+    """Reemplazo de cada coincidencia de `_PUNCTUATION_RE`."""
+    found = match.group()
+    if found == ' ':
+        return ''
+    if found == '( ':
+        return '('
+    if match.group(1):
+        return '... ' if match.group(2) else '...'
+    return found + ' '
+
+
+def clean_speaker_indicators(text):
+    """
+    Elimina indicadores de hablantes del texto (ej: "Juan:", "Persona 1:").
     
-    # Asegurar que haya un espacio después de los signos de puntuación
-    text = re.sub(r'([.,;:!?])([^\s])', r'\1 \2', text)
+    Args:
+        text (str): Texto a limpiar.
+        
+    Returns:
+        str: Texto sin indicadores de hablantes.
+    """
+    if ':' not in text:
+        return text
     
-    # Normalizar puntos suspensivos
-    text = re.sub(r'\.{2,}', '...', text)
+    # Eliminar indicadores de hablante al inicio del texto o después de punto:
+    # un nombre de una o dos palabras seguido de dos puntos y espacio
+    chunks = text.split('. ')
+    for i, chunk in enumerate(chunks):
+        colon = chunk.find(':')
+        if colon > 0 and chunk[colon + 1:colon + 2].isspace() and _is_speaker_name(chunk[:colon]):
+            chunks[i] = chunk[colon + 1:].lstrip()
     
-    # Asegurar que los paréntesis tengan el espaciado correcto
-    text = re.sub(r'\(\s+', '(', text)
-    text = re.sub(r'\s+\)', ')', text)
+    return '. '.join(chunks)
+
+
+def _is_speaker_name(name):
+    """Indica si `name` es una o dos palabras alfabéticas separadas por un espacio."""
+    first, _, second = name.partition(' ')
+    return first.isalpha() and (not second or second.isalpha())
+
+
+def clean_segment_text(text):
+    """
+    Aplica todas las correcciones de limpieza al texto de un segmento.
     
-    # Eliminar múltiples espacios consecutivos
-    text = re.sub(r'\s{2,}', ' ', text)
+    Args:
+        text (str): Texto del segmento.
+        
+    Returns:
+        str: Texto corregido, con la puntuación normalizada y sin indicadores de hablante.
+    """
+    text = correct_common_transcription_errors(text)
+    text = normalize_punctuation(text)
+    return clean_speaker_indicators(text)
+
+
+def time_to_seconds(time_str):
+    """
+    Convierte una marca temporal HH:MM:SS a segundos.
     
-    return text.strip()
+    Args:
+        time_str (str): Marca temporal con el formato HH:MM:SS.
+        
+    Returns:
+        int: Segundos transcurridos.
+    """
+    hours, minutes, seconds = map(int, time_str.split(':'))
+    return hours * 3600 + minutes * 60 + seconds
 
 
-def clean_speaker_indicators(text):
+def timestamps_to_seconds(time_strs):
     """
-    Elimina indicadores de hablantes del texto (ej: "Juan:", "Persona 1:").
+    Convierte una lista de marcas temporales HH:MM:SS a segundos de una vez.
+    
+    Las marcas tienen ancho fijo, así que se concatenan en un único búfer de
+    bytes y los dígitos se combinan con aritmética de NumPy sobre todas las
+    filas, sin convertir cada cadena en Python.
     
     Args:
-        text (str): Texto a limpiar.
+        time_strs (list): Marcas temporales con el formato HH:MM:SS.
         
     Returns:
-        str: Texto sin indicadores de hablantes.
+        numpy.ndarray: Segundos de cada marca (int32).
     """
-    # Patrón para identificar indicadores de hablante al inicio de línea o después de punto
-    pattern = r'(^|\. )([A-Za-zÁÉÍÓÚáéíóúÑñ]+ ?[A-Za-zÁÉÍÓÚáéíóúÑñ]*:)\s+'
+    try:
+        raw = ''.join(time_strs).encode('ascii')
+    except UnicodeEncodeError:
+        raw = b''
     
-    # Eliminar indicadores de hablante
-    text = re.sub(pattern, r'\1', text)
+    if len(raw) == 8 * len(time_strs):
+        digits = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 8).astype(np.int32) - ord('0')
+        # Cada fila debe ser exactamente HH:MM:SS: separadores en las columnas
+        # 2 y 5 y dígitos ASCII en el resto (una longitud total correcta no
+        # basta, las marcas podrían estar desalineadas)
+        separators = digits[:, [2, 5]]
+        numbers = digits[:, [0, 1, 3, 4, 6, 7]]
+        if (separators == ord(':') - ord('0')).all() and ((numbers >= 0) & (numbers <= 9)).all():
+            return ((digits[:, 0] * 10 + digits[:, 1]) * 3600
+                    + (digits[:, 3] * 10 + digits[:, 4]) * 60
+                    + digits[:, 6] * 10 + digits[:, 7])
     
-    return text
+    # Alguna marca no tiene el formato esperado: convertirlas una a una
+    return np.fromiter((time_to_seconds(time_str) for time_str in time_strs),
+                       dtype=np.int32, count=len(time_strs))
 
 
 def merge_related_segments(segments, max_gap_seconds=30):
@@ -167,31 +322,25 @@ def merge_related_segments(segments, max_gap_seconds=30):
     if not segments:
         return []
     
-    # Función auxiliar para convertir tiempo (HH:MM:SS) a segundos
-    def time_to_seconds(time_str):
-        h, m, s = map(int, time_str.split(':'))
-        return h * 3600 + m * 60 + s
+    # Convertir todas las marcas temporales de una vez y comparar las brechas
+    # entre segmentos consecutivos de forma vectorizada
+    starts = timestamps_to_seconds([segment['timestamp']['start'] for segment in segments])
+    ends = timestamps_to_seconds([segment['timestamp']['end'] for segment in segments])
+    gaps = starts[1:] - ends[:-1]
     
-    merged_segments = []
-    current_segment = segments[0].copy()
+    # Un grupo nuevo empieza en cada segmento cuya brecha supera el máximo
+    break_points = (np.flatnonzero(gaps > max_gap_seconds) + 1).tolist()
+    bounds = zip([0] + break_points, break_points + [len(segments)])
     
-    for i in range(1, len(segments)):
-        prev_end_time = time_to_seconds(current_segment['timestamp']['end'])
-        current_start_time = time_to_seconds(segments[i]['timestamp']['start'])
-        
-        # Si la brecha temporal es pequeña, fusionar
-        if current_start_time - prev_end_time <= max_gap_seconds:
-            # Actualizar el tiempo final
-            current_segment['timestamp']['end'] = segments[i]['timestamp']['end']
-            # Concatenar el texto
-            current_segment['text'] += " " + segments[i]['text']
-        else:
-            # Guardar el segmento actual y comenzar uno nuevo
-            merged_segments.append(current_segment)
-            current_segment = segments[i].copy()
-    
-    # Añadir el último segmento
-    merged_segments.append(current_segment)
+    merged_segments = []
+    for first, last in bounds:
+        merged = segments[first].copy()
+        merged['timestamp'] = {
+            'start': segments[first]['timestamp']['start'],
+            'end': segments[last - 1]['timestamp']['end']
+        }
+        merged['text'] = " ".join(segment['text'] for segment in segments[first:last])
+        merged_segments.append(merged)
     
     return merged_segments
 
@@ -217,19 +366,27 @@ def clean_transcription(file_path, output_path=None):
         return []
     
     # Extraer segmentos con marcas temporales
-    segments = extract_timestamped_segments(transcription)
+    try:
+        segments = extract_timestamped_segments(transcription)
+    finally:
+        if isinstance(transcription, mmap.mmap):
+            transcription.close()
     print(f"Se extrajeron {len(segments)} segmentos con marcas temporales")
     
-    # Limpiar y corregir cada segmento
-    for segment in segments:
-        # Corrección de errores comunes
-        segment['text'] = correct_common_transcription_errors(segment['text'])
-        
-        # Normalización de puntuación
-        segment['text'] = normalize_punctuation(segment['text'])
-        
-        # Limpieza de indicadores de hablantes
-        segment['text'] = clean_speaker_indicators(segment['text'])
+    # Limpiar y corregir cada segmento (errores comunes, puntuación y hablantes)
+    texts = [segment['text'] for segment in segments]
+    workers = os.cpu_count() or 1
+    if workers > 1 and len(texts) >= PARALLEL_CLEANING_MIN_SEGMENTS:
+        # Cada segmento se limpia de forma independiente; las expresiones
+        # regulares no liberan el GIL, así que se reparten entre procesos
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_CLEANING_MP_CONTEXT) as executor:
+            cleaned_texts = list(executor.map(clean_segment_text, texts,
+                                              chunksize=PARALLEL_CLEANING_CHUNKSIZE))
+    else:
+        cleaned_texts = [clean_segment_text(text) for text in texts]
+    
+    for segment, text in zip(segments, cleaned_texts):
+        segment['text'] = text
     
     # Fusionar segmentos relacionados
     merged_segments = merge_related_segments(segments)
@@ -237,8 +394,8 @@ def clean_transcription(file_path, output_path=None):
     
     # Guardar resultado si se especificó una ruta de salida
     if output_path:
-        with open(output_path, 'w', encoding='utf-8') as file:
-            json.dump(merged_segments, file, ensure_ascii=False, indent=2)
+        from intermediate import save_records
+        save_records(merged_segments, output_path)
         print(f"Transcripción limpia guardada en {output_path}")
     
     return merged_segments
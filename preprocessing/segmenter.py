@@ -7,12 +7,11 @@ en unidades temáticas que puedan ser analizadas y clasificadas.
 
 import re
 import os
-import json
 import nltk
 from nltk.tokenize import sent_tokenize
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+from preprocessing.stop_words import get_spanish_stop_words
 
 # Asegurar que los recursos de NLTK estén descargados
 try:
@@ -21,6 +20,50 @@ except LookupError:
     nltk.download('punkt')
 
 
+# Abreviaturas comunes en español cuyo punto no marca el fin de una oración
+# (añadir más según sea necesario)
+SPANISH_ABBREVIATIONS = ('Dr.', 'Sr.', 'Sra.', 'Srta.', 'vs.', 'etc.', 'aprox.')
+
+# Todas las abreviaturas en una única alternancia: el punto se sustituye por un
+# centinela en una sola pasada, sea cual sea el número de abreviaturas
+_ABBREVIATION_SENTINEL = '\x00'
+_ABBREVIATION_RE = re.compile(
+    r'\b(' + '|'.join(re.escape(abbr[:-1]) for abbr in sorted(SPANISH_ABBREVIATIONS, key=len, reverse=True)) + r')\.'
+)
+
+# Fin de oración en texto limpio: signo final, espacio y mayúscula (admitiendo
+# signos de apertura y comillas antes de la mayúscula)
+_SENTENCE_BOUNDARY_RE = re.compile(r'(?<=[.!?])\s+(?=[¿¡"«(]?[A-ZÁÉÍÓÚÑ])')
+
+# Palabra corta en mayúscula inicial con punto seguida de mayúscula: posible
+# abreviatura que no está en la lista (p. ej. "Ing. Pérez", "J. García"); en ese
+# caso se recurre al modelo Punkt
+_AMBIGUOUS_PERIOD_RE = re.compile(r'\b([A-ZÁÉÍÓÚÑ][a-záéíóúñ]{0,2})\.\s+[A-ZÁÉÍÓÚÑ]')
+
+# Palabras cortas frecuentes que cierran oraciones habladas ("No.", "Sí.", "Ya.")
+# y que no son abreviaturas, en minúsculas
+_COMMON_SHORT_WORDS = frozenset((
+    'no', 'sí', 'si', 'ya', 'yo', 'tú', 'él', 'eso', 'así', 'hoy', 'ahí', 'acá',
+    'aún', 'más', 'muy', 'mal', 'qué', 'que', 'con', 'hay', 'dos', 'uno', 'una',
+    'fue', 'era', 'son', 'ser', 'ver', 'tal', 'eh', 'ah', 'ok',
+))
+
+
+def _has_ambiguous_period(text):
+    """
+    Indica si el texto tiene algún punto que podría ser de una abreviatura.
+    
+    Args:
+        text (str): Texto con las abreviaturas conocidas ya protegidas.
+        
+    Returns:
+        bool: True si alguna palabra corta con forma de abreviatura (y que no es
+              una palabra frecuente) va seguida de punto y mayúscula.
+    """
+    return any(match.group(1).lower() not in _COMMON_SHORT_WORDS
+               for match in _AMBIGUOUS_PERIOD_RE.finditer(text))
+
+
 def segment_by_sentences(text):
     """
     Segmenta un texto en oraciones.
@@ -31,30 +74,22 @@ def segment_by_sentences(text):
     Returns:
         list: Lista de oraciones.
     """
-    # Consideraciones especiales para español
-    # Reemplazar abreviaciones comunes para evitar falsos positivos
-    abbreviations = {
-        'Dr.': 'Dr',
-        'Sr.': 'Sr',
-        'Sra.': 'Sra',
-        'Srta.': 'Srta',
-        'vs.': 'vs',
-        'etc.': 'etc',
-        'aprox.': 'aprox',
-        # Añadir más abreviaciones según sea necesario
-    }
-    
-    for abbr, repl in abbreviations.items():
-        text = text.replace(abbr, repl)
+    # Proteger el punto de las abreviaturas para que no se tome como fin de
+    # oración, y restaurarlo en cada oración tras segmentar
+    text = _ABBREVIATION_RE.sub(r'\1' + _ABBREVIATION_SENTINEL, text)
     
-    # Segmentar en oraciones
-    sentences = sent_tokenize(text, language='spanish')
+    # Segmentar en oraciones: con la expresión compilada salvo que queden puntos
+    # ambiguos, que resuelve mejor Punkt (si su modelo está disponible)
+    sentences = None
+    if _has_ambiguous_period(text):
+        try:
+            sentences = sent_tokenize(text, language='spanish')
+        except LookupError:
+            pass
+    if sentences is None:
+        sentences = [sentence for sentence in _SENTENCE_BOUNDARY_RE.split(text.strip()) if sentence]
     
-    # Restaurar abreviaciones
-    for abbr, repl in abbreviations.items():
-        sentences = [s.replace(repl, abbr) for s in sentences]
-    
-    return sentences
+    return [sentence.replace(_ABBREVIATION_SENTINEL, '.') for sentence in sentences]
 
 
 def segment_by_topics(segments, threshold=0.3, min_segment_length=50):
@@ -80,27 +115,21 @@ def segment_by_topics(segments, threshold=0.3, min_segment_length=50):
         return []
     
     # Vectorizar textos
-    vectorizer = TfidfVectorizer(stop_words='spanish', ngram_range=(1, 2), min_df=1)
+    vectorizer = TfidfVectorizer(stop_words=get_spanish_stop_words(), ngram_range=(1, 2), min_df=1)
     try:
         tfidf_matrix = vectorizer.fit_transform(valid_texts)
     except ValueError:
         # Si hay problemas con la vectorización, retornar segmentos originales
         return [segments[i] for i in valid_indices]
     
-    # Matriz de similitud coseno entre segmentos consecutivos
-    similarities = []
-    for i in range(len(valid_texts) - 1):
-        similarity = cosine_similarity(
-            tfidf_matrix[i:i+1], 
-            tfidf_matrix[i+1:i+2]
-        )[0][0]
-        similarities.append(similarity)
+    # Similitud coseno entre segmentos consecutivos: las filas de TF-IDF ya
+    # están normalizadas (norma L2), así que basta el producto escalar de cada
+    # fila con la siguiente, calculado para todas a la vez
+    similarities = np.asarray(tfidf_matrix[:-1].multiply(tfidf_matrix[1:]).sum(axis=1)).ravel()
     
     # Identificar cambios de tema donde la similitud es menor al umbral
-    topic_changes = [0]  # Primer segmento siempre inicia un tema
-    for i, similarity in enumerate(similarities):
-        if similarity < threshold:
-            topic_changes.append(i + 1)
+    # (el primer segmento siempre inicia un tema)
+    topic_changes = [0] + (np.flatnonzero(similarities < threshold) + 1).tolist()
     
     # Agrupar segmentos por tema
     topic_segments = []
@@ -133,43 +162,43 @@ def create_text_chunks(text, max_chunk_size=1000, overlap=100):
     """
     Divide textos largos en trozos más pequeños para procesamiento con IA.
     
+    Genera los límites de cada trozo en lugar de copiar las subcadenas; quien
+    necesite el texto lo obtiene con `text[start:end]`.
+    
     Args:
         text (str): Texto a dividir.
         max_chunk_size (int): Tamaño máximo en caracteres de cada trozo.
         overlap (int): Número de caracteres de superposición entre trozos.
         
-    Returns:
-        list: Lista de trozos de texto.
+    Yields:
+        tuple: Pares (inicio, fin) de cada trozo dentro de `text`.
     """
-    if len(text) <= max_chunk_size:
-        return [text]
+    text_length = len(text)
+    if text_length <= max_chunk_size:
+        yield 0, text_length
+        return
     
-    chunks = []
     start = 0
+    min_cut = max_chunk_size // 2
     
-    while start < len(text):
+    while True:
         # Determinar el final de este trozo
-        end = min(start + max_chunk_size, len(text))
+        end = min(start + max_chunk_size, text_length)
         
-        # Si no estamos al final del texto, buscar un buen punto de corte
-        if end < len(text):
-            # Buscar el último punto o marca de párrafo
-            last_period = text.rfind('.', start, end)
-            last_newline = text.rfind('\n', start, end)
-            
-            # Elegir el punto de corte más adecuado
-            if last_period > start + (max_chunk_size // 2):
-                end = last_period + 1  # Incluir el punto
-            elif last_newline > start + (max_chunk_size // 2):
-                end = last_newline + 1  # Incluir el salto de línea
+        # Si no estamos al final del texto, cortar tras el último punto o salto
+        # de línea, siempre que no deje un trozo demasiado corto
+        if end < text_length:
+            cut = max(text.rfind('.', start, end), text.rfind('\n', start, end))
+            if cut > start + min_cut:
+                end = cut + 1  # Incluir el punto o el salto de línea
         
-        # Añadir el trozo
-        chunks.append(text[start:end])
+        yield start, end
+        
+        if end >= text_length:
+            break
         
         # Calcular el inicio del siguiente trozo considerando la superposición
         start = max(0, end - overlap)
-    
-    return chunks
 
 
 def process_transcription_for_analysis(file_path, output_path=None, clean_output_path=None):
@@ -201,20 +230,21 @@ def process_transcription_for_analysis(file_path, output_path=None, clean_output
     analysis_segments = []
     for segment in topic_segments:
         # Dividir texto en trozos más pequeños si es muy largo
-        text_chunks = create_text_chunks(segment['text'])
+        text = segment['text']
+        chunk_bounds = list(create_text_chunks(text))
         
         # Si solo hay un trozo, mantener el segmento original
-        if len(text_chunks) == 1:
+        if len(chunk_bounds) == 1:
             analysis_segments.append(segment)
         else:
             # Crear nuevos segmentos para cada trozo
-            for i, chunk in enumerate(text_chunks):
+            for i, (start, end) in enumerate(chunk_bounds):
                 new_segment = {
                     'timestamp': segment['timestamp'],
-                    'text': chunk,
+                    'text': text[start:end],
                     'original_indices': segment['original_indices'],
                     'chunk_index': i,
-                    'total_chunks': len(text_chunks)
+                    'total_chunks': len(chunk_bounds)
                 }
                 analysis_segments.append(new_segment)
     
@@ -222,8 +252,8 @@ def process_transcription_for_analysis(file_path, output_path=None, clean_output
     
     # Guardar resultado si se especificó una ruta de salida
     if output_path:
-        with open(output_path, 'w', encoding='utf-8') as file:
-            json.dump(analysis_segments, file, ensure_ascii=False, indent=2)
+        from intermediate import save_records
+        save_records(analysis_segments, output_path)
         print(f"Segmentos procesados guardados en {output_path}")
     
     return analysis_segments
@@ -0,0 +1,42 @@
+"""
+Lista de palabras vacías (stop words) en español para la vectorización TF-IDF.
+
+scikit-learn solo incluye una lista para inglés (`stop_words='english'`), así que
+la lista en español se toma del corpus `stopwords` de NLTK. Se carga una única vez
+por proceso y la comparten la segmentación por temas y la clasificación.
+"""
+
+import logging
+import functools
+
+import nltk
+
+logger = logging.getLogger(__name__)
+
+
+@functools.cache
+def get_spanish_stop_words():
+    """
+    Carga la lista de palabras vacías en español de NLTK, descargándola si falta.
+    
+    Returns:
+        list: Palabras vacías ordenadas, en el formato que espera `TfidfVectorizer`,
+              o None si el corpus no está disponible (se vectoriza sin filtrarlas).
+    """
+    try:
+        from nltk.corpus import stopwords
+        return sorted(frozenset(stopwords.words('spanish')))
+    except LookupError:
+        pass
+    
+    # Intentar descargar el corpus una vez
+    if nltk.download('stopwords', quiet=True):
+        try:
+            from nltk.corpus import stopwords
+            return sorted(frozenset(stopwords.words('spanish')))
+        except LookupError:
+            pass
+    
+    logger.warning("No se pudo cargar la lista de palabras vacías en español de NLTK. "
+                   "Para instalarla: python -m nltk.downloader stopwords")
+    return None
@@ -0,0 +1,34 @@
+"""
+Pruebas de las correcciones de transcripción (preprocessing/cleaner.py).
+"""
+
+import unittest
+
+from preprocessing.cleaner import clean_segment_text, correct_common_transcription_errors
+
+
+class CorrectionsTest(unittest.TestCase):
+
+    def test_proper_noun_is_capitalized(self):
+        self.assertEqual(correct_common_transcription_errors("comfama"), "Comfama")
+        self.assertEqual(correct_common_transcription_errors("COMFAMA."), "Comfama.")
+
+    def test_word_inside_another_word_is_unchanged(self):
+        self.assertEqual(correct_common_transcription_errors("Comfamaxx"), "Comfamaxx")
+
+    def test_space_before_comma_is_removed(self):
+        self.assertEqual(correct_common_transcription_errors("hola ,mundo"), "hola,mundo")
+
+    def test_fillers_are_removed(self):
+        self.assertEqual(clean_segment_text("eh pues la quebrada digamos crece"), "la quebrada crece")
+
+    def test_fillers_inside_other_words_are_kept(self):
+        self.assertEqual(clean_segment_text("Ehécatl y Puesto de salud"), "Ehécatl y Puesto de salud")
+
+    def test_content_words_are_kept(self):
+        text = "La quebrada está al este del río y es cierto que hay bosque."
+        self.assertEqual(clean_segment_text(text), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Pruebas de la caché semántica de respuestas (generation/llm_cache.py).
+
+El modelo de embeddings se sustituye por una bolsa de palabras determinista para
+no depender de sentence-transformers ni de descargas.
+"""
+
+import hashlib
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from generation import llm_cache
+from generation.ai_client import create_section_prompt, split_semantic_prompt
+
+
+class BagOfWordsModel:
+    """Modelo de embeddings mínimo con la interfaz `encode` de SentenceTransformer."""
+
+    dim = 256
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                bucket = int(hashlib.md5(word.encode('utf-8')).hexdigest(), 16) % self.dim
+                vectors[row, bucket] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+SEGMENTS = [
+    {'text': "En la zona llueve sobre todo entre abril y mayo, con temperaturas "
+             "medias de 24 grados y vientos del este.", 'similarity_score': 0.62},
+    {'text': "Los suelos son arcillosos y hay afloramientos de roca caliza cerca "
+             "de la quebrada.", 'similarity_score': 0.41},
+]
+
+CLIMA = {'titulo': 'Clima', 'id': '3.1.1', 'nivel': 3, 'path': 'Medio abiótico > Clima'}
+GEOLOGIA = {'titulo': 'Geología', 'id': '3.1.2', 'nivel': 3, 'path': 'Medio abiótico > Geología'}
+
+REQUEST_DATA = {'model': 'gpt-4', 'temperature': 0, 'max_tokens': 2000}
+
+
+class SemanticCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        cache = llm_cache.SQLiteCache(self.tmp.name)
+        patches = [
+            mock.patch.object(llm_cache, 'SEMANTIC_CACHE_ENABLED', True),
+            mock.patch.object(llm_cache, 'REFRESH', False),
+            mock.patch.object(llm_cache, 'get_cache', return_value=cache),
+            mock.patch.object(llm_cache, 'get_semantic_model', return_value=BagOfWordsModel()),
+            mock.patch.object(llm_cache, '_semantic_indexes', None),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def store(self, section, segments, text):
+        prompt = create_section_prompt(section, segments, 'gpt-4')
+        data = {**REQUEST_DATA, 'messages': [{'role': 'user', 'content': prompt}]}
+        key = llm_cache.make_key(data)
+        llm_cache.set(key, text)
+        llm_cache.add_similar(data, *split_semantic_prompt(prompt), key)
+
+    def lookup(self, section, segments):
+        prompt = create_section_prompt(section, segments, 'gpt-4')
+        data = {**REQUEST_DATA, 'messages': [{'role': 'user', 'content': prompt}]}
+        return llm_cache.get_similar(data, *split_semantic_prompt(prompt))
+
+    def test_same_section_hits(self):
+        self.store(CLIMA, SEGMENTS, "contenido de clima")
+        self.assertEqual(self.lookup(CLIMA, SEGMENTS), "contenido de clima")
+
+    def test_different_sections_do_not_hit_each_other(self):
+        self.store(CLIMA, SEGMENTS, "contenido de clima")
+        self.assertIsNone(self.lookup(GEOLOGIA, SEGMENTS))
+
+        self.store(GEOLOGIA, SEGMENTS, "contenido de geología")
+        self.assertEqual(self.lookup(GEOLOGIA, SEGMENTS), "contenido de geología")
+        self.assertEqual(self.lookup(CLIMA, SEGMENTS), "contenido de clima")
+
+    def test_different_segments_do_not_hit(self):
+        self.store(CLIMA, SEGMENTS[:1], "contenido de clima")
+        other = [{'text': "Se registraron tres especies de aves migratorias y un "
+                          "mamífero endémico en el bosque ripario.", 'similarity_score': 0.7}]
+        self.assertIsNone(self.lookup(CLIMA, other))
+
+    def test_group_prompts_are_not_split(self):
+        prompt = "- ID: 3.1.1\n- ID: 3.1.2\n# Segmentos relevantes encontrados en las transcripciones\n\n"
+        self.assertIsNone(split_semantic_prompt(prompt))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,14 @@
 import os
+import numpy as np
 import speech_recognition as sr
 from pydub import AudioSegment
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import math
 import time
 
+# Solicitudes de transcripción simultáneas al servicio de Google
+MAX_WORKERS_TRANSCRIPCION = 8
+
 def convertir_m4a_a_wav(ruta_m4a, ruta_wav="audio_convertido.wav"):
     """
     Convierte un archivo M4A a formato WAV para poder procesarlo con SpeechRecognition
@@ -18,91 +23,113 @@ def convertir_m4a_a_wav(ruta_m4a, ruta_wav="audio_convertido.wav"):
         print(f"Error al convertir M4A a WAV: {e}")
         return None
 
-def transcribir_audio_por_segmentos(ruta_audio, ruta_salida="transcripcion.txt", idioma="es-ES", duracion_segmento=30):
+def _transcribir_segmento(i, muestras, frame_rate, idioma):
     """
-    Transcribe un archivo de audio a texto dividiéndolo en segmentos
-    y guarda cada segmento transcrito en el archivo de salida
+    Transcribe un segmento de audio (muestras PCM mono de 16 bits) y devuelve
+    su índice junto con el texto
     """
+    # Las muestras PCM del segmento se entregan directamente al reconocedor,
+    # sin codificarlas como WAV para volver a leerlas
+    audio_data = sr.AudioData(muestras.tobytes(), frame_rate, 2)
+    
+    # Cada hilo usa su propio reconocedor
     recognizer = sr.Recognizer()
     
     try:
-        # Abrir el archivo de texto en modo de escritura
-        with open(ruta_salida, "w", encoding="utf-8") as archivo_salida:
-            archivo_salida.write("TRANSCRIPCIÓN EN PROGRESO...\n\n")
-        
-        # Cargar el audio completo
-        audio_completo = AudioSegment.from_wav(ruta_audio)
-        duracion_total = len(audio_completo) / 1000  # Duración en segundos
-        
-        # Calcular número de segmentos
-        num_segmentos = math.ceil(duracion_total / duracion_segmento)
-        
-        print(f"El audio tiene una duración de {duracion_total:.2f} segundos")
-        print(f"Dividiendo en {num_segmentos} segmentos de {duracion_segmento} segundos")
-        
-        # Inicializar contador de tiempo
-        tiempo_inicio_total = time.time()
+        texto_segmento = recognizer.recognize_google(audio_data, language=idioma)
+        print(f"Segmento {i+1} transcrito exitosamente")
+    except sr.UnknownValueError:
+        texto_segmento = "[inaudible]"
+        print(f"No se pudo entender el audio en el segmento {i+1}")
+    except sr.RequestError as e:
+        texto_segmento = "[error de servicio]"
+        print(f"Error en la solicitud para el segmento {i+1}: {e}")
+    
+    return i, texto_segmento
+
+def transcribir_audio_por_segmentos(ruta_audio, ruta_salida="transcripcion.txt", idioma="es-ES", duracion_segmento=30,
+                                    max_workers=MAX_WORKERS_TRANSCRIPCION):
+    """
+    Transcribe un archivo de audio a texto dividiéndolo en segmentos
+    y guarda cada segmento transcrito en el archivo de salida
+    
+    Los segmentos se envían al servicio de reconocimiento en paralelo (hasta
+    max_workers a la vez) y se escriben en el archivo en su orden original, a
+    medida que están disponibles
+    """
+    # Inicializar contador de tiempo
+    tiempo_inicio_total = time.time()
+    
+    # El archivo de salida se abre una sola vez para toda la transcripción
+    with open(ruta_salida, "w", encoding="utf-8") as archivo_salida:
+        archivo_salida.write("TRANSCRIPCIÓN EN PROGRESO...\n\n")
+        archivo_salida.flush()
         
-        for i in range(num_segmentos):
-            # Marcar tiempo de inicio para este segmento
-            tiempo_inicio_segmento = time.time()
-            
-            # Extraer segmento
-            inicio_ms = i * duracion_segmento * 1000
-            fin_ms = min((i + 1) * duracion_segmento * 1000, len(audio_completo))
-            segmento = audio_completo[inicio_ms:fin_ms]
+        try:
+            # Cargar el audio completo
+            audio_completo = AudioSegment.from_wav(ruta_audio)
             
-            # Convertir milisegundos a formato de tiempo legible
-            inicio_tiempo = time.strftime('%H:%M:%S', time.gmtime(inicio_ms/1000))
-            fin_tiempo = time.strftime('%H:%M:%S', time.gmtime(fin_ms/1000))
+            # El reconocedor espera audio mono: mezclar los canales una sola vez
+            # antes de dividir (sr.AudioFile lo hacía para cada segmento)
+            audio_completo = audio_completo.set_channels(1).set_sample_width(2)
+            duracion_total = len(audio_completo) / 1000  # Duración en segundos
             
-            # Guardar segmento temporalmente
-            archivo_segmento = f"segmento_temp_{i}.wav"
-            segmento.export(archivo_segmento, format="wav")
+            # Decodificar el audio una sola vez como muestras int16; cada segmento
+            # es una vista del arreglo, sin copiar bytes ni crear un AudioSegment
+            frame_rate = audio_completo.frame_rate
+            pcm = np.frombuffer(audio_completo.raw_data, dtype=np.int16)
+            muestras_por_segmento = int(duracion_segmento * frame_rate)
             
-            print(f"Procesando segmento {i+1}/{num_segmentos} [{inicio_tiempo} - {fin_tiempo}]...")
+            # Calcular número de segmentos
+            num_segmentos = math.ceil(duracion_total / duracion_segmento)
             
-            # Transcribir segmento
-            texto_segmento = ""
-            with sr.AudioFile(archivo_segmento) as source:
-                audio_data = recognizer.record(source)
-                try:
-                    texto_segmento = recognizer.recognize_google(audio_data, language=idioma)
-                    print(f"Segmento {i+1} transcrito exitosamente")
-                except sr.UnknownValueError:
-                    texto_segmento = "[inaudible]"
-                    print(f"No se pudo entender el audio en el segmento {i+1}")
-                except sr.RequestError as e:
-                    texto_segmento = "[error de servicio]"
-                    print(f"Error en la solicitud para el segmento {i+1}: {e}")
+            print(f"El audio tiene una duración de {duracion_total:.2f} segundos")
+            print(f"Dividiendo en {num_segmentos} segmentos de {duracion_segmento} segundos")
             
-            # Eliminar archivo temporal del segmento
-            try:
-                os.remove(archivo_segmento)
-            except:
-                pass
+            # Extraer los segmentos y sus marcas de tiempo legibles
+            segmentos = []
+            marcas_tiempo = []
+            for i in range(num_segmentos):
+                inicio_ms = i * duracion_segmento * 1000
+                fin_ms = min((i + 1) * duracion_segmento * 1000, len(audio_completo))
+                segmentos.append(pcm[i * muestras_por_segmento:(i + 1) * muestras_por_segmento])
+                marcas_tiempo.append((
+                    time.strftime('%H:%M:%S', time.gmtime(inicio_ms/1000)),
+                    time.strftime('%H:%M:%S', time.gmtime(fin_ms/1000))
+                ))
             
-            # Añadir el texto transcrito al archivo de salida
-            with open(ruta_salida, "a", encoding="utf-8") as archivo_salida:
-                archivo_salida.write(f"[{inicio_tiempo} - {fin_tiempo}]: {texto_segmento}\n\n")
+            # Textos ya transcritos pendientes de escribir, por índice de segmento
+            transcritos = {}
+            siguiente = 0
             
-            # Calcular tiempo transcurrido para este segmento
-            tiempo_segmento = time.time() - tiempo_inicio_segmento
-            print(f"Tiempo para segmento {i+1}: {tiempo_segmento:.2f} segundos")
-            print(f"Texto añadido al archivo: {ruta_salida}")
-            print("-" * 50)
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = [pool.submit(_transcribir_segmento, i, segmento, frame_rate, idioma)
+                           for i, segmento in enumerate(segmentos)]
                 
-    except Exception as e:
-        print(f"Error durante la transcripción por segmentos: {e}")
-        with open(ruta_salida, "a", encoding="utf-8") as archivo_salida:
+                for future in as_completed(futures):
+                    i, texto_segmento = future.result()
+                    transcritos[i] = texto_segmento
+                    
+                    # Añadir al archivo de salida los segmentos consecutivos ya disponibles
+                    while siguiente in transcritos:
+                        inicio_tiempo, fin_tiempo = marcas_tiempo[siguiente]
+                        archivo_salida.write(f"[{inicio_tiempo} - {fin_tiempo}]: {transcritos.pop(siguiente)}\n\n")
+                        siguiente += 1
+                    archivo_salida.flush()  # Dejar visible el progreso en el archivo
+                    
+                    print(f"Segmentos completados: {len(transcritos) + siguiente}/{num_segmentos}")
+                    print(f"Texto añadido al archivo: {ruta_salida}")
+                    print("-" * 50)
+                    
+        except Exception as e:
+            print(f"Error durante la transcripción por segmentos: {e}")
             archivo_salida.write(f"\n[ERROR] Transcripción interrumpida: {e}\n")
-    
-    # Calcular tiempo total
-    tiempo_total = time.time() - tiempo_inicio_total
-    print(f"\nTranscripción completada en {tiempo_total:.2f} segundos")
-    
-    # Marcar como completado en el archivo
-    with open(ruta_salida, "a", encoding="utf-8") as archivo_salida:
+        
+        # Calcular tiempo total
+        tiempo_total = time.time() - tiempo_inicio_total
+        print(f"\nTranscripción completada en {tiempo_total:.2f} segundos")
+        
+        # Marcar como completado en el archivo
         archivo_salida.write("\n\nTRANSCRIPCIÓN COMPLETADA\n")
         archivo_salida.write(f"Tiempo total: {tiempo_total:.2f} segundos\n")
     